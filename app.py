@@ -5,7 +5,7 @@ from flask import Flask, render_template
 from flask_wtf.csrf import generate_csrf
 
 from config import Config
-from extensions import db, csrf, login_manager, migrate
+from extensions import db, csrf, login_manager, cache, init_migrate
 
 load_dotenv()  # подтягиваем .env при старте
 
@@ -52,13 +52,18 @@ def create_app():
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
     login_manager.login_message_category = "warning"
-    # Flask-Migrate
-    migrate.init_app(app, db)
+    cache.init_app(app)
+    # Flask-Migrate — только под CLI `flask ...` (команды db upgrade/migrate);
+    # gunicorn-воркерам alembic не нужен
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        init_migrate(app)
 
     @login_manager.user_loader
     def load_user(user_id):
+        from sqlalchemy.orm import lazyload
         from models import User
-        return db.session.get(User, int(user_id))
+        # selectin-коллекции (все попытки, логи, прогресс) грузятся только при обращении
+        return db.session.get(User, int(user_id), options=[lazyload("*")])
 
     # Блюпринты
     from blueprints.main import main_bp
@@ -73,6 +78,31 @@ def create_app():
     app.register_blueprint(auth_bp,  url_prefix="/auth")
     app.register_blueprint(admin_bp)
 
+    # JSON через orjson (если установлен): jsonify, результаты задач, tojson
+    from services import json_provider
+    json_provider.init_app(app)
+    # Байткод шаблонов Jinja на диске, общий для воркеров (flask templates-compile)
+    from services import template_cache
+    template_cache.init_app(app)
+    # Кэш отрендеренных фрагментов задач (общий для всех пользователей)
+    from services import fragments
+    fragments.init_app(app)
+    # Статика с отпечатками и предсжатием (flask assets-build), «вечный» кэш в браузере
+    from services import assets
+    assets.init_app(app)
+    # Справочник тем/задач для селектов (версионируется через cache_versions)
+    from services import catalog
+    catalog.init_app(app)
+    # Фоновые задачи админки (импорт/экспорт/предпросмотр оценок) — пул потоков процесса
+    from services import jobs
+    jobs.init_app(app)
+    # Метрики Prometheus (/metrics): запросы, SQL, оценивание, импорт/экспорт, кэши
+    from services import metrics
+    metrics.init_app(app)
+    # Профилирование запроса по флагу ?_profile=1 (администраторы) — стеки и SQL в ответе
+    from services import profiler
+    profiler.init_app(app)
+
     # Jinja: csrf_token() во все шаблоны
     @app.context_processor
     def inject_csrf():
@@ -105,12 +135,28 @@ def create_app():
 
     return app
 
-# Expose module-level WSGI app so that 'gunicorn app:app' works too
-app = create_app()
+# Модульное приложение собирается лениво и один раз на процесс: `import app` ничего
+# не строит, а `from app import app`, `gunicorn app:app`, `flask --app app`
+# и wsgi.py получают один и тот же объект
+_app = None
+
+
+def get_app():
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def __getattr__(name):
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Локальный запуск (python app.py)
 if __name__ == "__main__":
-    app.run(
+    get_app().run(
         host="0.0.0.0",
         port=int(os.environ.get("PORT", 8083)),
         debug=True
@@ -8,11 +8,16 @@ cd "$(dirname "$0")/.."
 export FLASK_APP=wsgi.py
 flask db upgrade || true
 
+# статика с отпечатками и .gz (services/assets.py); без сборки отдаются исходники
+flask assets-build || true
+# байткод шаблонов — на диск, чтобы воркеры не компилировали их на первых запросах
+flask templates-compile || true
+
 # optionally create an admin user on start (guarded by env var)
 if [ "${CREATE_ADMIN_ON_START}" = "true" ]; then
   echo "[start] CREATE_ADMIN_ON_START=true -> creating admin if missing"
   flask create-admin || true
 fi
 
-# start gunicorn
-exec gunicorn wsgi:app
+# start gunicorn (настройки — gunicorn.conf.py: preload, gthread, перезапуск воркеров)
+exec gunicorn -c gunicorn.conf.py wsgi:app
@@ -11,6 +11,7 @@ from wtforms.widgets import CheckboxInput
 
 
 from models import Topic, User
+from services.bulk import check_answer_json
 
 # ---------- ВАЛИДАТОРЫ-ПОМОЩНИКИ ----------
 class JSONText(ValidationError):
@@ -40,40 +41,13 @@ def parse_json_or_error(value: str, field_label: str):
 
 def validate_answer_json(obj):
     """
-    Мини-валидация структуры correct_answer:
-    ожидаем объект с ключом type и минимальными полями по типу.
+    Мини-валидация структуры correct_answer (services.bulk.check_answer_json)
+    с ошибкой в виде ValidationError формы.
     """
-    if not isinstance(obj, dict):
-        raise ValidationError("Правильный ответ: ожидается JSON-объект.")
-    t = obj.get("type")
-    if t not in {"number", "variables", "interval", "sequence"}:
-        raise ValidationError("Правильный ответ: неизвестный type.")
-    if t == "number" and not isinstance(obj.get("value"), (int, float)):
-        raise ValidationError("Правильный ответ: для type=number нужен числовой value.")
-    if t == "variables":
-        if not isinstance(obj.get("variables"), list):
-            raise ValidationError("Правильный ответ: для type=variables нужен список variables.")
-        if not all(isinstance(v, dict) and "name" in v and "value" in v for v in obj.get("variables", [])):
-            raise ValidationError("Правильный ответ: для type=variables все переменные должны иметь name и value.")
-    if t == "sequence":
-        vals = obj.get("sequence_values")
-        if not isinstance(vals, list):
-            raise ValidationError("Правильный ответ: для type=sequence нужен список sequence_values.")
-        if not all(isinstance(v, (int, float)) for v in vals):
-            raise ValidationError("Правильный ответ: для type=sequence значения должны быть числами.")
-    if t == "interval":
-        if "start" not in obj or "end" not in obj:
-            raise ValidationError("Правильный ответ: для type=interval нужны поля start/end.")
-        start = obj.get("start")
-        end = obj.get("end")
-        # null допустим для -∞/+∞, иначе — число
-        if start is not None and not isinstance(start, (int, float)):
-            raise ValidationError("Правильный ответ: start должен быть числом или null.")
-        if end is not None and not isinstance(end, (int, float)):
-            raise ValidationError("Правильный ответ: end должен быть числом или null.")
-        if start is not None and end is not None and start >= end:
-            raise ValidationError("Правильный ответ: start должен быть меньше end для интервала.")
-    return True
+    try:
+        return check_answer_json(obj)
+    except ValueError as e:
+        raise ValidationError(str(e))
 
 
 
@@ -1,21 +1,32 @@
 from __future__ import annotations
 import json
+import os
+import time
 from datetime import datetime, timedelta
 from functools import wraps
 from werkzeug.security import generate_password_hash
-import secrets
 
 from flask import (
-    render_template, request, redirect, url_for, flash, current_app, jsonify, make_response
+    render_template, request, redirect, url_for, flash, current_app, jsonify, make_response, send_file
 )
 from flask_login import login_required, current_user
 
 from extensions import db, csrf
-from sqlalchemy import func
-from models import User, Topic, MathTask, TopicLevelConfig, TaskAttempt, EvaluationSystemConfig
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, lazyload
+from models import User, Topic, MathTask, TopicLevelConfig, TaskAttempt, EvaluationSystemConfig, BackgroundJob
 from . import admin_bp
-from .forms import CreateUserForm, EditUserForm, CreateTopicForm, EditTopicForm, TaskForm, ImportFileForm, ConfirmDeleteForm, LevelConfigForm, LEVEL_CHOICES, AttemptFilterForm, CreateAttemptForm, EditAttemptForm, EvaluationPreviewForm, ANSWER_TYPE_CHOICES
-from services.evaluation import preview as eval_preview
+from .forms import CreateUserForm, EditUserForm, CreateTopicForm, EditTopicForm, TaskForm, ImportFileForm, ConfirmDeleteForm, LevelConfigForm, LEVEL_CHOICES, AttemptFilterForm, CreateAttemptForm, EditAttemptForm, EvaluationPreviewForm, ANSWER_TYPE_CHOICES, ROLE_CHOICES
+from services.submission import invalidate_attempt_counters
+from services.catalog import get_topics, topic_choices
+from services.lookup import search_tasks, search_users, task_choice, user_choice
+from services.keyset import cached_count, keyset_paginate
+from services.attempt_import import detect_format, import_attempts_stream, partial_score
+from services.export import (export_filename, export_mimetype, export_options, export_response,
+                             iter_batches, iter_rows, write_export)
+from services.jobs import job_handler, job_to_dict, jobs
+from services import metrics
 
 
 
@@ -31,6 +42,10 @@ def admin_required(fn):
         return fn(*args, **kwargs)
     return wrapper
 
+def _like_pattern(text: str) -> str:
+    """Шаблон для ILIKE '%text%' с экранированием спецсимволов (escape='\\')."""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
 def _parse_json(text: str, field_name: str):
     """Безопасный парсер JSON из текстового поля формы."""
     try:
@@ -38,37 +53,73 @@ def _parse_json(text: str, field_name: str):
     except Exception as e:
         raise ValueError(f"{field_name}: некорректный JSON ({e})")
 
-def _serialize_topic(topic: Topic) -> dict:
-    data = {
-        "code": topic.code,
-        "name": topic.name,
-        "description": topic.description or "",
-        "level_configs": {}
-    }
-    for cfg in topic.level_configs:
-        data["level_configs"][cfg.level] = {
-            "task_count_threshold": cfg.task_count_threshold,
-            "reference_time": cfg.reference_time,
-            "penalty_weights": cfg.penalty_weights,
-        }
-    return data
+# ---- export rows (потоково, колонками — без ORM-объектов и их selectin-связей) ----
+
+TOPIC_EXPORT_FIELDS = ("code", "name", "description", "level_configs")
+TASK_EXPORT_FIELDS = ("title", "description", "code", "answer_type", "correct_answer", "answer_schema",
+                      "explanation", "topic_code", "topic_id", "level", "max_score", "is_active", "created_at")
+USER_EXPORT_FIELDS = ("id", "username", "email", "role", "is_active", "created_at")
+ATTEMPT_EXPORT_FIELDS = ("id", "user_id", "username", "task_id", "task_code", "attempt_number", "is_correct",
+                         "partial_score", "time_spent", "hints_used", "created_at", "user_answer")
+
+def _topic_export_rows(ids=None):
+    stmt = select(Topic.id, Topic.code, Topic.name, Topic.description)
+    if ids is not None:
+        stmt = stmt.where(Topic.id.in_(ids))
+    # настройки уровней — одним запросом на порцию тем
+    for batch in iter_batches(stmt, Topic.id):
+        configs = {}
+        for cfg in db.session.execute(
+                select(TopicLevelConfig.topic_id, TopicLevelConfig.level, TopicLevelConfig.task_count_threshold,
+                       TopicLevelConfig.reference_time, TopicLevelConfig.penalty_weights)
+                .where(TopicLevelConfig.topic_id.in_([t.id for t in batch]))
+                .order_by(TopicLevelConfig.id)):
+            configs.setdefault(cfg.topic_id, {})[cfg.level] = {
+                "task_count_threshold": cfg.task_count_threshold,
+                "reference_time": cfg.reference_time,
+                "penalty_weights": cfg.penalty_weights,
+            }
+        for t in batch:
+            yield {
+                "code": t.code,
+                "name": t.name,
+                "description": t.description or "",
+                "level_configs": configs.get(t.id, {}),
+            }
 
-def _serialize_task(task: MathTask) -> dict:
-    return {
-        "title": task.title,
-        "description": task.description or "",
-        "code": task.code,
-        "answer_type": task.answer_type,
-        "correct_answer": task.correct_answer,
-        "answer_schema": task.answer_schema,
-        "explanation": task.explanation or "",
-        "topic_code": task.topic_ref.code if task.topic_ref else None,
-        "topic_id": task.topic_id,
-        "level": task.level,
-        "max_score": task.max_score,
-        "is_active": task.is_active,
-        "created_at": task.created_at.isoformat() if task.created_at else None,
-    }
+def _task_export_rows(ids=None):
+    stmt = (select(MathTask.title, MathTask.description, MathTask.code, MathTask.answer_type,
+                   MathTask.correct_answer, MathTask.answer_schema, MathTask.explanation,
+                   Topic.code.label("topic_code"), MathTask.topic_id, MathTask.level, MathTask.max_score,
+                   MathTask.is_active, MathTask.created_at, MathTask.id)
+            .outerjoin(Topic, Topic.id == MathTask.topic_id))
+    if ids is not None:
+        stmt = stmt.where(MathTask.id.in_(ids))
+    for row in iter_rows(stmt, MathTask.id):
+        item = dict(row._mapping)
+        del item["id"]  # только ключ порций; в файл экспорта не входит
+        item["description"] = item["description"] or ""
+        item["explanation"] = item["explanation"] or ""
+        yield item
+
+def _user_export_rows(ids=None):
+    stmt = select(User.id, User.username, User.email, User.role, User.is_active, User.created_at)
+    if ids is not None:
+        stmt = stmt.where(User.id.in_(ids))
+    for row in iter_rows(stmt, User.id):
+        yield dict(row._mapping)
+
+def _attempt_export_rows(filters):
+    stmt = (select(TaskAttempt.id, TaskAttempt.user_id, User.username, TaskAttempt.task_id,
+                   MathTask.code.label("task_code"), TaskAttempt.attempt_number, TaskAttempt.is_correct,
+                   TaskAttempt.partial_score, TaskAttempt.time_spent, TaskAttempt.hints_used,
+                   TaskAttempt.created_at, TaskAttempt.user_answer)
+            .outerjoin(User, User.id == TaskAttempt.user_id)
+            .outerjoin(MathTask, MathTask.id == TaskAttempt.task_id)
+            .where(*filters))
+    # новые сверху, как в журнале
+    for row in iter_rows(stmt, TaskAttempt.created_at, TaskAttempt.id, descending=True):
+        yield dict(row._mapping)
 
 def _set_user_password(user, password: str):
     """Поддержка как метода set_password у модели, так и прямой записи хеша."""
@@ -118,26 +169,12 @@ def _flash_form_errors(form):
 # ---- scoring helpers ---------------------------------------------------------
 
 def _compute_partial_score(task: MathTask, attempt_number: int, is_correct: bool) -> float:
-    """Возвращает partial_score по политике:
-    - если попытка неуспешная -> 0.0
-    - 1-я успешная попытка -> 1.0
-    - 2-я -> penalty_weights[0]
-    - 3-я -> penalty_weights[1]
-    - дальше -> 0.0, если веса не заданы
-    """
-    if not is_correct:
-        return 0.0
-    if attempt_number <= 1:
-        return 1.0
+    """Возвращает partial_score по политике отправки ответа
+    (services.submission.attempt_score, веса — TopicLevelConfig.penalty_weights темы/уровня)."""
+    if not is_correct or attempt_number <= 1:
+        return partial_score(None, attempt_number, is_correct)
     cfg = TopicLevelConfig.query.filter_by(topic_id=task.topic_id, level=task.level).first()
-    weights = []
-    if cfg and isinstance(cfg.penalty_weights, (list, tuple)):
-        weights = list(cfg.penalty_weights)
-    idx = max(0, attempt_number - 2)  # 2-я попытка -> index 0
-    try:
-        return float(weights[idx]) if idx < len(weights) else 0.0
-    except Exception:
-        return 0.0
+    return partial_score(cfg.penalty_weights if cfg else None, attempt_number, is_correct)
 
 # =============================================================================
 #                 API: penalty_weights for a task
@@ -201,6 +238,49 @@ def api_task_weights(task_id: int):
         'penalty_weights': weights
     })
 
+# =============================================================================
+#           API: автодополнение пользователей и задач (префиксный поиск)
+# =============================================================================
+
+def _lookup_allowed() -> bool:
+    return getattr(current_user, 'role', None) in ('admin', 'teacher')
+
+@admin_bp.route('/api/lookup/users', methods=['GET'])
+@login_required
+def api_lookup_users():
+    """?q=<префикс логина или id>&limit=&role= → {"ok": true, "items": [{"id", "text"}]}"""
+    if not _lookup_allowed():
+        return jsonify({'ok': False, 'error': 'forbidden'}), 403
+    items = search_users(request.args.get('q', ''),
+                         limit=request.args.get('limit', type=int),
+                         role=(request.args.get('role') or None))
+    return jsonify({'ok': True, 'items': items})
+
+@admin_bp.route('/api/lookup/tasks', methods=['GET'])
+@login_required
+def api_lookup_tasks():
+    """?q=<префикс названия или id>&limit= → {"ok": true, "items": [{"id", "text"}]}"""
+    if not _lookup_allowed():
+        return jsonify({'ok': False, 'error': 'forbidden'}), 403
+    items = search_tasks(request.args.get('q', ''), limit=request.args.get('limit', type=int))
+    return jsonify({'ok': True, 'items': items})
+
+@admin_bp.route('/api/profile-token', methods=['GET'])
+@login_required
+@admin_required
+def api_profile_token():
+    """Токен для ?_profile=<токен>: профилирование страниц, недоступных администратору
+    (например, student.tasks под тестовым студентом ?user_id=<id>). См. services.profiler."""
+    from services.profiler import PARAM, make_token
+    user_id = request.args.get('user_id', type=int)
+    target = db.session.get(User, user_id) if user_id is not None else None
+    if target is None:
+        return jsonify({'ok': False, 'error': 'user_id_required',
+                        'message': 'Укажите user_id существующего пользователя'}), 400
+    return jsonify({'ok': True, 'param': PARAM, 'user_id': target.id,
+                    'token': make_token(current_user.id, target.id),
+                    'expires_in': current_app.config['PROFILER_TOKEN_TTL']})
+
 # =============================================================================
 #           Admin API: EvaluationSystemConfig (GET/POST JSON)
 # =============================================================================
@@ -376,42 +456,67 @@ def evaluation_preview():
         if errors:
             return jsonify({'ok': False, 'errors': errors}), 400
 
-        # Load system config for period (weights used inside service)
-        sys_cfg_row = EvaluationSystemConfig.query.order_by(EvaluationSystemConfig.id.desc()).first()
-        # Defaults if not present
-        eval_days = int(getattr(sys_cfg_row, 'evaluation_period_days', 7) or 7)
-
-        # Determine period
-        if form.period_start.data and form.period_end.data:
-            period_start = form.period_start.data
-            period_end = form.period_end.data
-        else:
-            # defaults: last N days ending today
-            today = datetime.utcnow().date()
-            period_end = today
-            period_start = today - timedelta(days=max(1, eval_days) - 1)
-
-        results = eval_preview(
-            db.session,
-            form.user_ids.data,
-            [form.topic_id.data],
-            period_start,
-            period_end,
-        )
-
-        return jsonify({
-            'ok': True,
-            'meta': {
-                'user_count': len(form.user_ids.data),
-                'topic_count': 1 if form.topic_id.data else 0,
-                'period_start': period_start.isoformat(),
-                'period_end': period_end.isoformat(),
-            },
-            'results': results,
-        })
+        params = {
+            'user_ids': form.user_ids.data,
+            'topic_id': form.topic_id.data,
+            'period_start': form.period_start.data.isoformat() if form.period_start.data else None,
+            'period_end': form.period_end.data.isoformat() if form.period_end.data else None,
+        }
+        # {"background": true} — расчёт в фоновой задаче, ответ 202 со ссылкой на статус
+        if _wants_background():
+            job = jobs.submit('evaluation_preview', params, user_id=current_user.id)
+            return _job_started(job)
+        return jsonify(_evaluation_preview_result(params))
     except Exception as e:
         current_app.logger.exception(e)
         return jsonify({'ok': False, 'errors': [str(e)]}), 500
+
+def _evaluation_preview_result(params: dict) -> dict:
+    """Расчёт предпросмотра по проверенным параметрам (в запросе или в фоновой задаче)."""
+    # Load system config for period (weights used inside service)
+    sys_cfg_row = EvaluationSystemConfig.query.order_by(EvaluationSystemConfig.id.desc()).first()
+    # Defaults if not present
+    eval_days = int(getattr(sys_cfg_row, 'evaluation_period_days', 7) or 7)
+
+    # Determine period
+    if params.get('period_start') and params.get('period_end'):
+        period_start = datetime.fromisoformat(params['period_start']).date()
+        period_end = datetime.fromisoformat(params['period_end']).date()
+    else:
+        # defaults: last N days ending today
+        today = datetime.utcnow().date()
+        period_end = today
+        period_start = today - timedelta(days=max(1, eval_days) - 1)
+
+    # модуль оценивания нужен только здесь — грузим при первом предпросмотре, а не при старте воркера
+    from services.evaluation import preview as eval_preview
+    started = time.perf_counter()
+    results = eval_preview(
+        db.session,
+        params['user_ids'],
+        [params['topic_id']],
+        period_start,
+        period_end,
+    )
+    metrics.record_evaluation(len(results), time.perf_counter() - started)
+
+    return {
+        'ok': True,
+        'meta': {
+            'user_count': len(params['user_ids']),
+            'topic_count': 1 if params['topic_id'] else 0,
+            'period_start': period_start.isoformat(),
+            'period_end': period_end.isoformat(),
+        },
+        'results': results,
+    }
+
+@job_handler('evaluation_preview', 'Предпросмотр оценивания')
+def _evaluation_preview_job(ctx, params):
+    ctx.progress(0, total=len(params.get('user_ids') or []), force=True)
+    # через JSON-провайдер приложения: даты и прочее — в вид, пригодный для JSON-колонки
+    return json.loads(current_app.json.dumps(_evaluation_preview_result(params)))
+
 @admin_bp.route('/evaluation', methods=['GET'])
 @login_required
 @admin_required
@@ -431,14 +536,7 @@ def evaluation_page():
     form.user_ids.choices = [(u.id, _display_name(u)) for u in students]
 
     # Only topics that have at least one task
-    topics_with_tasks = (
-        db.session.query(Topic)
-        .join(MathTask, MathTask.topic_id == Topic.id)
-        .group_by(Topic.id)
-        .having(func.count(MathTask.id) > 0)
-        .order_by(Topic.name.asc())
-        .all()
-    )
+    topics_with_tasks = [t for t in get_topics() if t.task_count > 0]
     form.topic_id.choices = [(t.id, t.name) for t in topics_with_tasks]
 
     # Meta maps for client rendering
@@ -696,24 +794,25 @@ def import_topics():
 @login_required
 @admin_required
 def export_topics():
-    """GET — экспорт всех; POST — экспорт выбранных (topic_ids в JSON)."""
+    """GET — экспорт всех; POST — экспорт выбранных (topic_ids в JSON).
+    ?format=json|ndjson|csv, ?gzip=1 — см. services.export."""
     try:
+        ids = None
         if request.method == "POST":
             payload = request.get_json(silent=True) or {}
             ids = payload.get("topic_ids") or []
             if not ids:
                 return jsonify({"success": False, "message": "Не выбрано ни одной темы"}), 400
-            topics = Topic.query.filter(Topic.id.in_(ids)).all()
-        else:
-            topics = Topic.query.all()
 
-        export_data = [_serialize_topic(t) for t in topics]
-        resp = make_response(json.dumps(export_data, ensure_ascii=False, indent=2))
-        resp.headers["Content-Type"] = "application/json; charset=utf-8"
+        fmt, use_gzip = export_options(request.args)
+        if _wants_background():
+            job = jobs.submit("export_topics", {"ids": ids, "format": fmt, "gzip": use_gzip},
+                              user_id=current_user.id)
+            return _job_started(job)
         fname = ("selected_topics_export_" if request.method == "POST" else "all_topics_export_") \
-                + datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
-        resp.headers["Content-Disposition"] = f'attachment; filename="{fname}"'
-        return resp
+                + datetime.now().strftime("%Y%m%d_%H%M%S")
+        return export_response(lambda: _topic_export_rows(ids), fmt, fname,
+                               fields=TOPIC_EXPORT_FIELDS, use_gzip=use_gzip, kind="topics")
     except Exception as e:
         current_app.logger.error(f"Error exporting topics: {e}")
         if request.method == "POST":
@@ -725,32 +824,136 @@ def export_topics():
 #                               З А Д А Н И Я
 # =============================================================================
 
+TASKS_PER_PAGE_CHOICES = (20, 50, 100)
+_DESCRIPTION_PREVIEW = 80
+
+def _tasks_listing(args) -> dict:
+    """Страница банка заданий по фильтрам из query string.
+
+    Выбираются только колонки таблицы (без ORM-объектов: у MathTask selectin-связь
+    attempts) и начало условия; статистика попыток — одним агрегатом по задачам
+    текущей страницы, названия тем — из справочника.
+    """
+    filters = {
+        'topic_id': args.get('topic_id', type=int),
+        'level': (args.get('level') or '').strip() or None,
+        'answer_type': (args.get('answer_type') or '').strip() or None,
+        'active': (args.get('active') or '').strip() or None,  # '1' | '0'
+        'q': (args.get('q') or '').strip() or None,
+    }
+    per_page = args.get('per_page', type=int)
+    if per_page not in TASKS_PER_PAGE_CHOICES:
+        per_page = TASKS_PER_PAGE_CHOICES[0]
+
+    conds = []
+    if filters['topic_id']:
+        conds.append(MathTask.topic_id == filters['topic_id'])
+    if filters['level']:
+        conds.append(MathTask.level == filters['level'])
+    if filters['answer_type']:
+        conds.append(MathTask.answer_type == filters['answer_type'])
+    if filters['active'] in ('1', '0'):
+        conds.append(MathTask.is_active.is_(filters['active'] == '1'))
+    if filters['q']:
+        pattern = _like_pattern(filters['q'])
+        conds.append(or_(MathTask.title.ilike(pattern, escape='\\'),
+                         MathTask.code.ilike(pattern, escape='\\')))
+
+    total = db.session.query(func.count(MathTask.id)).filter(*conds).scalar() or 0
+    pages = max((total + per_page - 1) // per_page, 1)
+    page = min(max(args.get('page', 1, type=int) or 1, 1), pages)
+
+    rows = (db.session.query(
+                MathTask.id, MathTask.title, MathTask.code, MathTask.topic_id, MathTask.level,
+                MathTask.answer_type, MathTask.max_score, MathTask.is_active, MathTask.created_at,
+                func.substr(MathTask.description, 1, _DESCRIPTION_PREVIEW + 1).label('description'))
+            .filter(*conds)
+            .order_by(MathTask.level.desc(), MathTask.id.desc())
+            .limit(per_page).offset((page - 1) * per_page)
+            .all())
+
+    ids = [r.id for r in rows]
+    stats = {}
+    if ids:
+        for task_id, n_attempts, n_students, n_correct in (
+                db.session.query(TaskAttempt.task_id,
+                                 func.count(TaskAttempt.id),
+                                 func.count(func.distinct(TaskAttempt.user_id)),
+                                 func.sum(case((TaskAttempt.is_correct.is_(True), 1), else_=0)))
+                .filter(TaskAttempt.task_id.in_(ids))
+                .group_by(TaskAttempt.task_id)):
+            stats[task_id] = {
+                'attempts': int(n_attempts or 0),
+                'students': int(n_students or 0),
+                'correct': int(n_correct or 0),
+                'success_rate': round(100.0 * (n_correct or 0) / n_attempts, 1) if n_attempts else None,
+            }
+    empty_stats = {'attempts': 0, 'students': 0, 'correct': 0, 'success_rate': None}
+    topics_by_id = {t.id: t for t in get_topics()}
+
+    items = []
+    for r in rows:
+        topic = topics_by_id.get(r.topic_id)
+        items.append({
+            'id': r.id,
+            'title': r.title,
+            'code': r.code,
+            'description': (r.description[:_DESCRIPTION_PREVIEW] + '…'
+                            if r.description and len(r.description) > _DESCRIPTION_PREVIEW else r.description),
+            'topic_id': r.topic_id,
+            'topic_name': topic.name if topic else None,
+            'topic_code': topic.code if topic else None,
+            'level': r.level,
+            'answer_type': r.answer_type,
+            'max_score': r.max_score,
+            'is_active': bool(r.is_active),
+            'created_at': r.created_at,
+            'stats': stats.get(r.id, empty_stats),
+        })
+
+    return {
+        'items': items,
+        'filters': filters,
+        'page': page,
+        'per_page': per_page,
+        'pages': pages,
+        'total': total,
+    }
+
 @admin_bp.route("/tasks", methods=["GET"])
 @login_required
 @admin_required
 def tasks():
-    topic_id = request.args.get('topic_id', type=int)
-
-    query = MathTask.query
-    if topic_id:
-        query = query.filter_by(topic_id=topic_id)
-    
-    items = query.order_by(MathTask.level.desc(), MathTask.id.desc()).all()
+    listing = _tasks_listing(request.args)
 
     # Для фильтра и форм
-    topics = Topic.query.order_by(Topic.name).all()
+    topics = get_topics()
     import_form = ImportFileForm()
     delete_form = ConfirmDeleteForm()
     
     return render_template(
         "admin/tasks.html", 
-        tasks=items,
+        tasks=listing['items'],
+        listing=listing,
         topics=topics,
+        level_choices=LEVEL_CHOICES,
+        answer_type_choices=ANSWER_TYPE_CHOICES,
+        per_page_choices=TASKS_PER_PAGE_CHOICES,
         import_form=import_form,
         delete_form=delete_form,
         active_tab="tasks"
     )
 
+@admin_bp.route("/api/tasks", methods=["GET"])
+@login_required
+@admin_required
+def api_tasks():
+    """JSON-вариант списка заданий для табличного компонента (те же параметры, что у /admin/tasks)."""
+    listing = _tasks_listing(request.args)
+    for item in listing['items']:
+        item['created_at'] = item['created_at'].isoformat() if item['created_at'] else None
+    return jsonify({'ok': True, **listing})
+
 # ----------- Preview answer JSON from form data -----------
 @admin_bp.route("/tasks/preview_answer_json", methods=["POST"])
 @login_required
@@ -759,7 +962,7 @@ def preview_answer_json():
     # Формируем форму из текущего POST без строгой валидации
     form = TaskForm()
     # choices для SelectField, чтобы форма корректно инициализировалась
-    form.topic_id.choices = [(t.id, f"{t.name} ({t.code})") for t in Topic.query.order_by(Topic.name).all()]
+    form.topic_id.choices = topic_choices(with_code=True)
     # Явная проверка типа ответа: для неизвестных типов возвращаем 400
     try:
         at = (form.answer_type.data or "").strip()
@@ -781,7 +984,7 @@ def preview_answer_json():
 @admin_required
 def create_task():
     form = TaskForm()
-    form.topic_id.choices = [(t.id, f"{t.name} ({t.code})") for t in Topic.query.order_by(Topic.name).all()]
+    form.topic_id.choices = topic_choices(with_code=True)
     
     # Принудительно создаём переменную, если нет
     try:
@@ -841,7 +1044,7 @@ def edit_task(task_id):
         from flask import abort
         abort(404)
     form = TaskForm(obj=task)
-    form.topic_id.choices = [(t.id, f"{t.name} ({t.code})") for t in Topic.query.order_by(Topic.name).all()]
+    form.topic_id.choices = topic_choices(with_code=True)
     delete_form = ConfirmDeleteForm()
 
     # Гарантируем, что есть хотя бы одна строка переменных для рендера
@@ -954,97 +1157,33 @@ def import_tasks():
         flash("Поддерживаются только .json", "error")
         return redirect(url_for("admin.tasks"))
 
-    try:
-        items = json.loads(f.read().decode("utf-8"))
-        if not isinstance(items, list):
-            raise ValueError("JSON должен содержать массив заданий")
-
-        created = 0
-        for i, item in enumerate(items, 1):
-            title = (item.get("title") or "").strip()
-            answer_type = item.get("answer_type")
-            correct_answer = item.get("correct_answer")
-            topic_code = item.get("topic_code")
-            topic_id = item.get("topic_id")
-
-            if not title or not answer_type or not correct_answer:
-                raise ValueError(f"Задание {i}: title, answer_type и correct_answer — обязательны")
-
-            # ищем тему (code предпочтительно)
-            topic = None
-            if topic_code:
-                topic = Topic.query.filter_by(code=topic_code).first()
-            if not topic and topic_id:
-                topic = db.session.get(Topic, topic_id)
-            if not topic:
-                raise ValueError(f"Задание {i}: тема не найдена (topic_code/topic_id)")
-
-            # минимальная валидация correct_answer
-            if not isinstance(correct_answer, dict) or "type" not in correct_answer:
-                raise ValueError(f"Задание {i}: correct_answer должен быть объектом с полем type")
-            ca_type = correct_answer.get("type")
-            if ca_type == "number" and not isinstance(correct_answer.get("value"), (int, float)):
-                raise ValueError(f"Задание {i}: для типа number требуется числовой value")
-            if ca_type == "sequence" and not isinstance(correct_answer.get("sequence_values"), list):
-                raise ValueError(f"Задание {i}: для типа sequence нужен список sequence_values")
-            if ca_type == "variables" and not isinstance(correct_answer.get("variables"), list):
-                raise ValueError(f"Задание {i}: для типа variables нужен список variables")
-            if ca_type == "interval":
-                if "start" not in correct_answer or "end" not in correct_answer:
-                    raise ValueError(f"Задание {i}: для типа interval нужны start/end")
-
-            # опциональный внешний код; проверим уникальность, если задан
-            code = (item.get("code") or "").strip() or None
-            if code and MathTask.query.filter_by(code=code).first():
-                raise ValueError(f"Задание {i}: код '{code}' уже используется")
-
-            task = MathTask(
-                title=title,
-                code=code,
-                description=item.get("description") or "",
-                answer_type=answer_type,
-                correct_answer=correct_answer,
-                answer_schema=item.get("answer_schema"),
-                explanation=item.get("explanation"),
-                topic_id=topic.id,
-                level=item.get("level") or "medium",
-                max_score=float(item.get("max_score", 1.0)),
-                created_by=current_user.id,
-                is_active=bool(item.get("is_active", True)),
-            )
-            db.session.add(task)
-            created += 1
-
-        db.session.commit()
-        flash(f"Импортировано заданий: {created}", "success")
-    except Exception as e:
-        current_app.logger.exception(e)
-        db.session.rollback()
-        flash(f"Ошибка импорта: {e}", "error")
-
-    return redirect(url_for("admin.tasks"))
+    # Проверка и запись — фоновой задачей; «Только проверить» (dry_run) ничего не пишет,
+    # а при отсутствии ошибок со страницы задачи тот же файл можно импортировать
+    dry_run = (request.form.get("dry_run") or "").lower() in ("1", "true", "on", "y")
+    job = jobs.submit("import_tasks", {"dry_run": dry_run}, user_id=current_user.id, upload=f)
+    return redirect(url_for("admin.job_detail", job_id=job.id))
 
 @admin_bp.route("/tasks/export", methods=["GET", "POST"])
 @login_required
 @admin_required
 def export_tasks():
     try:
+        ids = None
         if request.method == "POST":
             payload = request.get_json(silent=True) or {}
             ids = payload.get("task_ids") or []
             if not ids:
                 return jsonify({"success": False, "message": "Не выбрано ни одного задания"}), 400
-            tasks = MathTask.query.filter(MathTask.id.in_(ids)).all()
-        else:
-            tasks = MathTask.query.all()
 
-        export_data = [_serialize_task(t) for t in tasks]
-        resp = make_response(json.dumps(export_data, ensure_ascii=False, indent=2))
-        resp.headers["Content-Type"] = "application/json; charset=utf-8"
+        fmt, use_gzip = export_options(request.args)
+        if _wants_background():
+            job = jobs.submit("export_tasks", {"ids": ids, "format": fmt, "gzip": use_gzip},
+                              user_id=current_user.id)
+            return _job_started(job)
         fname = ("selected_tasks_export_" if request.method == "POST" else "all_tasks_export_") \
-                + datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
-        resp.headers["Content-Disposition"] = f'attachment; filename="{fname}"'
-        return resp
+                + datetime.now().strftime("%Y%m%d_%H%M%S")
+        return export_response(lambda: _task_export_rows(ids), fmt, fname,
+                               fields=TASK_EXPORT_FIELDS, use_gzip=use_gzip, kind="tasks")
     except Exception as e:
         current_app.logger.exception(e)
         if request.method == "POST":
@@ -1056,22 +1195,50 @@ def export_tasks():
 #                               П О Л Ь З О В А Т Е Л И
 # =============================================================================
 
+USERS_PER_PAGE_CHOICES = (100, 50, 200)
+
 @admin_bp.route("/users", methods=["GET"])
 @login_required
 @admin_required
 def users():
-    items = User.query.order_by(User.created_at.desc().nullslast(), User.id.desc()).all()
-
-    # словарь {user_id: count}
-    attempt_counts = dict(
-        db.session.query(TaskAttempt.user_id, func.count(TaskAttempt.id))
-                  .group_by(TaskAttempt.user_id).all()
-    )
+    q_text = (request.args.get("q") or "").strip()
+    role = (request.args.get("role") or "").strip()
+    per_page = request.args.get("per_page", type=int)
+    if per_page not in USERS_PER_PAGE_CHOICES:
+        per_page = USERS_PER_PAGE_CHOICES[0]
+    page = max(request.args.get("page", 1, type=int) or 1, 1)
+
+    # selectin-связи пользователя (все попытки, логи, прогресс) на этой странице не нужны
+    query = User.query.options(lazyload("*"))
+    if q_text:
+        pattern = _like_pattern(q_text)
+        query = query.filter(or_(*[col.ilike(pattern, escape="\\")
+                                   for col in (User.username, User.email, User.first_name, User.last_name)]))
+    if role:
+        query = query.filter(User.role == role)
+    pagination = (query.order_by(User.created_at.desc().nullslast(), User.id.desc())
+                       .paginate(page=page, per_page=per_page, error_out=False))
+
+    # Попытки и последняя активность — один GROUP BY только по пользователям страницы
+    attempt_counts, last_activity = {}, {}
+    ids = [u.id for u in pagination.items]
+    if ids:
+        for user_id, cnt, last_at in (
+                db.session.query(TaskAttempt.user_id, func.count(TaskAttempt.id), func.max(TaskAttempt.created_at))
+                          .filter(TaskAttempt.user_id.in_(ids))
+                          .group_by(TaskAttempt.user_id)):
+            attempt_counts[user_id] = cnt
+            last_activity[user_id] = last_at
 
     return render_template(
         "admin/users.html",
-        users=items,
+        users=pagination.items,
+        pagination=pagination,
         attempt_counts=attempt_counts,
+        last_activity=last_activity,
+        filters={"q": q_text, "role": role, "per_page": per_page},
+        per_page_choices=sorted(USERS_PER_PAGE_CHOICES),
+        role_choices=ROLE_CHOICES,
         import_form=ImportFileForm(),
         delete_form=ConfirmDeleteForm(),
         active_tab="users",
@@ -1184,45 +1351,10 @@ def import_users():
         flash("Поддерживаются только .json", "error")
         return redirect(url_for("admin.users"))
 
-    try:
-        items = json.loads(f.read().decode("utf-8"))
-        if not isinstance(items, list):
-            raise ValueError("JSON должен содержать массив пользователей")
-
-        created, skipped = 0, 0
-        for i, item in enumerate(items, 1):
-            username = (item.get("username") or "").strip()
-            role = item.get("role") or "student"
-            email = (item.get("email") or "").strip() or None
-            password = item.get("password")  # можно не передавать — сгенерируем
-
-            if not username:
-                raise ValueError(f"Элемент {i}: поле 'username' обязательно")
-            if role not in {"student", "teacher", "admin"}:
-                raise ValueError(f"Элемент {i}: недопустимая роль '{role}'")
-
-            if User.query.filter_by(username=username).first() or (email and User.query.filter_by(email=email).first()):
-                skipped += 1
-                continue
-
-            u = User(
-                username=username,
-                email=email,
-                role=role,
-                is_active=bool(item.get("is_active", True)),
-            )
-            _set_user_password(u, password or secrets.token_urlsafe(8))
-            db.session.add(u)
-            created += 1
-
-        db.session.commit()
-        flash(f"Импортировано пользователей: {created}. Пропущено (дубликаты): {skipped}", "success")
-    except Exception as e:
-        current_app.logger.exception(e)
-        db.session.rollback()
-        flash(f"Ошибка импорта: {e}", "error")
-
-    return redirect(url_for("admin.users"))
+    # Проверка, хеширование паролей пулом процессов и вставка — фоновой задачей:
+    # на тысячах учеников это минуты процессорного времени, не время запроса
+    job = jobs.submit("import_users", {}, user_id=current_user.id, upload=f)
+    return redirect(url_for("admin.job_detail", job_id=job.id))
 
 @admin_bp.route("/users/export", methods=["GET", "POST"])
 @login_required
@@ -1230,30 +1362,22 @@ def import_users():
 def export_users():
     """GET — экспорт всех; POST — экспорт выбранных (user_ids в JSON). Пароли не экспортируем."""
     try:
+        ids = None
         if request.method == "POST":
             payload = request.get_json(silent=True) or {}
             ids = payload.get("user_ids") or []
             if not ids:
                 return jsonify({"success": False, "message": "Не выбрано ни одного пользователя"}), 400
-            users = User.query.filter(User.id.in_(ids)).all()
-        else:
-            users = User.query.all()
-
-        export_data = [{
-            "id": u.id,
-            "username": u.username,
-            "email": getattr(u, "email", None),
-            "role": getattr(u, "role", None),
-            "is_active": getattr(u, "is_active", True),
-            "created_at": getattr(u, "created_at", None).isoformat() if getattr(u, "created_at", None) else None,
-        } for u in users]
-
-        resp = make_response(json.dumps(export_data, ensure_ascii=False, indent=2))
-        resp.headers["Content-Type"] = "application/json; charset=utf-8"
+
+        fmt, use_gzip = export_options(request.args)
+        if _wants_background():
+            job = jobs.submit("export_users", {"ids": ids, "format": fmt, "gzip": use_gzip},
+                              user_id=current_user.id)
+            return _job_started(job)
         fname = ("selected_users_export_" if request.method == "POST" else "all_users_export_") \
-                + datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
-        resp.headers["Content-Disposition"] = f'attachment; filename="{fname}"'
-        return resp
+                + datetime.now().strftime("%Y%m%d_%H%M%S")
+        return export_response(lambda: _user_export_rows(ids), fmt, fname,
+                               fields=USER_EXPORT_FIELDS, use_gzip=use_gzip, kind="users")
     except Exception as e:
         current_app.logger.exception(e)
         if request.method == "POST":
@@ -1266,6 +1390,42 @@ def export_users():
 #                             Ж У Р Н А Л   П О П Ы Т О К
 # =============================================================================
 
+def _attempt_filter_values(form) -> dict:
+    """Значения фильтров журнала простыми типами (0 == «Все» -> None), пригодные для JSON."""
+    def _id(field):
+        try:
+            return int(field.data) or None
+        except (TypeError, ValueError):
+            return None
+    return {
+        'student_id': _id(form.student_id),
+        'task_id': _id(form.task_id),
+        'topic_id': _id(form.topic_id),
+        'date_from': form.date_from.data.isoformat() if form.date_from.data else None,
+        'date_to': form.date_to.data.isoformat() if form.date_to.data else None,
+    }
+
+def _attempt_filter_clauses(values: dict) -> list:
+    """Условия WHERE по значениям из _attempt_filter_values (в т.ч. в фоновой задаче)."""
+    filters = []
+    if values.get('student_id'):
+        filters.append(TaskAttempt.user_id == values['student_id'])
+    if values.get('task_id'):
+        filters.append(TaskAttempt.task_id == values['task_id'])
+    if values.get('topic_id'):
+        filters.append(TaskAttempt.task_id.in_(
+            db.session.query(MathTask.id).filter(MathTask.topic_id == values['topic_id'])))
+    if values.get('date_from'):
+        filters.append(TaskAttempt.created_at >= datetime.fromisoformat(values['date_from']))
+    if values.get('date_to'):
+        filters.append(TaskAttempt.created_at < datetime.fromisoformat(values['date_to']) + timedelta(days=1))
+    return filters
+
+def _attempt_filters(form):
+    """Условия WHERE по форме фильтров журнала и ключ набора фильтров для кэшей."""
+    values = _attempt_filter_values(form)
+    return _attempt_filter_clauses(values), tuple(values.values())
+
 @admin_bp.route("/attempts", methods=["GET"])  # список с фильтрами + пагинация
 @login_required
 def attempts():
@@ -1275,39 +1435,33 @@ def attempts():
     form = AttemptFilterForm(request.args)
 
     # choices для фильтров
-    students = User.query.order_by(User.username.asc()).all()
-    tasks_q = MathTask.query.order_by(MathTask.title.asc())
-    topics = Topic.query.order_by(Topic.name.asc()).all()
-    form.student_id.choices = [(0, 'Все')] + [(u.id, u.username) for u in students]
-    form.task_id.choices    = [(0, 'Все')] + [(t.id, t.title) for t in tasks_q]
-    form.topic_id.choices   = [(0, 'Все')] + [(t.id, t.name) for t in topics]
-
-    q = (TaskAttempt.query
-         .join(User, TaskAttempt.user_id == User.id)
-         .join(MathTask, TaskAttempt.task_id == MathTask.id))
-
-    # Фильтры
-    if form.student_id.data and int(form.student_id.data) != 0:
-        q = q.filter(TaskAttempt.user_id == int(form.student_id.data))
-    if form.task_id.data and int(form.task_id.data) != 0:
-        q = q.filter(TaskAttempt.task_id == int(form.task_id.data))
-    if form.topic_id.data and int(form.topic_id.data) != 0:
-        q = q.filter(MathTask.topic_id == int(form.topic_id.data))
-    if form.date_from.data:
-        q = q.filter(TaskAttempt.created_at >= datetime.combine(form.date_from.data, datetime.min.time()))
-    if form.date_to.data:
-        q = q.filter(TaskAttempt.created_at < datetime.combine(form.date_to.data, datetime.min.time()) + timedelta(days=1))
-
-    # Сортировка: новые сверху
-    q = q.order_by(TaskAttempt.created_at.desc(), TaskAttempt.id.desc())
-
-    # Паджинация
+    # студенты и задачи — только выбранное значение, остальное через автодополнение
+    form.student_id.choices = [(0, 'Все')] + user_choice(form.student_id.data)
+    form.task_id.choices    = [(0, 'Все')] + task_choice(form.task_id.data)
+    form.topic_id.choices   = [(0, 'Все')] + topic_choices()
+
+    # Связи строк грузим одним JOIN'ом, а их собственные selectin-коллекции
+    # (все попытки пользователя/задачи, логи темы) не трогаем
+    q = TaskAttempt.query.options(
+        joinedload(TaskAttempt.user).lazyload('*'),
+        joinedload(TaskAttempt.task).lazyload('*'),
+        joinedload(TaskAttempt.task).joinedload(MathTask.topic_ref).lazyload('*'),
+    )
+
+    filters, filter_key = _attempt_filters(form)
+
+    # Паджинация по курсору (created_at, id): новые сверху, без OFFSET и точного COUNT
     try:
         per_page = int(request.args.get('per_page', form.per_page.data or 20))
     except Exception:
         per_page = 20
-    page = max(int(request.args.get('page', 1)), 1)
-    pagination = q.paginate(page=page, per_page=per_page, error_out=False)
+    per_page = min(max(per_page, 1), 100)
+    pagination = keyset_paginate(
+        q.filter(*filters), TaskAttempt.created_at, TaskAttempt.id, per_page,
+        cursor=request.args.get('cursor'), direction=request.args.get('dir', 'next'),
+    )
+    pagination.total = cached_count(('attempts',) + filter_key,
+                                    db.session.query(TaskAttempt.id).filter(*filters))
 
     return render_template(
         'admin/attempts.html',
@@ -1325,15 +1479,16 @@ def create_attempt():
         from flask import abort
         abort(403)
     form = CreateAttemptForm()
-    # Заполняем choices
-    form.user_id.choices = [(u.id, u.username) for u in User.query.order_by(User.username.asc()).all()]
-    form.task_id.choices = [(t.id, t.title) for t in MathTask.query.order_by(MathTask.title.asc()).all()]
 
     # Предзаполнение задачи из query (?task_id=...) и подстановка правильного ответа, если поле пустое
     preselect_task_id = request.args.get('task_id', type=int)
     if preselect_task_id and not form.task_id.data:
         form.task_id.data = preselect_task_id
 
+    # choices — только выбранные значения (валидация), список подгружается автодополнением
+    form.user_id.choices = user_choice(form.user_id.data)
+    form.task_id.choices = task_choice(form.task_id.data)
+
     if form.task_id.data and not form.user_answer.data:
         try:
             task_obj = db.session.get(MathTask, form.task_id.data)
@@ -1414,8 +1569,14 @@ def create_attempt():
             created_at=form.created_at.data or datetime.utcnow(),
             user_answer=ua_val,
         )
-        db.session.add(att)
-        db.session.commit()
+        try:
+            db.session.add(att)
+            invalidate_attempt_counters([(att.user_id, att.task_id)])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash(f'Попытка №{attempt_number} для этого студента и задачи уже существует', 'danger')
+            return render_template('admin/create_attempt.html', form=form, active_tab='attempts')
         flash('Попытка добавлена', 'success')
         return redirect(url_for('admin.attempts'))
 
@@ -1438,8 +1599,8 @@ def edit_attempt(attempt_id):
         abort(404)
 
     form = EditAttemptForm(obj=att)
-    form.user_id.choices = [(u.id, u.username) for u in User.query.order_by(User.username.asc()).all()]
-    form.task_id.choices = [(t.id, t.title) for t in MathTask.query.order_by(MathTask.title.asc()).all()]
+    form.user_id.choices = user_choice(form.user_id.data)
+    form.task_id.choices = task_choice(form.task_id.data)
 
     can_edit = (getattr(current_user, 'role', None) == 'admin')
 
@@ -1464,6 +1625,7 @@ def edit_attempt(attempt_id):
                     .first())
             attempt_number = (last.attempt_number + 1) if last and last.attempt_number else 1
 
+        old_pair = (att.user_id, att.task_id)
         att.user_id = form.user_id.data
         att.task_id = form.task_id.data
         att.attempt_number = int(attempt_number)
@@ -1474,7 +1636,13 @@ def edit_attempt(attempt_id):
         att.created_at = form.created_at.data or att.created_at
         att.user_answer = ua_val
 
-        db.session.commit()
+        try:
+            invalidate_attempt_counters([old_pair, (att.user_id, att.task_id)])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash(f'Попытка №{attempt_number} для этого студента и задачи уже существует', 'danger')
+            return redirect(url_for('admin.edit_attempt', attempt_id=attempt_id))
         flash('Изменения сохранены', 'success')
         return redirect(url_for('admin.attempts'))
 
@@ -1497,6 +1665,7 @@ def delete_attempt(attempt_id):
     if att is None:
         from flask import abort
         abort(404)
+    invalidate_attempt_counters([(att.user_id, att.task_id)])
     db.session.delete(att)
     db.session.commit()
     flash('Попытка удалена', 'success')
@@ -1505,41 +1674,23 @@ def delete_attempt(attempt_id):
 @admin_bp.route('/attempts/export', methods=['GET'])
 @login_required
 def export_attempts():
+    """Экспорт журнала по тем же фильтрам, что и список. ?format=json|ndjson|csv, ?gzip=1.
+    CSV совместим с импортом попыток (task_code, username, is_correct, ...)."""
+    # Как и список фоновых задач: админ и преподаватель; студенту — ни выгрузки, ни задачи в фоне
+    if getattr(current_user, "role", None) not in ("admin", "teacher"):
+        from flask import abort
+        abort(403)
     form = AttemptFilterForm(request.args)
-    q = TaskAttempt.query
-    # Применяем те же правила фильтрации, что и на списке (0 == «Все»)
-    if form.student_id.data and str(form.student_id.data).isdigit() and int(form.student_id.data) != 0:
-        q = q.filter(TaskAttempt.user_id == int(form.student_id.data))
-    if form.task_id.data and str(form.task_id.data).isdigit() and int(form.task_id.data) != 0:
-        q = q.filter(TaskAttempt.task_id == int(form.task_id.data))
-    if form.topic_id.data and str(form.topic_id.data).digits() if False else str(form.topic_id.data).isdigit() and int(form.topic_id.data) != 0:
-        q = q.join(MathTask).filter(MathTask.topic_id == int(form.topic_id.data))
-    if form.date_from.data:
-        q = q.filter(TaskAttempt.created_at >= datetime.combine(form.date_from.data, datetime.min.time()))
-    if form.date_to.data:
-        q = q.filter(TaskAttempt.created_at < datetime.combine(form.date_to.data, datetime.min.time()) + timedelta(days=1))
-
-    data = []
-    for a in q.order_by(TaskAttempt.created_at.desc(), TaskAttempt.id.desc()).all():
-        data.append({
-            'id': a.id,
-            'user_id': a.user_id,
-            'username': a.user.username if a.user else None,
-            'task_id': a.task_id,
-            'task_code': a.task.code if a.task else None,
-            'attempt_number': a.attempt_number,
-            'is_correct': a.is_correct,
-            'partial_score': a.partial_score,
-            'time_spent': a.time_spent,
-            'hints_used': a.hints_used,
-            'created_at': a.created_at.isoformat() if a.created_at else None,
-            'user_answer': a.user_answer,
-        })
-    resp = make_response(json.dumps(data, ensure_ascii=False, indent=2))
-    resp.headers["Content-Type"] = "application/json; charset=utf-8"
-    fname = "attempts_export_" + datetime.utcnow().strftime("%Y%m%d_%H%M%S") + ".json"
-    resp.headers["Content-Disposition"] = f'attachment; filename="{fname}"'
-    return resp
+    fmt, use_gzip = export_options(request.args)
+    if _wants_background():
+        job = jobs.submit("export_attempts",
+                          {"filters": _attempt_filter_values(form), "format": fmt, "gzip": use_gzip},
+                          user_id=current_user.id)
+        return _job_started(job)
+    filters, _ = _attempt_filters(form)
+    fname = "attempts_export_" + datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    return export_response(lambda: _attempt_export_rows(filters), fmt, fname,
+                           fields=ATTEMPT_EXPORT_FIELDS, use_gzip=use_gzip, kind="attempts")
 
 @admin_bp.route('/attempts/import', methods=['POST'])
 @login_required
@@ -1554,136 +1705,15 @@ def import_attempts():
         return redirect(url_for('admin.attempts'))
 
     f = form.file.data
-    if not f.filename.endswith('.json'):
-        flash('Поддерживаются только .json', 'danger')
+    fmt = detect_format(f.filename)
+    if fmt is None:
+        flash('Поддерживаются только .json, .csv и .ndjson', 'danger')
         return redirect(url_for('admin.attempts'))
 
-    # ---- helpers ------------------------------------------------------------
-    def _parse_created_at(val):
-        if not val:
-            return None
-        # Допускаем ISO8601 или 'YYYY-MM-DD HH:MM:SS'
-        try:
-            return datetime.fromisoformat(val)
-        except Exception:
-            pass
-        for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
-            try:
-                return datetime.strptime(val, fmt)
-            except Exception:
-                continue
-        return None
-
-    def _normalize_answer(val):
-        """Приводит ответ к пригодному для сохранения виду:
-        - если строка — пытаемся распарсить JSON, иначе возвращаем исходную строку
-        - если пустая строка/None — возвращаем None
-        - dict/list/числа/булевы — возвращаем как есть
-        """
-        if val is None:
-            return None
-        if isinstance(val, (dict, list, int, float, bool)):
-            return val
-        if isinstance(val, str):
-            s = val.strip()
-            if not s:
-                return None
-            try:
-                return json.loads(s)
-            except Exception:
-                return s
-        return val
-
-    try:
-        payload = json.loads(f.read().decode('utf-8'))
-        if not isinstance(payload, list):
-            raise ValueError('JSON должен содержать массив попыток')
-
-        created = 0
-        errors = 0
-        for i, item in enumerate(payload, start=1):
-            # === Схема: ожидаем task_code и username (импорт по внешним ключам) ===
-            task = None
-            code = (item.get('task_code') or '').strip()
-            if code:
-                task = MathTask.query.filter_by(code=code).first()
-            if not task and item.get('task_id'):
-                # fallback для старых файлов
-                try:
-                    task = db.session.get(MathTask, int(item['task_id']))
-                except Exception:
-                    task = None
-            if not task:
-                errors += 1
-                flash(f'Строка {i}: задача не найдена (task_code/task_id)', 'danger')
-                continue
-
-            user = None
-            username = (item.get('username') or '').strip()
-            if username:
-                user = User.query.filter_by(username=username).first()
-            if not user and item.get('user_id'):
-                # fallback для старых файлов
-                try:
-                    user = db.session.get(User, int(item['user_id']))
-                except Exception:
-                    user = None
-            if not user:
-                errors += 1
-                flash(f'Строка {i}: студент не найден (username/user_id)', 'danger')
-                continue
-
-            # Номер попытки: если отсутствует — следующий по паре (user, task)
-            attempt_number = item.get('attempt_number')
-            if not attempt_number:
-                last = (TaskAttempt.query
-                        .filter_by(user_id=user.id, task_id=task.id)
-                        .order_by(TaskAttempt.attempt_number.desc())
-                        .first())
-                attempt_number = (last.attempt_number + 1) if last and last.attempt_number else 1
-
-            # Время создания: допускаем ISO или простой формат; иначе now
-            created_at = _parse_created_at(item.get('created_at')) or datetime.utcnow()
-
-            # Ответ пользователя: допускаем JSON-строку; если нет — подставляем correct_answer задачи
-            ua = _normalize_answer(item.get('user_answer'))
-            if ua is None:
-                ua = _normalize_answer(getattr(task, 'correct_answer', None))
-
-            is_correct = bool(item.get('is_correct', False))
-
-            # === Расчёт баллов по единой политике ===
-            computed_partial = _compute_partial_score(task, int(attempt_number), is_correct)
-            try:
-                component_scores_value = float(getattr(task, 'max_score', 0) or 0)
-            except Exception:
-                component_scores_value = 0.0
-
-            att = TaskAttempt(
-                user_id=user.id,
-                task_id=task.id,
-                attempt_number=int(attempt_number),
-                is_correct=is_correct,
-                partial_score=computed_partial,
-                component_scores=component_scores_value,
-                time_spent=int(item.get('time_spent') or 0),
-                hints_used=int(item.get('hints_used') or 0),
-                created_at=created_at,
-                user_answer=ua,
-            )
-            db.session.add(att)
-            created += 1
-
-        db.session.commit()
-        if errors:
-            flash(f'Импортировано попыток: {created}. Ошибок: {errors}', 'warning')
-        else:
-            flash(f'Импортировано попыток: {created}', 'success')
-    except Exception as e:
-        current_app.logger.exception(e)
-        db.session.rollback()
-        flash(f'Ошибка импорта: {e}', 'danger')
-    return redirect(url_for('admin.attempts'))
+    # Файл сохраняется в каталог задачи, разбор и вставка идут в фоне;
+    # страница задачи показывает прогресс и итог
+    job = jobs.submit('import_attempts', {'format': fmt}, user_id=current_user.id, upload=f)
+    return redirect(url_for('admin.job_detail', job_id=job.id))
 
 
 # ---------------------------------------------------------------------------
@@ -1709,12 +1739,231 @@ def bulk_delete_attempts():
         if not id_list:
             return make_response('No valid ids', 400)
 
-        # Удаляем пачкой
-        TaskAttempt.query.filter(TaskAttempt.id.in_(id_list)).delete(synchronize_session=False)
-        db.session.commit()
+        # Удаляем пачками (счётчики затронутых пар пересоздадутся по оставшимся попыткам)
+        from services.attempt_purge import delete_attempts
+        delete_attempts(id_list)
         # Пустой ответ, как ожидает JS (resp.ok => reload)
         return ('', 204)
     except Exception as e:
         current_app.logger.exception(e)
         db.session.rollback()
         return make_response(f'Error: {e}', 500)
+
+@admin_bp.route('/attempts/purge', methods=['POST'])
+@login_required
+def purge_attempts_by_filter():
+    """Удаление всех попыток под фильтрами журнала (студент, тема, задача, даты) — фоновой задачей."""
+    if getattr(current_user, 'role', None) != 'admin':
+        from flask import abort
+        abort(403)
+    values = _attempt_filter_values(AttemptFilterForm(request.form))
+    if not any(values.values()):
+        flash('Задайте хотя бы один фильтр: удаление всего журнала этой кнопкой не выполняется', 'warning')
+        return redirect(url_for('admin.attempts'))
+    job = jobs.submit('purge_attempts', {'filters': values}, user_id=current_user.id)
+    return redirect(url_for('admin.job_detail', job_id=job.id))
+
+# =============================================================================
+#                         Ф О Н О В Ы Е   З А Д А Ч И
+# =============================================================================
+
+JOBS_LIST_LIMIT = 50
+IMPORT_REPORT_ERRORS = 200  # сколько построчных ошибок хранить в итоге задачи
+
+def _wants_background() -> bool:
+    """?background=1 в URL или {"background": true} в JSON-теле."""
+    if (request.args.get("background") or "").lower() in ("1", "true", "yes"):
+        return True
+    payload = request.get_json(silent=True)
+    return isinstance(payload, dict) and bool(payload.get("background"))
+
+def _job_started(job):
+    """202 + ссылки для XHR/JSON-запросов, иначе — переход на страницу задачи."""
+    if request.is_json or request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return jsonify({
+            "ok": True,
+            "job": job_to_dict(job),
+            "status_url": url_for("admin.api_job", job_id=job.id),
+            "page_url": url_for("admin.job_detail", job_id=job.id),
+        }), 202
+    return redirect(url_for("admin.job_detail", job_id=job.id))
+
+def _job_for_current_user(job_id: int):
+    """Админ видит все задачи, преподаватель — только свои."""
+    from flask import abort
+    role = getattr(current_user, "role", None)
+    if role not in ("admin", "teacher"):
+        abort(403)
+    job = jobs.get(job_id)
+    if job is None or (role != "admin" and job.created_by != current_user.id):
+        abort(404)
+    return job
+
+def _export_job(ctx, params, rows, fields, prefix):
+    fmt = params.get("format") or "json"
+    use_gzip = bool(params.get("gzip"))
+    name = export_filename(prefix + datetime.utcnow().strftime("%Y%m%d_%H%M%S"), fmt, use_gzip)
+    path = ctx.path(name)
+    count = write_export(path, rows, fmt, fields, use_gzip=use_gzip, kind=prefix.split("_", 1)[0],
+                        progress=lambda n: ctx.progress(n, message=f"Выгружено строк: {n}"))
+    ctx.set_result_file(path, name, export_mimetype(fmt, use_gzip))
+    return {"rows": count, "format": fmt, "gzip": use_gzip}
+
+@job_handler("export_attempts", "Экспорт попыток")
+def _export_attempts_job(ctx, params):
+    filters = _attempt_filter_clauses(params.get("filters") or {})
+    return _export_job(ctx, params, _attempt_export_rows(filters), ATTEMPT_EXPORT_FIELDS, "attempts_export_")
+
+@job_handler("export_tasks", "Экспорт заданий")
+def _export_tasks_job(ctx, params):
+    return _export_job(ctx, params, _task_export_rows(params.get("ids")), TASK_EXPORT_FIELDS, "tasks_export_")
+
+@job_handler("export_users", "Экспорт пользователей")
+def _export_users_job(ctx, params):
+    return _export_job(ctx, params, _user_export_rows(params.get("ids")), USER_EXPORT_FIELDS, "users_export_")
+
+@job_handler("export_topics", "Экспорт тем")
+def _export_topics_job(ctx, params):
+    return _export_job(ctx, params, _topic_export_rows(params.get("ids")), TOPIC_EXPORT_FIELDS, "topics_export_")
+
+@job_handler("import_attempts", "Импорт попыток")
+def _import_attempts_job(ctx, params):
+    def _progress(report):
+        ctx.progress(report.total, message=f"Создано: {report.created}, ошибок: {report.error_count}")
+
+    path = params["upload_path"]
+    try:
+        with open(path, "rb") as fh:
+            report = import_attempts_stream(fh, params["format"], progress=_progress)
+    finally:
+        # загруженный файл больше не нужен — итог хранится в задаче
+        if os.path.exists(path):
+            os.remove(path)
+    ctx.progress(report.total, force=True)
+    return report.as_dict(max_errors=IMPORT_REPORT_ERRORS)
+
+@job_handler("import_tasks", "Импорт заданий")
+def _import_tasks_job(ctx, params):
+    from services.task_import import import_tasks as import_task_items  # только в потоке фоновой задачи
+    path = params["upload_path"]
+    dry_run = bool(params.get("dry_run"))
+    try:
+        with open(path, "rb") as fh:
+            items = json.load(fh)
+        if not isinstance(items, list):
+            raise ValueError("JSON должен содержать массив заданий")
+
+        def _progress(report):
+            if report.created:   # этап записи
+                ctx.progress(report.created, total=report.valid, message="Запись заданий", force=True)
+            else:                # проверка завершена
+                ctx.progress(report.total, total=report.total, force=True,
+                             message=f"Проверено заданий: {report.total}, ошибок: {report.error_count}")
+
+        report = import_task_items(items, ctx.user_id, dry_run=dry_run, progress=_progress)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    # файл пробного прогона без ошибок оставляем — его можно импортировать со страницы задачи
+    if not (dry_run and not report.errors) and os.path.exists(path):
+        os.remove(path)
+    result = report.as_dict(max_errors=IMPORT_REPORT_ERRORS)
+    result["can_apply"] = dry_run and not report.errors
+    return result
+
+@job_handler("purge_attempts", "Удаление попыток")
+def _purge_attempts_job(ctx, params):
+    from services.attempt_purge import purge_attempts as purge_attempt_rows
+
+    def _progress(report):
+        ctx.progress(report.deleted, total=report.total, message=f"Удалено попыток: {report.deleted}")
+
+    report = purge_attempt_rows(_attempt_filter_clauses(params.get("filters") or {}), progress=_progress)
+    ctx.progress(report.deleted, total=report.total, force=True)
+    return report.as_dict()
+
+@job_handler("import_users", "Импорт пользователей")
+def _import_users_job(ctx, params):
+    # user_import тянет multiprocessing (пул хеширования паролей) — веб-воркеру при старте он не нужен
+    from services.user_import import import_users as import_user_items
+
+    def _progress(report, stage):
+        if stage == "validate":
+            # дальше прогресс — созданные из тех, что прошли проверку
+            ctx.progress(0, total=report.total - report.skipped - report.error_count, force=True,
+                         message=f"Проверено: {report.total}, дубликатов: {report.skipped}, ошибок: {report.error_count}")
+        elif stage == "hash":
+            ctx.progress(0, message=f"Пароли захешированы за {report.hash_seconds:.1f} с", force=True)
+        else:
+            ctx.progress(report.created, message=f"Создано пользователей: {report.created}")
+
+    path = params["upload_path"]
+    try:
+        with open(path, "rb") as fh:
+            items = json.load(fh)
+        if not isinstance(items, list):
+            raise ValueError("JSON должен содержать массив пользователей")
+        report = import_user_items(items, workers=current_app.config.get("USER_IMPORT_HASH_WORKERS") or None,
+                                   progress=_progress)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    ctx.progress(report.created, force=True)
+    return report.as_dict(max_errors=IMPORT_REPORT_ERRORS)
+
+@admin_bp.route("/jobs/<int:job_id>/apply", methods=["POST"])
+@login_required
+@admin_required
+def job_apply(job_id):
+    """Импорт файла, успешно прошедшего пробный прогон (без повторной загрузки)."""
+    job = _job_for_current_user(job_id)
+    params = job.params or {}
+    path = params.get("upload_path")
+    if (job.kind != "import_tasks" or job.status != "succeeded" or not (job.result or {}).get("can_apply")
+            or not path or not os.path.exists(path)):
+        flash("Этот файл нельзя импортировать: нужна успешная проверка без ошибок", "warning")
+        return redirect(url_for("admin.job_detail", job_id=job.id))
+    new_job = jobs.submit("import_tasks", {"upload_path": path, "upload_name": params.get("upload_name"),
+                                           "dry_run": False, "checked_by_job": job.id},
+                          user_id=current_user.id)
+    return redirect(url_for("admin.job_detail", job_id=new_job.id))
+
+@admin_bp.route("/jobs", methods=["GET"])
+@login_required
+def jobs_list():
+    role = getattr(current_user, "role", None)
+    if role not in ("admin", "teacher"):
+        from flask import abort
+        abort(403)
+    q = BackgroundJob.query
+    if role != "admin":
+        q = q.filter(BackgroundJob.created_by == current_user.id)
+    items = q.order_by(BackgroundJob.id.desc()).limit(JOBS_LIST_LIMIT).all()
+    return render_template("admin/jobs.html", jobs=[job_to_dict(j) for j in items])
+
+@admin_bp.route("/jobs/<int:job_id>", methods=["GET"])
+@login_required
+def job_detail(job_id):
+    job = _job_for_current_user(job_id)
+    return render_template("admin/job_detail.html", job=job_to_dict(job),
+                           status_url=url_for("admin.api_job", job_id=job.id))
+
+@admin_bp.route("/api/jobs/<int:job_id>", methods=["GET"])
+@login_required
+def api_job(job_id):
+    job = _job_for_current_user(job_id)
+    data = job_to_dict(job)
+    if data["has_file"] and job.status == "succeeded":
+        data["download_url"] = url_for("admin.job_download", job_id=job.id)
+    return jsonify({"ok": True, "job": data})
+
+@admin_bp.route("/jobs/<int:job_id>/download", methods=["GET"])
+@login_required
+def job_download(job_id):
+    from flask import abort
+    job = _job_for_current_user(job_id)
+    if job.status != "succeeded" or not job.result_path or not os.path.exists(job.result_path):
+        abort(404)
+    return send_file(job.result_path, mimetype=job.result_mimetype, as_attachment=True,
+                     download_name=job.result_name)
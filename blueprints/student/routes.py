@@ -5,6 +5,8 @@ from datetime import datetime, date, time, timedelta
 
 from extensions import db
 from models import Topic, MathTask, TaskAttempt, StudentTopicProgress, TopicLevelConfig
+from services.submission import MAX_ATTEMPTS, load_task_status, status_from_attempts, submit_answer
+from services.catalog import get_topics
 from .forms import UpdateProfileForm, ChangePasswordForm
 
 
@@ -20,7 +22,7 @@ def tasks():
         return redirect(url_for('main.dashboard'))
 
     # Все темы для селекта
-    topics = Topic.query.order_by(Topic.name.asc()).all()
+    topics = get_topics()
 
     topic_id = request.args.get('topic_id', type=int)
     status = request.args.get('status', default='all')  # 'all' | 'solved' | 'pending'
@@ -397,20 +399,36 @@ def _canonical_expected(task: MathTask):
     return ca
 
 
-def _user_task_stats(user_id: int, task_id: int):
-    q = (db.session.query(
-            func.count(TaskAttempt.id).label('cnt'),
-            func.sum(case((TaskAttempt.is_correct == False, 1), else_=0)).label('incorrect_cnt'),
-            func.max(func.cast(TaskAttempt.is_correct, db.Integer)).label('solved')
-        )
-        .filter(TaskAttempt.user_id == user_id, TaskAttempt.task_id == task_id)
+HISTORY_LIMIT = 20
+
+
+def _pick_next_task(user_id: int, task: MathTask):
+    """Случайная активная задача той же темы/уровня, не текущая, исключая решенные и заблокированные."""
+    subq_attempts = (db.session.query(
+        TaskAttempt.task_id,
+        func.sum(case((TaskAttempt.is_correct == False, 1), else_=0)).label('incorrect_cnt'),
+        func.max(func.cast(TaskAttempt.is_correct, db.Integer)).label('solved')
     )
-    row = q.one()
-    cnt = int(row.cnt or 0)
-    incorrect = int(row.incorrect_cnt or 0)
-    solved = bool(row.solved)
-    blocked = (incorrect >= 3) and (not solved)
-    return cnt, incorrect, solved, blocked
+    .filter(TaskAttempt.user_id == user_id)
+    .group_by(TaskAttempt.task_id)
+    ).subquery()
+
+    return (MathTask.query
+            .filter_by(topic_id=task.topic_id, level=task.level, is_active=True)
+            .filter(MathTask.id != task.id)
+            .outerjoin(subq_attempts, MathTask.id == subq_attempts.c.task_id)
+            .filter(~( (func.coalesce(subq_attempts.c.solved, 0) == 1) |
+                      ((func.coalesce(subq_attempts.c.incorrect_cnt, 0) >= 3) & (func.coalesce(subq_attempts.c.solved, 0) == 0)) ))
+            .order_by(func.random())
+            .first())
+
+
+def _check_submission(task: MathTask, form):
+    """Извлекает ответ из формы и сверяет с эталоном. Возвращает (given, is_correct)."""
+    user_answer = _extract_user_answer(task, form)
+    expected = _normalize_answer(_canonical_expected(task))
+    given = _normalize_answer(user_answer)
+    return given, _answers_equal(expected, given)
 
 
 @student_bp.route('/tasks/<int:task_id>', methods=['GET', 'POST'])
@@ -424,113 +442,121 @@ def view_task(task_id: int):
         flash('Задача не найдена или недоступна', 'error')
         return redirect(url_for('student.tasks'))
 
-    # Определим уровень/тему для связанной логики и следующей задачи
-    topic_id = task.topic_id
-    level = task.level
-
-    # Статистика пользователя по этой задаче
-    total_cnt, incorrect_cnt, solved, blocked = _user_task_stats(current_user.id, task.id)
-
     if request.method == 'POST':
+        # Состояние до записи: один агрегат, дальше всё считается в памяти
+        status = load_task_status(current_user.id, task.id)
         # Запрет если уже решено или заблокировано
-        if solved or blocked:
+        if not status.can_submit:
             flash('Отправка ответа недоступна для этой задачи', 'warning')
             return redirect(url_for('student.view_task', task_id=task.id))
 
-        user_answer = _extract_user_answer(task, request.form)
-        expected = _normalize_answer(_canonical_expected(task))
-        given = _normalize_answer(user_answer)
-
-        # Определяем попытку
-        attempt_number = total_cnt + 1
-        is_correct = _answers_equal(expected, given)
-
-        # Записываем попытку
-        db.session.add(TaskAttempt(
-            user_id=current_user.id,
-            task_id=task.id,
-            user_answer=given,
-            is_correct=is_correct,
-            partial_score=0,
-            attempt_number=attempt_number,
-        ))
-        db.session.commit()
+        given, is_correct = _check_submission(task, request.form)
+        result = submit_answer(current_user.id, task, given, is_correct, status=status)
 
-        # Пересчитаем состояние после записи
-        total_cnt, incorrect_cnt, solved, blocked = _user_task_stats(current_user.id, task.id)
-
-        # Flash результат
-        if is_correct:
-            # вычислим скор (для отображения), используя TopicLevelConfig.penalty_weights
-            score = 1.0
-            if attempt_number == 1:
-                score = 1.0
-            elif attempt_number in (2, 3):
-                conf = TopicLevelConfig.query.filter_by(topic_id=topic_id, level=level).first()
-                if conf and isinstance(conf.penalty_weights, list):
-                    idx = attempt_number - 2  # 0 для 2-й, 1 для 3-й
-                    if 0 <= idx < len(conf.penalty_weights):
-                        try:
-                            w = float(conf.penalty_weights[idx])
-                            score = max(0.0, min(1.0, w))
-                        except Exception:
-                            score = 0.0
-                else:
-                    score = 0.0
-            flash(f'Верно! Набрано баллов: {score:.2f}', 'success')
+        # Flash результат (балл посчитан конвейером по TopicLevelConfig.penalty_weights)
+        if result.is_correct:
+            flash(f'Верно! Набрано баллов: {result.score:.2f}', 'success')
         else:
             flash('Неверно. Попробуйте еще раз.', 'error')
 
-        return redirect(url_for('student.view_task', task_id=task.id))
+        return redirect(url_for('student.view_task', task_id=task_id))
 
-    # Подсказка доступна, если есть хотя бы одна неуспешная попытка
-    hint_available = incorrect_cnt >= 1
-
-    # Подберем «следующую» задачу: случайная активная той же темы/уровня, не текущая, исключая решенные и заблокированные
-    next_task = None
-    if solved:
-        subq_attempts = (db.session.query(
-            TaskAttempt.task_id,
-            func.sum(case((TaskAttempt.is_correct == False, 1), else_=0)).label('incorrect_cnt'),
-            func.max(func.cast(TaskAttempt.is_correct, db.Integer)).label('solved')
-        )
-        .filter(TaskAttempt.user_id == current_user.id)
-        .group_by(TaskAttempt.task_id)
-        ).subquery()
-
-        candidates = (MathTask.query
-                      .filter_by(topic_id=topic_id, level=level, is_active=True)
-                      .filter(MathTask.id != task.id)
-                      .outerjoin(subq_attempts, MathTask.id == subq_attempts.c.task_id)
-                      .filter(~( (func.coalesce(subq_attempts.c.solved, 0) == 1) |
-                                ((func.coalesce(subq_attempts.c.incorrect_cnt, 0) >= 3) & (func.coalesce(subq_attempts.c.solved, 0) == 0)) ))
-                      .order_by(func.random())
-                      .first())
-        next_task = candidates
+    # История попыток для отображения; если она неполная (меньше лимита),
+    # статистику считаем по ней же и не делаем отдельный агрегирующий запрос
+    user_attempts = (TaskAttempt.query
+                     .filter_by(user_id=current_user.id, task_id=task.id)
+                     .order_by(TaskAttempt.created_at.desc())
+                     .limit(HISTORY_LIMIT)
+                     .all())
+    if len(user_attempts) < HISTORY_LIMIT:
+        status = status_from_attempts(user_attempts)
+    else:
+        status = load_task_status(current_user.id, task.id)
 
     # Если задача заблокирована и не решена — запретим просмотр карточки
-    if blocked and not solved and request.method == 'GET':
+    if status.blocked:
         flash('Задача заблокирована после 3 неудачных попыток', 'warning')
         return redirect(url_for('student.tasks', topic_id=task.topic_id))
 
-    # История попыток для отображения
-    user_attempts = (TaskAttempt.query
-                     .filter_by(user_id=current_user.id, task_id=task.id)
-                     .order_by(TaskAttempt.created_at.desc())
-                     .limit(20)
-                     .all())
+    # Подсказка доступна, если есть хотя бы одна неуспешная попытка
+    hint_available = status.incorrect >= 1
+
+    # «Следующая» задача нужна только после решения
+    next_task = _pick_next_task(current_user.id, task) if status.solved else None
 
     return render_template('student/task_view.html',
                            task=task,
-                           solved=solved,
-                           blocked=blocked,
-                           total_attempts=total_cnt,
-                           incorrect_attempts=incorrect_cnt,
+                           solved=status.solved,
+                           blocked=status.blocked,
+                           total_attempts=status.attempts,
+                           incorrect_attempts=status.incorrect,
                            hint_available=hint_available,
                            user_attempts=user_attempts,
                            next_task=next_task)
 
 
+@student_bp.route('/tasks/<int:task_id>/submit', methods=['POST'])
+@login_required
+def submit_task(task_id: int):
+    """JSON-вариант отправки ответа: один запрос вместо POST → redirect → GET.
+    Принимает те же поля, что и форма страницы задачи (form-data или JSON-объект).
+    """
+    if current_user.role != 'student':
+        return jsonify({"ok": False, "error": "forbidden"}), 403
+
+    task = db.session.get(MathTask, task_id)
+    if not task or not task.is_active:
+        return jsonify({"ok": False, "error": "not_found"}), 404
+
+    # Значения для ответа берём до коммита, чтобы не перечитывать задачу после него
+    topic_id, explanation = task.topic_id, task.explanation
+    status = load_task_status(current_user.id, task.id)
+    result = given = None
+    if status.can_submit:
+        form = request.form if request.form else (request.get_json(silent=True) or {})
+        given, is_correct = _check_submission(task, form)
+        result = submit_answer(current_user.id, task, given, is_correct, status=status)
+        status = result.status
+
+    if result is None or not result.accepted:
+        return jsonify({
+            "ok": False,
+            "error": "submission_closed",
+            "message": 'Отправка ответа недоступна для этой задачи',
+            "solved": status.solved,
+            "blocked": status.blocked,
+            "attempts": status.attempts,
+            "remaining_attempts": status.remaining,
+        }), 409
+
+    next_task = _pick_next_task(current_user.id, task) if status.solved else None
+
+    return jsonify({
+        "ok": True,
+        "task_id": task_id,
+        "is_correct": result.is_correct,
+        "score": result.score,
+        "attempt_number": result.attempt_number,
+        "attempts": status.attempts,
+        "max_attempts": MAX_ATTEMPTS,
+        "remaining_attempts": status.remaining,
+        "solved": status.solved,
+        "blocked": status.blocked,
+        "hint": explanation if (status.incorrect >= 1 and status.can_submit and explanation) else None,
+        "next_task_id": next_task.id if next_task else None,
+        "next_task_url": url_for('student.view_task', task_id=next_task.id) if next_task else None,
+        "tasks_url": url_for('student.tasks', topic_id=topic_id),
+        "message": (f'Верно! Набрано баллов: {result.score:.2f}' if result.is_correct
+                    else 'Неверно. Попробуйте еще раз.'),
+        "attempt": {
+            "attempt_number": result.attempt_number,
+            "created_at": result.created_at.strftime('%Y-%m-%d %H:%M:%S') if result.created_at else None,
+            "user_answer": given,
+            "is_correct": result.is_correct,
+        },
+    })
+
+
 # ---------- Profile stats (weekly JSON) ----------
 @student_bp.route('/profile/stats.json', methods=['GET'])
 @login_required
@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from models import MathTask, TaskAttempt, Topic, User, db
+from services.submission import allocate_attempt, invalidate_attempt_counters
+from services.catalog import get_topics
 from datetime import datetime
 import json
 
@@ -216,25 +219,39 @@ def solve_task(task_id):
         # Проверяем правильность ответа
         is_correct, score = check_answer_correctness(user_answer_data, task.correct_answer, task.max_score)
         
-        # Подсчитываем номер попытки
-        attempt_number = TaskAttempt.query.filter_by(
-            user_id=current_user.id,
-            task_id=task_id
-        ).count() + 1
-        
-        # Сохраняем попытку
-        attempt = TaskAttempt(
-            user_id=current_user.id,
-            task_id=task_id,
-            user_answer=user_answer_data,
-            is_correct=is_correct,
-            partial_score=score,
-            attempt_number=attempt_number,
-            created_at=datetime.utcnow()
-        )
-        
-        db.session.add(attempt)
-        db.session.commit()
+        for retry in (False, True):
+            try:
+                # Атомарно резервируем номер попытки (счётчик по паре студент/задача)
+                allocated = allocate_attempt(current_user.id, task_id, is_correct)
+                if allocated is None:
+                    db.session.rollback()
+                    return render_template('shared/solve_task_error.html',
+                                         task=task,
+                                         error='Отправка ответа недоступна: задача уже решена или заблокирована')
+                attempt_number, _status = allocated
+
+                # Сохраняем попытку
+                attempt = TaskAttempt(
+                    user_id=current_user.id,
+                    task_id=task_id,
+                    user_answer=user_answer_data,
+                    is_correct=is_correct,
+                    partial_score=score,
+                    attempt_number=attempt_number,
+                    created_at=datetime.utcnow()
+                )
+
+                db.session.add(attempt)
+                db.session.commit()
+                break
+            except IntegrityError:
+                # Счётчик отстал от попыток, добавленных в обход него, — пересоздаём
+                # его по фактическим строкам и пробуем ещё раз (как в submit_answer)
+                db.session.rollback()
+                if retry:
+                    raise
+                invalidate_attempt_counters([(current_user.id, task_id)])
+                db.session.commit()
         
         return render_template('shared/solve_task_result.html',
                              task=task,
@@ -292,7 +309,7 @@ def create_task():
             errors.append('Неверный формат числовых значений')
         
         if errors:
-            topics = Topic.query.all()
+            topics = get_topics()
             return render_template('teacher/create_task.html', errors=errors, topics=topics)
         
         try:
@@ -317,10 +334,10 @@ def create_task():
             
         except Exception as e:
             db.session.rollback()
-            topics = Topic.query.all()
+            topics = get_topics()
             return render_template('teacher/create_task.html', 
                                  errors=[f'Ошибка при создании задания: {str(e)}'], topics=topics)
     
     # GET запрос - показываем форму создания
-    topics = Topic.query.all()
+    topics = get_topics()
     return render_template('teacher/create_task.html', topics=topics)
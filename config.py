@@ -20,3 +20,5 @@ class Config:
     SESSION_COOKIE_SECURE = False   # True в проде (HTTPS)
     WTF_CSRF_TIME_LIMIT = None
     WTF_CSRF_HEADERS = ["X-CSRFToken"]  # твой фронт шлёт именно так
+    # процессов для хеширования паролей при импорте пользователей (0 — по числу CPU)
+    USER_IMPORT_HASH_WORKERS = int(os.getenv("USER_IMPORT_HASH_WORKERS", "0"))
@@ -4,12 +4,21 @@ from sqlalchemy import event
 from sqlalchemy.engine import Engine
 from flask_login import LoginManager
 from flask_wtf import CSRFProtect
-from flask_migrate import Migrate
+
+from services.cache import Cache
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 csrf = CSRFProtect()
-migrate = Migrate()
+# Кэш приложения: LRU процесса + общий уровень для воркеров (services/cache.py)
+cache = Cache()
+
+
+def init_migrate(app):
+    """Flask-Migrate нужен только командам `flask db ...`, а его импорт тянет alembic
+    (заметная доля старта процесса) — поэтому подключаем его по требованию."""
+    from flask_migrate import Migrate
+    Migrate(app, db)
 
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
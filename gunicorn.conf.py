@@ -0,0 +1,131 @@
+# gunicorn.conf.py — боевой профиль (gunicorn -c gunicorn.conf.py wsgi:app).
+# gunicorn подхватывает этот файл и сам, если запущен из корня проекта.
+# Любой параметр переопределяется переменной окружения (см. ниже) или флагом CLI.
+#
+# - preload_app: приложение строится один раз в мастере, воркеры получают его
+#   через fork (быстрый старт и перезапуск воркеров, общая память под код).
+#   Соединения с БД после fork не наследуем — см. post_fork.
+# - gthread: каждый воркер — процесс с пулом потоков; запросы в основном ждут БД,
+#   поэтому потоки дешевле процессов. Воркеров по умолчанию 2, а не по числу CPU:
+#   в контейнере cpu_count() — ядра хоста, и столько копий приложения не влезут
+#   в 512 МБ тарифа Render. Больше — через WEB_CONCURRENCY.
+# - max_requests + jitter: воркер перезапускается после ~N запросов (защита от
+#   роста памяти), разброс не даёт всем воркерам уйти на рестарт одновременно.
+#   Фоновые задачи (services.jobs) выполняются в пуле потоков того же воркера и
+#   умерли бы вместе с ним, оставшись «выполняется» до JOBS_STALE_SECONDS, поэтому
+#   плановый перезапуск откладывается, пока в пуле воркера есть задачи (pre_request).
+#   Остановку воркера (деплой, SIGTERM, таймаут) задача всё равно не переживает —
+#   её пометит прерванной проверка «пульса».
+# - timeout: в gthread это «пульс» главного цикла воркера, а не лимит на запрос;
+#   graceful_timeout выбран с запасом под медленные действия админки (синхронный
+#   предпросмотр оценивания, потоковый экспорт) — они успевают завершиться
+#   при перезапуске воркера. Тяжёлое и так уходит в фоновые задачи (services.jobs).
+# - шаблоны: при preload мастер компилирует все шаблоны Jinja до fork (when_ready),
+#   новый или перезапущенный воркер отвечает без компиляции — см. services.template_cache.
+# - метрики (/metrics): у каждого воркера свой реестр, снимки складываются
+#   в METRICS_DIR (по умолчанию в /dev/shm) и суммируются при чтении — см. services.metrics.
+# - кэш приложения: общий уровень для воркеров — CACHE_URL (по умолчанию файл SQLite
+#   в /dev/shm, очищается при старте; redis://... — общий для нескольких машин), см. services.cache.
+import os
+import tempfile
+
+
+def _int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+# WEB_CONCURRENCY — общепринятое имя на Render/Heroku
+workers = _int("WEB_CONCURRENCY", 2)
+threads = _int("GUNICORN_THREADS", 4)
+
+max_requests = _int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = _int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+
+timeout = _int("GUNICORN_TIMEOUT", 120)
+graceful_timeout = _int("GUNICORN_GRACEFUL_TIMEOUT", 120)
+keepalive = _int("GUNICORN_KEEPALIVE", 5)
+
+# «Пульс» воркеров — в памяти, а не на диске контейнера (иначе возможны ложные таймауты)
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+# forwarded_allow_ips не задаём: по умолчанию gunicorn доверяет X-Forwarded-* только
+# от 127.0.0.1 или адресам из FORWARDED_ALLOW_IPS — её задают в окружении площадки
+
+# Каталог снимков метрик воркеров; задаём до загрузки приложения (preload читает его из env)
+metrics_dir = os.environ.setdefault(
+    "METRICS_DIR",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                 f"app-metrics-{bind.rsplit(':', 1)[-1]}"))
+
+cache_url = os.environ.setdefault(
+    "CACHE_URL",
+    "sqlite:///" + os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                                f"app-cache-{bind.rsplit(':', 1)[-1]}.db"))
+
+
+def on_starting(server):
+    """Снимки прошлого запуска не должны попасть в счётчики нового, а его кэш — в новый код."""
+    from services import metrics
+    from services.cache import make_backend
+    metrics.clear_directory(metrics_dir)
+    backend = make_backend(cache_url)
+    if backend is not None and not cache_url.startswith(("redis", "unix")):   # Redis может быть общим
+        backend.clear()
+
+
+def when_ready(server):
+    """Мастер (preload): шаблоны компилируются один раз, воркеры наследуют их через fork."""
+    if not preload_app:
+        return
+    from wsgi import app
+    from services import template_cache
+    report = template_cache.precompile(app)
+    server.log.info("templates precompiled: %d in %.0f ms", report.compiled, report.seconds * 1000)
+
+
+def post_fork(server, worker):
+    """Пул соединений, открытых мастером при preload, воркеру не принадлежит:
+    забываем его (не закрывая чужие сокеты), воркер откроет свои соединения."""
+    if not preload_app:
+        return
+    from wsgi import app
+    from extensions import db
+    from services import metrics
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    # то, что мастер насчитал при загрузке, иначе попало бы в сумму каждого воркера
+    metrics.registry.reset()
+
+
+def pre_request(worker, req):
+    """Откладывает перезапуск по max_requests, пока в пуле воркера идут фоновые задачи:
+    лимит сдвигается на запрос вперёд, воркер уйдёт на рестарт после их завершения."""
+    if worker.nr + 1 < worker.max_requests:
+        return
+    from services.jobs import jobs
+    if jobs.active():
+        worker.max_requests = worker.nr + 2
+
+
+def worker_exit(server, worker):
+    """Последний снимок воркера — до выхода, чтобы не потерять хвост счётчиков."""
+    from services import metrics
+    metrics.flush(metrics_dir)
+
+
+def child_exit(server, worker):
+    """Мастер: снимок завершившегося воркера — в общий архив (счётчики не «откатываются»)."""
+    from services import metrics
+    metrics.mark_process_dead(worker.pid, metrics_dir)
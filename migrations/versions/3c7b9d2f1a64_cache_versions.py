@@ -0,0 +1,30 @@
+"""cache_versions table for the topic/task catalogue cache
+
+Revision ID: 3c7b9d2f1a64
+Revises: 8a4f2e61d7c5
+Create Date: 2026-10-19 12:14:05.118904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7b9d2f1a64'
+down_revision = '8a4f2e61d7c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_versions = op.create_table(
+        'cache_versions',
+        sa.Column('namespace', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('namespace'),
+    )
+    op.bulk_insert(cache_versions, [{'namespace': 'catalog', 'version': 1}])
+
+
+def downgrade():
+    op.drop_table('cache_versions')
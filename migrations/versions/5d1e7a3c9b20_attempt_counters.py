@@ -0,0 +1,72 @@
+"""attempt counters and unique attempt numbers
+
+Revision ID: 5d1e7a3c9b20
+Revises: bcfcc4b471a4
+Create Date: 2026-10-19 10:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1e7a3c9b20'
+down_revision = 'bcfcc4b471a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_attempt_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('attempts_count', sa.Integer(), nullable=False),
+    sa.Column('last_attempt_number', sa.Integer(), nullable=False),
+    sa.Column('incorrect_count', sa.Integer(), nullable=False),
+    sa.Column('solved', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['math_tasks.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'task_id')
+    )
+
+    # Перед уникальным индексом перенумеруем пары (user, task), где номера уже повторяются:
+    # номер = порядковый номер строки внутри пары по id
+    op.execute("""
+        UPDATE task_attempts
+        SET attempt_number = (
+            SELECT COUNT(*) FROM task_attempts t2
+            WHERE t2.user_id = task_attempts.user_id
+              AND t2.task_id = task_attempts.task_id
+              AND t2.id <= task_attempts.id
+        )
+        WHERE (user_id, task_id) IN (
+            SELECT user_id, task_id FROM task_attempts
+            WHERE attempt_number IS NOT NULL
+            GROUP BY user_id, task_id, attempt_number
+            HAVING COUNT(*) > 1
+        )
+    """)
+
+    with op.batch_alter_table('task_attempts', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_attempt_user_task_number', ['user_id', 'task_id', 'attempt_number'])
+
+    # Счётчики заполняем сразу, чтобы первая отправка не пересчитывала агрегаты
+    op.execute("""
+        INSERT INTO task_attempt_counters
+            (user_id, task_id, attempts_count, last_attempt_number, incorrect_count, solved)
+        SELECT user_id, task_id,
+               COUNT(*),
+               CASE WHEN COUNT(*) > MAX(COALESCE(attempt_number, 0))
+                    THEN COUNT(*) ELSE MAX(COALESCE(attempt_number, 0)) END,
+               SUM(CASE WHEN is_correct THEN 0 ELSE 1 END),
+               MAX(CASE WHEN is_correct THEN 1 ELSE 0 END) = 1
+        FROM task_attempts
+        GROUP BY user_id, task_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('task_attempts', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_attempt_user_task_number', type_='unique')
+
+    op.drop_table('task_attempt_counters')
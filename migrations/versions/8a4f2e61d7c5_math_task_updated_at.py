@@ -0,0 +1,28 @@
+"""math_tasks.updated_at for rendered fragment cache keys
+
+Revision ID: 8a4f2e61d7c5
+Revises: 5d1e7a3c9b20
+Create Date: 2026-10-19 11:02:17.540311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4f2e61d7c5'
+down_revision = '5d1e7a3c9b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('math_tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE math_tasks SET updated_at = created_at WHERE updated_at IS NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('math_tasks', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,25 @@
+"""index on math_tasks.title for prefix lookups
+
+Revision ID: b61e0d4a7f93
+Revises: 3c7b9d2f1a64
+Create Date: 2026-10-19 13:40:51.602237
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b61e0d4a7f93'
+down_revision = '3c7b9d2f1a64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('math_tasks', schema=None) as batch_op:
+        batch_op.create_index('ix_math_tasks_title', ['title'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('math_tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_math_tasks_title')
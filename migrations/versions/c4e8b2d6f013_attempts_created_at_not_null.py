@@ -0,0 +1,30 @@
+"""task_attempts.created_at NOT NULL (keyset pagination key)
+
+Revision ID: c4e8b2d6f013
+Revises: 7f3a1c5e9d28
+Create Date: 2026-10-19 19:05:37.214560
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8b2d6f013'
+down_revision = '7f3a1c5e9d28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Попытки без времени считаем самыми старыми: в журнале они уходят в конец,
+    # в периоды оценивания не попадают — как и раньше с NULL
+    op.execute("UPDATE task_attempts SET created_at = '1970-01-01 00:00:00' WHERE created_at IS NULL")
+
+    with op.batch_alter_table('task_attempts', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_attempts', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,25 @@
+"""index on task_attempts(created_at, id) for keyset pagination
+
+Revision ID: e2d5a9c41b07
+Revises: b61e0d4a7f93
+Create Date: 2026-10-19 14:55:12.903418
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2d5a9c41b07'
+down_revision = 'b61e0d4a7f93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task_attempts', schema=None) as batch_op:
+        batch_op.create_index('ix_attempts_created_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task_attempts', schema=None) as batch_op:
+        batch_op.drop_index('ix_attempts_created_id')
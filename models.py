@@ -115,6 +115,7 @@ class MathTask(db.Model):
     
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # ключ кэша фрагментов
     is_active = db.Column(db.Boolean, default=True)
     
     # Связи
@@ -128,6 +129,7 @@ class MathTask(db.Model):
 
     __table_args__ = (
         db.Index('ix_math_tasks_topic_level', 'topic_id', 'level'),
+        db.Index('ix_math_tasks_title', 'title'),  # префиксный поиск для автодополнения
     )
     
     def __repr__(self):
@@ -161,7 +163,7 @@ class TaskAttempt(db.Model):
     time_spent = db.Column(db.Integer)                      # Время в секундах
     hints_used = db.Column(db.Integer, default=0)
     attempt_number = db.Column(db.Integer, default=1)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # ключ курсора журнала
 
     # Связи с back_populates
     user = db.relationship('User', back_populates='task_attempts')
@@ -171,11 +173,76 @@ class TaskAttempt(db.Model):
         db.Index('ix_attempts_user_created', 'user_id', 'created_at'),
         db.Index('ix_attempts_task_created', 'task_id', 'created_at'),
         # В паре с FK из MathTask на topic_id это даст быстрые JOIN по теме в интервале дат
+        db.Index('ix_attempts_created_id', 'created_at', 'id'),  # курсорная пагинация журнала без фильтров
+        # Номер попытки уникален в паре (студент, задача) — страховка от гонок при отправке
+        db.UniqueConstraint('user_id', 'task_id', 'attempt_number', name='uq_attempt_user_task_number'),
     )
     
     def __repr__(self):
         return f'<TaskAttempt user_id={self.user_id} task_id={self.task_id}>'
 
+class TaskAttemptCounter(db.Model):
+    """Счётчик попыток по паре (студент, задача) для атомарной нумерации попыток"""
+    __tablename__ = 'task_attempt_counters'
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('users.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    task_id = db.Column(
+        db.Integer,
+        db.ForeignKey('math_tasks.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+
+    attempts_count = db.Column(db.Integer, nullable=False, default=0)       # Всего попыток
+    last_attempt_number = db.Column(db.Integer, nullable=False, default=0)  # Последний выданный номер
+    incorrect_count = db.Column(db.Integer, nullable=False, default=0)      # Неуспешных попыток
+    solved = db.Column(db.Boolean, nullable=False, default=False)           # Есть успешная попытка
+
+    def __repr__(self):
+        return f'<TaskAttemptCounter user_id={self.user_id} task_id={self.task_id} n={self.last_attempt_number}>'
+
+class CacheVersion(db.Model):
+    """Версии кэшируемых справочников: запись в справочник увеличивает version,
+    и каждый процесс при следующем обращении перечитывает свою копию"""
+    __tablename__ = 'cache_versions'
+
+    namespace = db.Column(db.String(50), primary_key=True)  # Например: 'catalog'
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.namespace}={self.version}>'
+
+class BackgroundJob(db.Model):
+    """Фоновая задача админки (импорт, экспорт, расчёт оценок): статус, прогресс, результат"""
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)                    # Например: 'import_attempts'
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued/running/succeeded/failed
+    params = db.Column(db.JSON)                                        # Параметры запуска
+    progress = db.Column(db.Integer, nullable=False, default=0)       # Обработано единиц (строк)
+    total = db.Column(db.Integer)                                      # Всего, если известно заранее
+    message = db.Column(db.Text)                                       # Текущий этап / текст ошибки
+    result = db.Column(db.JSON)                                        # Итог (отчёт импорта, данные предпросмотра)
+    result_path = db.Column(db.String(500))                            # Файл результата (для скачивания)
+    result_name = db.Column(db.String(255))
+    result_mimetype = db.Column(db.String(100))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)      # «пульс» выполняющейся задачи
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.id} {self.kind} {self.status}>'
+
 class TopicLevelConfig(db.Model):
     """Конфигурация параметров для каждой темы и уровня сложности"""
     __tablename__ = 'topic_level_configs'
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Serialization micro-benchmark for the JSON paths (services.json_provider).
+
+Builds realistic payloads in memory (no database, no HTTP) and times each one
+with the stdlib backend and with orjson, when it is installed:
+- preview:  jsonify of an evaluation preview with N result rows
+- stats:    jsonify of a student's weekly stats.json (called per page view)
+- weights:  jsonify of the task penalty-weights API (tiny, latency-bound)
+- export:   streaming attempt export of M rows (json, ndjson, csv bodies)
+
+Every case runs --repeat times and the best run is reported, along with the
+output size and the speed-up over stdlib. Both backends must produce the same
+data; the script checks that before timing.
+
+Usage examples:
+  venv/bin/python scripts/bench_json.py
+  venv/bin/python scripts/bench_json.py --preview-rows 5000 --export-rows 200000
+  venv/bin/python scripts/bench_json.py --repeat 3 --cases export
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+CASES = ("preview", "stats", "weights", "export")
+
+
+def preview_payload(rows, rnd):
+    results = []
+    for i in range(rows):
+        attempts = rnd.randint(5, 60)
+        results.append({
+            "user_id": 1000 + i // 4, "topic_id": 1 + i % 4,
+            "level_before": rnd.choice(["low", "mid", "high"]),
+            "level_after": rnd.choice(["low", "mid", "high"]),
+            "level_change": rnd.choice(["up", "down", "stay"]),
+            "period_start": "2025-03-03", "period_end": "2025-03-09",
+            "tasks_total": 10, "tasks_solved": rnd.randint(0, 10), "attempts_total": attempts,
+            "a1": rnd.randint(0, 10), "a2": rnd.randint(0, 5), "a3": rnd.randint(0, 3),
+            "accuracy": rnd.random(), "avg_time": rnd.uniform(10, 300),
+            "time_score": rnd.random(), "progress_score": rnd.random(),
+            "motivation_score": rnd.random(), "total_score": rnd.uniform(0, 100),
+            "active_working_days": rnd.randint(0, 5), "weekend_days": rnd.randint(0, 2),
+            "activity_by_weekday": [rnd.randint(0, 12) for _ in range(7)],
+            "solved_by_weekday": [rnd.randint(0, 6) for _ in range(7)],
+            "notes": "Недостаточно попыток на уровне" if i % 7 == 0 else "",
+            "warning": None,
+        })
+    return {"ok": True, "meta": {"user_count": rows // 4, "topic_count": 4,
+                                 "period_start": "2025-03-03", "period_end": "2025-03-09"},
+            "results": results}
+
+
+def stats_payload(rnd):
+    def week(start):
+        topics = [{"topic_id": t, "topic_name": f"Тема {t}: дроби и проценты", "attempts": rnd.randint(1, 40),
+                   "solved": rnd.randint(0, 20), "solved_tasks_count": rnd.randint(0, 10),
+                   "success_rate": rnd.random()} for t in range(1, 13)]
+        return {"start": start, "end": start, "topics": topics,
+                "totals": {"attempts": 240, "solved": 120, "solved_tasks_count": 60, "success_rate": 0.5}}
+    return {"current_week": week("2025-03-10"), "previous_week": week("2025-03-03")}
+
+
+def weights_payload():
+    return {"task_id": 42, "topic_id": 3, "level": "mid", "penalty_weights": [0.7, 0.4]}
+
+
+def attempt_rows(rows, rnd):
+    base = datetime(2025, 3, 10, 9, 0, 0)
+    out = []
+    for i in range(rows):
+        correct = rnd.random() < 0.6
+        out.append({
+            "id": rows - i, "user_id": 1000 + i % 500, "username": f"student_{i % 500}",
+            "task_id": 1 + i % 300, "task_code": f"T{1 + i % 300:04d}", "attempt_number": 1 + i % 3,
+            "is_correct": correct, "partial_score": 1.0 if correct else 0.0,
+            "time_spent": rnd.randint(5, 600), "hints_used": i % 2,
+            "created_at": base - timedelta(seconds=i * 7, microseconds=i % 1000),
+            "user_answer": {"type": "number", "value": rnd.randint(-50, 500)},
+        })
+    return out
+
+
+def best_of(repeat, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def line(name, loops, stdlib, fast, size):
+    per_std = stdlib / loops * 1000
+    text = f"{name:<22} {size / 1024:9.1f} KB  stdlib {per_std:9.3f} ms"
+    if fast is not None:
+        per_fast = fast / loops * 1000
+        text += f"  orjson {per_fast:9.3f} ms  x{stdlib / fast:5.1f}"
+    print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preview-rows", type=int, default=1000)
+    parser.add_argument("--export-rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case, the best one counts")
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated subset of " + ", ".join(CASES))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from flask import Flask
+    from services import json_provider
+    from services.export import serialize_rows
+    from services.json_provider import FastJSONProvider
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    rnd = random.Random(args.seed)
+    app = Flask(__name__)
+    providers = {"stdlib": FastJSONProvider(app, fast=False)}
+    has_fast = json_provider.orjson is not None
+    if has_fast:
+        providers["orjson"] = FastJSONProvider(app)
+    print(f"backend available: {json_provider.backend()}; best of {args.repeat} runs, time per operation\n")
+
+    responses = []
+    if "preview" in cases:
+        responses.append((f"preview x{args.preview_rows}", preview_payload(args.preview_rows, rnd), 1))
+    if "stats" in cases:
+        responses.append(("stats.json", stats_payload(rnd), 1000))
+    if "weights" in cases:
+        responses.append(("task weights", weights_payload(), 10000))
+
+    with app.app_context():
+        for name, payload, loops in responses:
+            timings, bodies = {}, {}
+            for label, provider in providers.items():
+                def run(provider=provider):
+                    for _ in range(loops):
+                        body = provider.response(payload).get_data()
+                    return body
+                timings[label], bodies[label] = best_of(args.repeat, run)
+            if has_fast:
+                assert json.loads(bodies["stdlib"]) == json.loads(bodies["orjson"]), name
+            line(name, loops, timings["stdlib"], timings.get("orjson"), len(bodies["stdlib"]))
+
+    if "export" in cases:
+        rows = attempt_rows(args.export_rows, rnd)
+        fields = tuple(rows[0].keys())
+        saved = json_provider.orjson
+        for fmt in ("json", "ndjson", "csv"):
+            timings, bodies = {}, {}
+            for label in providers:
+                json_provider.orjson = saved if label == "orjson" else None
+                try:
+                    timings[label], bodies[label] = best_of(
+                        args.repeat, lambda: b"".join(serialize_rows(iter(rows), fmt, fields)))
+                finally:
+                    json_provider.orjson = saved
+            if has_fast:
+                assert bodies["stdlib"] == bodies["orjson"], f"export {fmt}: outputs differ"
+            line(f"export {fmt} x{len(rows)}", 1, timings["stdlib"], timings.get("orjson"), len(bodies["stdlib"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: how long a fresh process needs before it can serve.
+
+Every run is a new Python interpreter (what a gunicorn worker restart or a
+freshly autoscaled instance pays). Measured phases:
+- interpreter: `python -c pass`, the floor nothing in the app can remove
+- import:      `import app` (module only; the app itself is built lazily)
+- build:       app.get_app() — config, extensions, blueprints, services
+- first:       first request through the test client (GET /auth/login:
+               template compile, no DB queries)
+- process:     wall time of the whole child process (interpreter + all above)
+It also reports how many times create_app() ran while importing wsgi.py
+(must be 1) and which heavy optional modules ended up loaded.
+
+With --cli the child behaves like `flask ...` (FLASK_RUN_FROM_CLI=true),
+so Flask-Migrate/alembic are part of the build.
+
+Usage examples:
+  venv/bin/python scripts/bench_startup.py
+  venv/bin/python scripts/bench_startup.py --runs 10
+  venv/bin/python scripts/bench_startup.py --cli
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+calls = []
+_create = app_module.create_app
+app_module.create_app = lambda: calls.append(1) or _create()
+import wsgi
+t2 = time.perf_counter()
+flask_app = wsgi.app
+flask_app.config.update(TESTING=True)
+resp = flask_app.test_client().get("/auth/login")
+t3 = time.perf_counter()
+print(json.dumps({
+    "import": t1 - t0, "build": t2 - t1, "first": t3 - t2,
+    "create_app_calls": len(calls), "status": resp.status_code,
+    "loaded": [m for m in ("flask_migrate", "alembic", "services.user_import",
+                           "services.evaluation", "multiprocessing") if m in sys.modules],
+}))
+"""
+
+PHASES = ("interpreter", "import", "build", "first", "process")
+
+
+def run_child(code, env):
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - started
+    return wall, (json.loads(out.strip().splitlines()[-1]) if out.strip() else {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cli", action="store_true", help="simulate `flask ...` (Flask-Migrate enabled)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:////{os.path.join(tmp, 'bench.db')}")
+    env.pop("FLASK_RUN_FROM_CLI", None)
+    if args.cli:
+        env["FLASK_RUN_FROM_CLI"] = "true"
+
+    samples = {p: [] for p in PHASES}
+    last = {}
+    for _ in range(args.runs):
+        samples["interpreter"].append(run_child("pass", env)[0])
+        wall, last = run_child(CHILD, env)
+        samples["process"].append(wall)
+        for phase in ("import", "build", "first"):
+            samples[phase].append(last[phase])
+
+    print(f"runs={args.runs} mode={'cli' if args.cli else 'web'} python={sys.version.split()[0]}")
+    for phase in PHASES:
+        ms = [s * 1000.0 for s in samples[phase]]
+        print(f"  {phase:<12} median={statistics.median(ms):7.1f}ms  min={min(ms):7.1f}ms  max={max(ms):7.1f}ms")
+    print(f"create_app() calls on `import wsgi`: {last.get('create_app_calls')}  "
+          f"first response: {last.get('status')}")
+    print(f"heavy modules loaded: {', '.join(last.get('loaded') or []) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the student answer submission pipeline.
+
+Spins up the app on a throw-away SQLite database, seeds N students and a pool
+of tasks, then lets every student submit answers concurrently from its own
+thread (Flask test client, no network). Reports p50/p95/max latency for:
+- submit: POST /student/tasks/<id> (the write path)
+- cycle:  POST + the redirected GET (what a browser actually pays)
+
+With --mode json the JSON endpoint POST /student/tasks/<id>/submit is used
+instead; it answers in one round trip, so submit == cycle.
+
+Usage examples:
+  venv/bin/python scripts/bench_submit.py
+  venv/bin/python scripts/bench_submit.py --students 40 --tasks 30 --threads 16
+  venv/bin/python scripts/bench_submit.py --mode json
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def report(name, samples):
+    ms = [s * 1000.0 for s in samples]
+    print(f"{name:<8} n={len(ms):<6} p50={percentile(ms, 50):7.2f}ms "
+          f"p95={percentile(ms, 95):7.2f}ms max={max(ms) if ms else 0:7.2f}ms "
+          f"mean={statistics.mean(ms) if ms else 0:7.2f}ms")
+
+
+def seed(app, students, tasks):
+    from extensions import db
+    from models import User, Topic, MathTask, TopicLevelConfig
+
+    with app.app_context():
+        db.create_all()
+        admin = User(username="bench_admin", email="bench_admin@example.com", role="admin")
+        admin.set_password("x")
+        db.session.add(admin)
+        topic = Topic(code="bench", name="Bench")
+        db.session.add(topic)
+        db.session.flush()
+        db.session.add(TopicLevelConfig(topic_id=topic.id, level="low", task_count_threshold=10,
+                                        reference_time=60, penalty_weights=[0.7, 0.4]))
+        task_ids = []
+        for i in range(tasks):
+            t = MathTask(title=f"Bench {i}", description="<p>" + "x " * 200 + "</p>",
+                         answer_type="number", correct_answer={"type": "number", "value": float(i)},
+                         topic_id=topic.id, level="low", max_score=1.0,
+                         created_by=admin.id, is_active=True)
+            db.session.add(t)
+            db.session.flush()
+            task_ids.append((t.id, float(i)))
+        user_ids = []
+        for i in range(students):
+            u = User(username=f"bench_student_{i}", email=f"bench_student_{i}@example.com", role="student")
+            u.set_password("x")
+            db.session.add(u)
+            db.session.flush()
+            user_ids.append(u.id)
+        db.session.commit()
+    return user_ids, task_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--wrong-rate", type=float, default=0.4,
+                        help="probability that a submission is a wrong answer")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mode", choices=("form", "json"), default="form",
+                        help="form: POST + redirect + GET; json: single JSON submit")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:////{os.path.join(tmp, 'bench.db')}"
+
+    from app import create_app
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+
+    user_ids, task_ids = seed(app, args.students, args.tasks)
+    rnd = random.Random(args.seed)
+
+    submit_lat, cycle_lat, errors = [], [], []
+    lock = threading.Lock()
+    queue = list(user_ids)
+
+    def worker():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                uid = queue.pop()
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess["_user_id"] = str(uid)
+                sess["_fresh"] = True
+            local_submit, local_cycle = [], []
+            for task_id, answer in task_ids:
+                for _ in range(3):
+                    wrong = rnd.random() < args.wrong_rate
+                    value = answer + 1000 if wrong else answer
+                    t0 = time.perf_counter()
+                    if args.mode == "json":
+                        resp = client.post(f"/student/tasks/{task_id}/submit", data={"answer": str(value)})
+                        t1 = t2 = time.perf_counter()
+                        if resp.status_code != 200:
+                            errors.append(resp.status_code)
+                            break
+                    else:
+                        resp = client.post(f"/student/tasks/{task_id}", data={"answer": str(value)})
+                        t1 = time.perf_counter()
+                        if resp.status_code not in (302, 303):
+                            errors.append(resp.status_code)
+                            break
+                        client.get(resp.headers["Location"])
+                        t2 = time.perf_counter()
+                    local_submit.append(t1 - t0)
+                    local_cycle.append(t2 - t0)
+                    if not wrong:
+                        break
+            with lock:
+                submit_lat.extend(local_submit)
+                cycle_lat.extend(local_cycle)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"mode={args.mode} students={args.students} tasks={args.tasks} threads={args.threads} "
+          f"elapsed={elapsed:.2f}s throughput={len(submit_lat) / elapsed if elapsed else 0:.1f} submits/s")
+    report("submit", submit_lat)
+    report("cycle", cycle_lat)
+    if errors:
+        print(f"errors: {len(errors)} (status codes: {sorted(set(errors))})")
+
+
+if __name__ == "__main__":
+    main()
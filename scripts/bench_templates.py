@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Template benchmark: what a cold worker pays for Jinja on its first requests.
+
+Spins up the app on a throw-away SQLite database with a realistic amount of
+data (topics in the selects, a task with a long description and several
+answer variables, a student's attempt history) and measures the heaviest
+templates:
+- admin/edit_task.html   GET /admin/tasks/<id>/edit (admin)
+- student/task_view.html GET /student/tasks/<id> (student)
+- admin/analytics.html   rendered directly with --rows tasks/users in context
+- admin/settings.html    rendered directly
+(the last two belong to the legacy admin views, which are not registered).
+
+For every page three states of the template cache are compared:
+- cold:     templates compiled from source (fresh worker, no bytecode cache)
+- bytecode: templates loaded from the on-disk bytecode cache
+            (fresh worker after `flask templates-compile`)
+- warm:     templates already in memory (p50 of --runs repeats; also what
+            workers forked from a preloaded master get on their first request)
+"render" is the time spent inside Jinja (before_render_template ->
+template_rendered), "request" is the whole call including the view and SQL.
+
+Usage examples:
+  venv/bin/python scripts/bench_templates.py
+  venv/bin/python scripts/bench_templates.py --runs 50 --topics 100 --rows 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def seed(app, topics, attempts):
+    from extensions import db
+    from models import MathTask, TaskAttempt, Topic, TopicLevelConfig, User
+
+    with app.app_context():
+        db.create_all()
+        admin = User(username="bench_admin", email="bench_admin@example.com", role="admin")
+        admin.set_password("x")
+        student = User(username="bench_student", email="bench_student@example.com", role="student")
+        student.set_password("x")
+        db.session.add_all([admin, student])
+        for i in range(topics):
+            db.session.add(Topic(code=f"t{i:03d}", name=f"Тема {i}: уравнения и неравенства"))
+        db.session.flush()
+        topic_id = Topic.query.order_by(Topic.id).first().id
+        db.session.add(TopicLevelConfig(topic_id=topic_id, level="low", task_count_threshold=10,
+                                        reference_time=60, penalty_weights=[0.7, 0.4]))
+        variables = [{"name": name, "value": float(k)} for k, name in enumerate("xyzuvw")]
+        task = MathTask(title="Система уравнений", code="BENCH-1",
+                        description="<p>" + "Решите систему уравнений и запишите ответ. " * 40 + "</p>",
+                        explanation="<p>" + "Сложим уравнения почленно. " * 30 + "</p>",
+                        answer_type="variables", correct_answer={"type": "variables", "variables": variables},
+                        topic_id=topic_id, level="low", max_score=1.0, created_by=admin.id, is_active=True)
+        db.session.add(task)
+        db.session.flush()
+        # история попыток: неверные, последняя — верная (задача решена, карточка не заблокирована)
+        for n in range(attempts):
+            last = n == attempts - 1
+            db.session.add(TaskAttempt(user_id=student.id, task_id=task.id, attempt_number=n + 1,
+                                       is_correct=last, partial_score=0.4 if last else 0.0,
+                                       time_spent=30 + n, user_answer={"type": "variables", "variables": variables}))
+        db.session.commit()
+        return admin.id, student.id, task.id
+
+
+def legacy_context(rows):
+    popular = [SimpleNamespace(title=f"Задача {i}", topic=f"Тема {i % 7}", attempts_count=40 + i,
+                               success_rate=30 + i % 60, level=1 + i % 5, avg_time=f"{i % 9}:30")
+               for i in range(rows)]
+    users = [SimpleNamespace(username=f"student_{i}", role="student" if i % 5 else "teacher",
+                             tasks_completed=i * 3, success_rate=50 + i % 40) for i in range(rows)]
+    return {"total_users": 1200, "total_tasks": 900, "total_attempts": 250000, "success_rate": 61.4,
+            "popular_tasks": popular, "active_users": users, "active_tab": "analytics"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="warm repeats per page")
+    parser.add_argument("--topics", type=int, default=40, help="topics in the edit form select")
+    parser.add_argument("--attempts", type=int, default=3, help="attempts in the student's history")
+    parser.add_argument("--rows", type=int, default=20, help="tasks/users in the analytics context")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:////{os.path.join(tmp, 'bench.db')}"
+    os.environ["TEMPLATES_CACHE_DIR"] = os.path.join(tmp, "jinja-cache")
+
+    from flask import before_render_template, render_template, template_rendered
+    from flask_login import login_user
+
+    from app import create_app
+    from extensions import db
+    from models import User
+    from services.template_cache import precompile
+
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    admin_id, student_id, task_id = seed(app, args.topics, args.attempts)
+    env = app.jinja_env
+    disk_cache = env.bytecode_cache
+
+    render_time, stack = {}, []   # вложенные render_template (фрагменты) — внутри внешнего
+
+    def on_before(sender, template, context, **extra):
+        stack.append(time.perf_counter())
+
+    def on_rendered(sender, template, context, **extra):
+        started = stack.pop()
+        if not stack:
+            render_time["seconds"] = time.perf_counter() - started
+
+    before_render_template.connect(on_before, app)
+    template_rendered.connect(on_rendered, app)
+
+    def client_for(user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(user_id)
+            sess["_fresh"] = True
+        return client
+
+    def via_client(client, url):
+        def call():
+            resp = client.get(url)
+            assert resp.status_code == 200, (url, resp.status_code)
+            return len(resp.data)
+        return call
+
+    def direct(template, context):
+        def call():
+            with app.test_request_context():
+                login_user(db.session.get(User, admin_id))
+                return len(render_template(template, **context).encode("utf-8"))
+        return call
+
+    pages = [
+        ("admin/edit_task.html", via_client(client_for(admin_id), f"/admin/tasks/{task_id}/edit")),
+        ("student/task_view.html", via_client(client_for(student_id), f"/student/tasks/{task_id}")),
+        ("admin/analytics.html", direct("admin/analytics.html", legacy_context(args.rows))),
+        ("admin/settings.html", direct("admin/settings.html", {"active_tab": "settings"})),
+    ]
+
+    def measure(call):
+        started = time.perf_counter()
+        size = call()
+        return time.perf_counter() - started, render_time.get("seconds", 0.0), size
+
+    for _, call in pages:   # прогрев импорта, соединений с БД и т.п. — не про шаблоны
+        call()
+    if disk_cache is not None:
+        disk_cache.clear()
+
+    print(f"{'template':<24}{'state':<10}{'request ms':>12}{'render ms':>11}{'html KB':>9}")
+    totals = {"cold": 0.0, "bytecode": 0.0, "warm": 0.0}
+    for name, call in pages:
+        rows = []
+        env.bytecode_cache = None
+        env.cache.clear()
+        rows.append(("cold",) + measure(call))
+        if disk_cache is not None:
+            env.bytecode_cache = disk_cache
+            env.cache.clear()
+            call()                              # заполняет кэш на диске
+            env.cache.clear()
+            rows.append(("bytecode",) + measure(call))
+        warm = [measure(call) for _ in range(args.runs)]
+        rows.append(("warm", statistics.median(w[0] for w in warm),
+                     statistics.median(w[1] for w in warm), warm[-1][2]))
+        for state, request_s, render_s, size in rows:
+            totals[state] += request_s
+            print(f"{name:<24}{state:<10}{request_s * 1000:12.2f}{render_s * 1000:11.2f}{size / 1024:9.1f}")
+    print()
+    print("first requests of a fresh worker, all four pages: "
+          + ", ".join(f"{state} {seconds * 1000:.0f} ms" for state, seconds in totals.items() if seconds))
+
+    env.bytecode_cache = None
+    env.cache.clear()
+    report = precompile(app)
+    print(f"all templates ({report.compiled}) from source: {report.seconds * 1000:.0f} ms", end="")
+    if disk_cache is not None:
+        env.bytecode_cache = disk_cache
+        env.cache.clear()
+        precompile(app)
+        env.cache.clear()
+        report = precompile(app)
+        print(f", from bytecode cache: {report.seconds * 1000:.0f} ms", end="")
+    print()
+
+
+if __name__ == "__main__":
+    main()
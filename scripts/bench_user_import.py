@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for bulk user import (services.user_import).
+
+Spins up the app on a throw-away SQLite database and imports N generated
+students in one call, the way the admin "Импорт пользователей" job does.
+Reports users/sec for the whole import and how much of it went into password
+hashing (PBKDF2, the dominant cost). Run with --workers 1 to get the
+sequential baseline and compare against the process pool.
+
+Usage examples:
+  venv/bin/python scripts/bench_user_import.py
+  venv/bin/python scripts/bench_user_import.py --users 2000 --workers 4
+  venv/bin/python scripts/bench_user_import.py --users 500 --workers 1
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="hashing processes (0 = one per CPU, 1 = no pool)")
+    parser.add_argument("--chunk", type=int, default=1000, help="rows per INSERT/commit")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:////{os.path.join(tmp, 'bench.db')}"
+
+    from app import create_app
+    from extensions import db
+    from services.user_import import import_users
+
+    app = create_app()
+    items = [{"username": f"bench_student_{i}", "email": f"bench_student_{i}@school.test",
+              "password": f"pw-{i:06d}", "first_name": "Ученик", "last_name": str(i)}
+             for i in range(args.users)]
+
+    with app.app_context():
+        db.create_all()
+        report = import_users(items, workers=args.workers or None, chunk_size=args.chunk)
+
+    print(f"users={args.users} workers={args.workers or os.cpu_count()} cpus={os.cpu_count()} "
+          f"created={report.created} elapsed={report.seconds:.2f}s "
+          f"hashing={report.hash_seconds:.2f}s throughput={report.users_per_second:.1f} users/s")
+    if report.errors:
+        print(f"errors: {report.error_count} (first: {report.errors[0].message})")
+
+
+if __name__ == "__main__":
+    main()
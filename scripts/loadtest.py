@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+HTTP load-test harness for comparing server configurations.
+
+Replays a realistic traffic mix against a running server over real HTTP
+(stdlib only): every virtual user is a thread with its own logged-in
+session (student + admin cookies) that loops over weighted operations:
+- tasks:    GET  /student/tasks               (student task list)
+- task:     GET  /student/tasks/<id>          (task page)
+- submit:   POST /student/tasks/<id>/submit   (JSON submit, mostly wrong answers)
+- stats:    GET  /student/profile/stats.json  (profile statistics)
+- preview:  POST /admin/evaluation/preview    (admin evaluation preview)
+Reports overall RPS and p50/p90/p99/max latency per operation. Errors are
+HTTP >= 400 except 409 (submit to a solved/blocked task is a normal answer).
+
+Two ways to run it:
+  # 1) everything local: throw-away SQLite DB, seeded, served by gunicorn
+  #    with gunicorn.conf.py (extra flags after --gunicorn-args override it)
+  venv/bin/python scripts/loadtest.py --serve --duration 30 --users 16
+  venv/bin/python scripts/loadtest.py --serve --gunicorn-args "--workers 1 --threads 1 --worker-class sync"
+
+  # 2) seed an existing database (DATABASE_URL), then load it from elsewhere
+  DATABASE_URL=postgresql://... venv/bin/python scripts/loadtest.py --seed --users 32
+  venv/bin/python scripts/loadtest.py --url https://staging.example --users 32 --duration 60 \
+      --password <printed by --seed>
+
+Seeded accounts: loadtest_s<N> (students) and, with --admin, loadtest_admin.
+The password is random and printed once by --seed (or taken from --password /
+LOADTEST_PASSWORD); re-seeding resets it for all load-test accounts. The admin
+account is only needed for the "preview" operation: without --admin the mix
+runs without it and discovery goes through the student pages. --serve uses a
+throw-away database and always includes the admin.
+--json prints the summary as one JSON object (for diffing runs).
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import secrets
+import shlex
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+ADMIN = "loadtest_admin"
+TOPIC_CODE = "loadtest"
+MIX = {"tasks": 35, "task": 20, "submit": 25, "stats": 15, "preview": 5}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def resolve_password(parser, args):
+    """Пароль нагрузочных аккаунтов: --password / LOADTEST_PASSWORD; для --seed/--serve
+    без него — случайный (--seed печатает его один раз), для --url он обязателен."""
+    if args.password is not None:
+        return args.password
+    if not (args.serve or args.seed):
+        parser.error("--password (or LOADTEST_PASSWORD) is required with --url")
+    return secrets.token_urlsafe(12)
+
+
+# --------------------------------------------------------------------------- seed
+def seed(users, tasks, password, with_admin, throwaway=False):
+    """Создаёт тему, задания и студентов (и админа, если with_admin) в БД из DATABASE_URL.
+    Повторный запуск досоздаёт недостающее и ставит всем нагрузочным аккаунтам новый пароль."""
+    from app import create_app
+    from extensions import db
+    from models import MathTask, Topic, TopicLevelConfig, User
+    from services.passwords import hash_passwords
+
+    app = create_app()
+    # один хеш на всех (пароль общий); дешёвый — только в одноразовой базе --serve:
+    # вход выполняется один раз на виртуального пользователя и не замеряется
+    (pw_hash,) = hash_passwords([password], workers=1, method="pbkdf2:sha256:1000" if throwaway else None)
+    with app.app_context():
+        db.create_all()
+        existing = User.query.filter(User.username.like("loadtest\\_%", escape="\\")).all()
+        for user in existing:
+            user.password_hash = pw_hash
+        admin = User.query.filter_by(username=ADMIN).first()
+        if admin is None and with_admin:
+            admin = User(username=ADMIN, email=f"{ADMIN}@example.com", role="admin", password_hash=pw_hash)
+            db.session.add(admin)
+            db.session.flush()
+        taken = {u for (u,) in db.session.query(User.username).filter(User.username.like("loadtest_s%"))}
+        for i in range(users):
+            name = f"loadtest_s{i}"
+            if name not in taken:
+                db.session.add(User(username=name, email=f"{name}@example.com", role="student",
+                                    password_hash=pw_hash))
+        topic = Topic.query.filter_by(code=TOPIC_CODE).first()
+        if topic is None:
+            topic = Topic(code=TOPIC_CODE, name="Load test")
+            db.session.add(topic)
+            db.session.flush()
+            db.session.add(TopicLevelConfig(topic_id=topic.id, level="low", task_count_threshold=10,
+                                            reference_time=60, penalty_weights=[0.7, 0.4]))
+        db.session.flush()
+        # автор заданий: админ нагрузочного набора, любой админ базы или первый студент набора
+        author = (admin or User.query.filter_by(role="admin").order_by(User.id).first()
+                  or User.query.filter_by(username="loadtest_s0").first())
+        have = MathTask.query.filter_by(topic_id=topic.id).count()
+        for i in range(have, tasks):
+            db.session.add(MathTask(title=f"Load {i}", description="<p>" + "x " * 200 + "</p>",
+                                    answer_type="number", correct_answer={"type": "number", "value": float(i)},
+                                    topic_id=topic.id, level="low", max_score=1.0,
+                                    created_by=author.id, is_active=True))
+        db.session.commit()
+        return max(users, len(taken)), max(tasks, have)
+
+
+# --------------------------------------------------------------------------- client
+class Session:
+    """Куки + CSRF-токен одного пользователя поверх urllib."""
+
+    def __init__(self, base):
+        self.base = base.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.csrf = None
+
+    def request(self, method, path, data=None, json_body=None, timeout=60):
+        headers = {}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode()
+        if self.csrf and method == "POST":
+            headers["X-CSRFToken"] = self.csrf
+        req = urllib.request.Request(self.base + path, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def login(self, username, password):
+        status, page = self.request("GET", "/auth/login")
+        token = re.search(rb'name="csrf_token"[^>]*value="([^"]+)"', page)
+        form = {"username": username, "password": password}
+        if token:
+            form["csrf_token"] = token.group(1).decode()
+        status, page = self.request("POST", "/auth/login", data=form)
+        meta = re.search(rb'<meta name="csrf-token" content="([^"]+)"', page)
+        self.csrf = meta.group(1).decode() if meta else None
+        if status != 200 or b"/auth/logout" not in page:
+            raise RuntimeError(f"login failed for {username}: HTTP {status}")
+
+
+def discover(base, password, with_admin):
+    """id заданий, студентов и темы нагрузочного набора — через API админки (with_admin)
+    или страницы студента, без доступа к БД."""
+    student = Session(base)
+    student.login("loadtest_s0", password)
+    user_ids = []
+    if with_admin:
+        admin = Session(base)
+        admin.login(ADMIN, password)
+        _, body = admin.request("GET", "/admin/api/lookup/tasks?q=Load&limit=50")
+        task_ids = [item["id"] for item in json.loads(body)["items"]]
+        _, body = admin.request("GET", "/admin/api/lookup/users?q=loadtest_s&role=student&limit=50")
+        user_ids = [item["id"] for item in json.loads(body)["items"]]
+    else:
+        # тема набора — из селекта на странице задач, задания — из списка по этой теме
+        _, page = student.request("GET", "/student/tasks")
+        topic = re.search(rb'<option value="(\d+)"[^>]*>Load test</option>', page)
+        task_ids = []
+        if topic:
+            _, page = student.request("GET", f"/student/tasks?topic_id={int(topic.group(1))}")
+            task_ids = sorted({int(i) for i in re.findall(rb'href="/student/tasks/(\d+)"', page)})
+    if not task_ids or (with_admin and not user_ids):
+        raise RuntimeError("load-test data not found: run with --seed against the server's database first")
+    _, page = student.request("GET", f"/student/tasks/{task_ids[0]}")
+    topic = re.search(rb"topic_id=(\d+)", page)
+    return {"task_ids": task_ids, "user_ids": user_ids, "topic_id": int(topic.group(1)) if topic else None}
+
+
+def run_load(base, info, users, duration, seed_value, password, with_admin):
+    mix = {op: weight for op, weight in MIX.items() if with_admin or op != "preview"}
+    samples = {op: [] for op in mix}
+    errors = {op: 0 for op in mix}
+    lock = threading.Lock()
+    deadline = [None]
+    ready = threading.Barrier(users + 1)   # все вошли в систему
+    go = threading.Event()                  # срок выставлен — можно стрелять
+    ops, weights = zip(*mix.items())
+    students = info["user_ids"]
+
+    def worker(n):
+        rnd = random.Random(seed_value + n)
+        student, admin = Session(base), Session(base)
+        try:
+            student.login(f"loadtest_s{n}", password)
+            if with_admin:
+                admin.login(ADMIN, password)
+        finally:
+            ready.wait()
+        go.wait()
+        today = time.strftime("%Y-%m-%d")
+        local = {op: [] for op in mix}
+        local_err = {op: 0 for op in mix}
+        while time.monotonic() < deadline[0]:
+            op = rnd.choices(ops, weights)[0]
+            task_id = rnd.choice(info["task_ids"])
+            t0 = time.perf_counter()
+            if op == "tasks":
+                status, _ = student.request("GET", "/student/tasks")
+            elif op == "task":
+                status, _ = student.request("GET", f"/student/tasks/{task_id}")
+            elif op == "submit":
+                # в основном неверные ответы: задание не закрывается и попытки продолжаются
+                value = rnd.randint(0, len(info["task_ids"])) + (0 if rnd.random() < 0.3 else 1000)
+                status, _ = student.request("POST", f"/student/tasks/{task_id}/submit", data={"answer": value})
+            elif op == "stats":
+                status, _ = student.request("GET", "/student/profile/stats.json")
+            else:
+                status, _ = admin.request("POST", "/admin/evaluation/preview", json_body={
+                    "user_ids": rnd.sample(students, min(10, len(students))),
+                    "topic_id": info["topic_id"], "period_start": today, "period_end": today})
+            elapsed = time.perf_counter() - t0
+            local[op].append(elapsed)
+            # 409 — задача уже решена или заблокирована: штатный ответ, не ошибка сервера
+            if status >= 400 and status != 409:
+                local_err[op] += 1
+        with lock:
+            for op in mix:
+                samples[op].extend(local[op])
+                errors[op] += local_err[op]
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(users)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    started = time.monotonic()
+    deadline[0] = started + duration
+    go.set()
+    for t in threads:
+        t.join()
+    return samples, errors, time.monotonic() - started
+
+
+def summarize(samples, errors, elapsed):
+    total = sum(len(v) for v in samples.values())
+    out = {"elapsed": round(elapsed, 2), "requests": total,
+           "rps": round(total / elapsed, 1) if elapsed else 0.0,
+           "errors": sum(errors.values()), "ops": {}}
+    for op, values in samples.items():
+        ms = [v * 1000.0 for v in values]
+        out["ops"][op] = {"n": len(ms), "errors": errors[op],
+                          "p50": round(percentile(ms, 50), 2), "p90": round(percentile(ms, 90), 2),
+                          "p99": round(percentile(ms, 99), 2), "max": round(max(ms), 2) if ms else 0.0,
+                          "mean": round(statistics.mean(ms), 2) if ms else 0.0}
+    return out
+
+
+def print_summary(summary, label):
+    print(f"{label}: {summary['requests']} requests in {summary['elapsed']}s "
+          f"-> {summary['rps']} req/s, errors={summary['errors']}")
+    for op, s in summary["ops"].items():
+        print(f"  {op:<8} n={s['n']:<6} p50={s['p50']:8.2f}ms p90={s['p90']:8.2f}ms "
+              f"p99={s['p99']:8.2f}ms max={s['max']:8.2f}ms errors={s['errors']}")
+
+
+# --------------------------------------------------------------------------- server
+def spawn_gunicorn(port, extra_args, env):
+    cmd = [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+           "--bind", f"127.0.0.1:{port}", "--access-logfile", "/dev/null"] + extra_args + ["wsgi:app"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, start_new_session=True)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(150):
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {proc.returncode}")
+        try:
+            urllib.request.urlopen(url + "/auth/login", timeout=1).read()
+            return proc, url
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.1)
+    stop(proc)
+    raise RuntimeError("gunicorn did not become ready in 15s")
+
+
+def stop(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server to load (ignored with --serve)")
+    parser.add_argument("--serve", action="store_true", help="seed a throw-away SQLite DB and start gunicorn")
+    parser.add_argument("--seed", action="store_true", help="only seed DATABASE_URL and exit")
+    parser.add_argument("--admin", action="store_true",
+                        help="seed/use the loadtest_admin account and include the admin preview operation")
+    parser.add_argument("--password", default=os.getenv("LOADTEST_PASSWORD"),
+                        help="password of the load-test accounts (default: $LOADTEST_PASSWORD; "
+                             "--seed/--serve generate a random one)")
+    parser.add_argument("--gunicorn-args", default="", help='extra gunicorn flags, e.g. "--workers 4 --threads 2"')
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--tasks", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--seed-value", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    with_admin = args.admin or args.serve   # при --serve база одноразовая
+    password = resolve_password(parser, args)
+
+    proc = None
+    if args.serve:
+        tmp = tempfile.mkdtemp()
+        os.environ["DATABASE_URL"] = f"sqlite:////{os.path.join(tmp, 'loadtest.db')}"
+    if args.serve or args.seed:
+        students, tasks = seed(args.users, args.tasks, password, with_admin, throwaway=args.serve)
+        if args.seed:
+            accounts = "loadtest_s<N>" + (f" and {ADMIN}" if with_admin else "")
+            print(f"seeded: {students} students, {tasks} tasks; password of {accounts}: {password}")
+            return
+    url = args.url
+    if args.serve:
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        env.pop("FLASK_RUN_FROM_CLI", None)
+        proc, url = spawn_gunicorn(args.port, shlex.split(args.gunicorn_args), env)
+
+    try:
+        info = discover(url, password, with_admin)
+        samples, errors, elapsed = run_load(url, info, args.users, args.duration, args.seed_value,
+                                            password, with_admin)
+    finally:
+        if proc is not None:
+            stop(proc)
+    summary = summarize(samples, errors, elapsed)
+    summary["config"] = {"url": url, "users": args.users, "gunicorn_args": args.gunicorn_args}
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+    else:
+        print_summary(summary, f"users={args.users} gunicorn_args={args.gunicorn_args or '(gunicorn.conf.py)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Replay load generator: real student timelines as HTTP traffic.
+
+Source data are the recorded attempt timelines in
+docs_adaptive_mech/experimental_data_attempts_*.json (task_code, is_correct,
+time_spent, created_at per attempt). Each source student becomes a script:
+- attempts are ordered by created_at; gaps longer than --session-gap (days
+  between study sessions) collapse to a short --break, gaps inside a session
+  are kept as recorded
+- N synthetic students cycle over the scripts, each one starting at a random
+  session of its script, logging in at a random moment of the --ramp window
+  and with every gap stretched by a random ±--jitter factor
+- the first --window simulated seconds are replayed (default: an exam hour)
+
+Per attempt a student opens the task page (time_spent before the attempt,
+but not before its previous submit) and then submits: the correct answer
+from the task bank if the recorded attempt was correct, a wrong one
+otherwise. 409 on submit (task already solved / blocked) is an expected
+answer, not an error.
+
+--speed compresses time: --speed 10 replays the hour in 6 minutes at ten
+times the request rate, so a pass at --speed S is a pass at real time with a
+margin of S. The report has per-endpoint latency histograms, percentiles
+and error rates, plus schedule lag (how late actions started compared to
+the plan). If the server cannot keep up, lag grows; the verdict line says
+whether the run stayed within --slo and the lag budget.
+
+Usage examples:
+  # plan only (no HTTP): how many requests and what peak rate a run means
+  venv/bin/python scripts/replay_load.py --students 500 --dry-run
+
+  # everything local: throw-away SQLite DB, seeded, served by gunicorn.conf.py
+  venv/bin/python scripts/replay_load.py --serve --students 500 --speed 12
+  venv/bin/python scripts/replay_load.py --serve --students 100 --gunicorn-args "--workers 2"
+
+  # seed an existing database, then replay against a deployed instance
+  DATABASE_URL=postgresql://... venv/bin/python scripts/replay_load.py --seed --students 500 --map tasks.json
+  venv/bin/python scripts/replay_load.py --url https://staging.example --map tasks.json --students 500 \
+      --password <printed by --seed>
+
+Seeded accounts: replay_s<N> (students). The password is random and printed
+once by --seed (or taken from --password / LOADTEST_PASSWORD); re-seeding
+resets it. Tasks come from docs_adaptive_mech/math_tasks_all_levels_fixed.json
+(topic quadratic_equations); their author is an existing admin or a
+replay_author teacher account with a random password nobody knows.
+--json prints the summary as one JSON object (for diffing runs).
+"""
+import argparse
+import bisect
+import glob
+import json
+import os
+import random
+import secrets
+import shlex
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import ROOT, Session, percentile, resolve_password, spawn_gunicorn, stop  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, "docs_adaptive_mech")
+BANK = os.path.join(DATA_DIR, "math_tasks_all_levels_fixed.json")
+TIMELINES = os.path.join(DATA_DIR, "experimental_data_attempts_*.json")
+TOPICS = os.path.join(DATA_DIR, "topics.json")
+AUTHOR = "replay_author"
+LEGACY_ADMIN = "replay_admin"   # автор заданий в наборах, засеянных раньше
+STUDENT = "replay_s{}"
+ENDPOINTS = ("login", "open", "submit")
+# верхние границы корзин гистограммы, мс (последняя — всё, что дольше)
+BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+# --------------------------------------------------------------------------- plan
+def load_timelines(pattern=TIMELINES):
+    """{source username: [attempt, ...]} по created_at — исходные «сценарии» студентов."""
+    by_user = defaultdict(list)
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8") as f:
+            for row in json.load(f):
+                by_user[row["username"]].append(row)
+    for rows in by_user.values():
+        rows.sort(key=lambda r: r["created_at"])
+    if not by_user:
+        raise RuntimeError(f"no timelines match {pattern}")
+    return dict(by_user)
+
+
+def to_script(rows, session_gap, pause):
+    """Попытки -> [(offset, task_code, is_correct, time_spent)], offset — секунды от первой попытки.
+    Перерывы между сессиями (> session_gap) сжимаются до pause; индексы начала сессий — второй результат."""
+    script, starts = [], [0]
+    offset, prev = 0.0, None
+    for row in rows:
+        ts = datetime.fromisoformat(row["created_at"])
+        if prev is not None:
+            gap = (ts - prev).total_seconds()
+            if gap > session_gap:
+                gap = pause
+                starts.append(len(script))
+            offset += max(0.0, gap)
+        prev = ts
+        script.append((offset, row["task_code"], bool(row["is_correct"]), float(row.get("time_spent") or 0)))
+    return script, starts
+
+
+def build_plan(timelines, students, window=3600.0, ramp=300.0, jitter=0.2,
+               session_gap=3600.0, pause=60.0, seed_value=42):
+    """План в симулированных секундах: для каждого синтетического студента
+    {"n", "source", "login": t, "actions": [(t, "open"|"submit", task_code, is_correct), ...]}."""
+    rnd = random.Random(seed_value)
+    scripts = [(name,) + to_script(rows, session_gap, pause) for name, rows in sorted(timelines.items())]
+    plan = []
+    for n in range(students):
+        name, script, starts = scripts[n % len(scripts)]
+        first = rnd.choice(starts)
+        t = login = rnd.uniform(0, ramp)
+        last_submit = login
+        actions = []
+        for i in range(first, len(script)):
+            if i > first:
+                t += (script[i][0] - script[i - 1][0]) * rnd.uniform(1 - jitter, 1 + jitter)
+            if t > window:
+                break
+            _, code, correct, spent = script[i]
+            opened = max(last_submit, t - spent * rnd.uniform(1 - jitter, 1 + jitter))
+            actions.append((opened, "open", code, correct))
+            actions.append((t, "submit", code, correct))
+            last_submit = t
+        plan.append({"n": n, "source": name, "login": login, "actions": actions})
+    return plan
+
+
+def plan_stats(plan, window):
+    """Сколько запросов в плане и пиковая нагрузка (запросов в симулированную минуту)."""
+    per_minute = defaultdict(int)
+    counts = defaultdict(int)
+    for student in plan:
+        counts["login"] += 1
+        per_minute[int(student["login"] // 60)] += 1
+        for t, kind, _, _ in student["actions"]:
+            counts[kind] += 1
+            per_minute[int(t // 60)] += 1
+    total = sum(counts.values())
+    peak = max(per_minute.values()) if per_minute else 0
+    return {"students": len(plan), "window": window, "requests": total, "by_endpoint": dict(counts),
+            "mean_rps": round(total / window, 2) if window else 0.0, "peak_rpm": peak,
+            "peak_rps": round(peak / 60.0, 2)}
+
+
+# --------------------------------------------------------------------------- data
+def answer_form(correct_answer, right):
+    """Поля формы отправки (как у страницы задания): верный ответ из банка или заведомо неверный."""
+    delta = 0 if right else 1000
+    if correct_answer.get("type") == "variables":
+        form = {}
+        for i, item in enumerate(correct_answer.get("variables") or []):
+            form[f"name_{i}"] = item["name"]
+            form[f"value_{i}"] = float(item["value"]) + delta
+        return form
+    return {"answer": float(correct_answer.get("value") or 0) + delta}
+
+
+def seed(students, password, map_path=None, throwaway=False):
+    """Тема и задания банка (импортом, как из админки), студенты replay_s<N> с паролем password;
+    идемпотентно (пароль существующих студентов заменяется).
+    Возвращает {task_code: {"id", "correct_answer"}} и при map_path сохраняет его в файл."""
+    from app import create_app
+    from extensions import db
+    from models import MathTask, Topic, TopicLevelConfig, User
+    from services.passwords import hash_passwords
+    from services.task_import import import_tasks
+
+    with open(BANK, encoding="utf-8") as f:
+        bank = json.load(f)
+    with open(TOPICS, encoding="utf-8") as f:
+        topics = {t["code"]: t for t in json.load(f)}
+    # часть банка ссылается на тему по id исходной БД — переводим в код
+    code_by_id = {t["id"]: code for code, t in topics.items()}
+    bank = [dict(t, topic_code=t.get("topic_code") or code_by_id[t["topic_id"]], topic_id=None) for t in bank]
+
+    app = create_app()
+    # один хеш на всех студентов (пароль общий); дешёвый — только в одноразовой базе --serve,
+    # где вход не должен заслонять поток попыток. У автора заданий — случайный пароль,
+    # который никто не знает: входить под ним не нужно
+    pw_hash, author_hash = hash_passwords([password, secrets.token_urlsafe(24)], workers=1,
+                                          method="pbkdf2:sha256:1000" if throwaway else None)
+    with app.app_context():
+        db.create_all()
+        for user in User.query.filter(User.username.like("replay\\_s%", escape="\\")):
+            user.password_hash = pw_hash
+        # автор импортированных заданий (created_by обязателен): прежний replay_admin
+        # с паролем loadtest больше не должен пускать в админку
+        owner = User.query.filter(User.username.in_((AUTHOR, LEGACY_ADMIN))).order_by(User.id).first()
+        if owner is not None:
+            owner.password_hash = author_hash
+        else:
+            owner = User.query.filter_by(role="admin").order_by(User.id).first()
+        if owner is None:
+            owner = User(username=AUTHOR, email=f"{AUTHOR}@example.com", role="teacher", password_hash=author_hash)
+            db.session.add(owner)
+        for code in sorted({t["topic_code"] for t in bank}):
+            if Topic.query.filter_by(code=code).first() is None:
+                src = topics.get(code, {})
+                topic = Topic(code=code, name=src.get("name") or code, description=src.get("description"))
+                db.session.add(topic)
+                db.session.flush()
+                for level in ("low", "medium", "high"):
+                    db.session.add(TopicLevelConfig(topic_id=topic.id, level=level, task_count_threshold=10,
+                                                    reference_time=300, penalty_weights=[0.7, 0.4]))
+        db.session.commit()
+
+        have = {c for (c,) in db.session.query(MathTask.code).filter(MathTask.code.in_([t["code"] for t in bank]))}
+        missing = [t for t in bank if t["code"] not in have]
+        if missing:
+            report = import_tasks(missing, user_id=owner.id)
+            if report.errors:
+                raise RuntimeError(f"task bank import failed: {report.errors[0].message}")
+
+        taken = {u for (u,) in db.session.query(User.username).filter(User.username.like("replay_s%"))}
+        for n in range(students):
+            name = STUDENT.format(n)
+            if name not in taken:
+                db.session.add(User(username=name, email=f"{name}@example.com", role="student",
+                                    password_hash=pw_hash))
+        db.session.commit()
+
+        tasks = {code: {"id": task_id, "correct_answer": answer}
+                 for code, task_id, answer in db.session.query(MathTask.code, MathTask.id, MathTask.correct_answer)
+                 .filter(MathTask.code.in_([t["code"] for t in bank]))}
+    if map_path:
+        with open(map_path, "w", encoding="utf-8") as f:
+            json.dump(tasks, f, ensure_ascii=False)
+    return tasks
+
+
+# --------------------------------------------------------------------------- replay
+class Recorder:
+    """Задержки, коды ответов и отставание от плана по всем потокам."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {e: [] for e in ENDPOINTS}
+        self.errors = {e: 0 for e in ENDPOINTS}
+        self.statuses = {e: defaultdict(int) for e in ENDPOINTS}
+        self.lag = []
+        self.skipped = 0   # действия студентов, которые не смогли войти
+        self.client_errors = []   # первые исключения клиента (статус 599) — для разбора
+
+    def client_error(self, endpoint, exc):
+        with self.lock:
+            if len(self.client_errors) < 5:
+                self.client_errors.append(f"{endpoint}: {exc!r}")
+
+    def add(self, endpoint, seconds, status, lag):
+        with self.lock:
+            self.latency[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+            # 409 — задача уже решена или заблокирована: штатный ответ
+            if status >= 400 and status != 409:
+                self.errors[endpoint] += 1
+            self.lag.append(lag)
+
+
+def replay(base, plan, tasks, speed, recorder, password):
+    """Поток на синтетического студента; действия стартуют по расписанию plan / speed."""
+    started = [None]
+    ready = threading.Barrier(len(plan) + 1)
+
+    def at(sim_t):
+        return started[0] + sim_t / speed
+
+    def wait_until(moment):
+        delay = moment - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return max(0.0, time.monotonic() - moment)
+
+    def student(entry):
+        session = Session(base)
+        ready.wait()
+        lag = wait_until(at(entry["login"]))
+        t0 = time.perf_counter()
+        try:
+            session.login(STUDENT.format(entry["n"]), password)
+            status = 200
+        except RuntimeError:
+            status = 500
+        except OSError as e:
+            status = 599   # обрыв соединения / таймаут клиента
+            recorder.client_error("login", e)
+        recorder.add("login", time.perf_counter() - t0, status, lag)
+        if status != 200:
+            with recorder.lock:
+                recorder.skipped += len(entry["actions"])
+            return
+        for sim_t, kind, code, correct in entry["actions"]:
+            task = tasks[code]
+            lag = wait_until(at(sim_t))
+            t0 = time.perf_counter()
+            try:
+                if kind == "open":
+                    status, _ = session.request("GET", f"/student/tasks/{task['id']}")
+                else:
+                    status, _ = session.request("POST", f"/student/tasks/{task['id']}/submit",
+                                                data=answer_form(task["correct_answer"], correct))
+            except OSError as e:
+                status = 599
+                recorder.client_error(kind, e)
+            recorder.add(kind, time.perf_counter() - t0, status, lag)
+
+    threads = [threading.Thread(target=student, args=(entry,), daemon=True) for entry in plan]
+    for t in threads:
+        t.start()
+    started[0] = time.monotonic() + 0.5   # запас, чтобы все потоки успели дойти до ожидания
+    ready.wait()
+    for t in threads:
+        t.join()
+    return time.monotonic() - started[0]
+
+
+def histogram(values_ms):
+    counts = [0] * len(BUCKETS)
+    for v in values_ms:
+        counts[bisect.bisect_left(BUCKETS, v)] += 1
+    return counts
+
+
+def summarize(recorder, elapsed, stats, slo_ms, lag_budget_ms):
+    total = sum(len(v) for v in recorder.latency.values())
+    errors = sum(recorder.errors.values())
+    lag_ms = [v * 1000.0 for v in recorder.lag]
+    out = {"elapsed": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 1) if elapsed else 0.0,
+           "errors": errors, "error_rate": round(errors / total, 4) if total else 0.0,
+           "skipped": recorder.skipped, "client_errors": recorder.client_errors, "plan": stats,
+           "lag": {"p50": round(percentile(lag_ms, 50), 1), "p95": round(percentile(lag_ms, 95), 1),
+                   "max": round(max(lag_ms), 1) if lag_ms else 0.0},
+           "buckets_ms": [b if b != float("inf") else "inf" for b in BUCKETS], "endpoints": {}}
+    for e in ENDPOINTS:
+        ms = [v * 1000.0 for v in recorder.latency[e]]
+        out["endpoints"][e] = {
+            "n": len(ms), "errors": recorder.errors[e],
+            "error_rate": round(recorder.errors[e] / len(ms), 4) if ms else 0.0,
+            "statuses": {str(k): v for k, v in sorted(recorder.statuses[e].items())},
+            "p50": round(percentile(ms, 50), 2), "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2), "max": round(max(ms), 2) if ms else 0.0,
+            "histogram": histogram(ms),
+        }
+    slow = [e for e in ENDPOINTS if out["endpoints"][e]["p95"] > slo_ms]
+    reasons = []
+    if slow:
+        reasons.append(f"p95 over {slo_ms:g}ms: {', '.join(slow)}")
+    if out["error_rate"] > 0.01:
+        reasons.append(f"error rate {out['error_rate']:.2%}")
+    if out["lag"]["p95"] > lag_budget_ms:
+        reasons.append(f"schedule lag p95 {out['lag']['p95']:g}ms (server or client fell behind)")
+    if recorder.skipped:
+        reasons.append(f"{recorder.skipped} actions skipped after failed logins")
+    out["verdict"] = {"ok": not reasons, "reasons": reasons}
+    return out
+
+
+def print_plan(stats, speed):
+    print(f"plan: {stats['students']} students, {stats['window']:g}s simulated "
+          f"({stats['window'] / speed:.0f}s real at speed {speed:g}), {stats['requests']} requests "
+          f"{dict(stats['by_endpoint'])}")
+    print(f"  simulated rate: mean {stats['mean_rps']} req/s, peak {stats['peak_rps']} req/s; "
+          f"real rate x{speed:g}: mean {stats['mean_rps'] * speed:.1f} req/s, "
+          f"peak {stats['peak_rps'] * speed:.1f} req/s")
+
+
+def print_summary(summary):
+    print(f"{summary['requests']} requests in {summary['elapsed']}s -> {summary['rps']} req/s, "
+          f"errors={summary['errors']} ({summary['error_rate']:.2%}), "
+          f"lag p50={summary['lag']['p50']}ms p95={summary['lag']['p95']}ms max={summary['lag']['max']}ms")
+    labels = [f"<={b}" if b != "inf" else ">" + str(summary["buckets_ms"][-2]) for b in summary["buckets_ms"]]
+    for e, s in summary["endpoints"].items():
+        print(f"  {e:<7} n={s['n']:<6} p50={s['p50']:8.2f}ms p95={s['p95']:8.2f}ms p99={s['p99']:8.2f}ms "
+              f"max={s['max']:8.2f}ms errors={s['errors']} statuses={s['statuses']}")
+        peak = max(s["histogram"]) or 1
+        for label, count in zip(labels, s["histogram"]):
+            if count:
+                print(f"    {label:>7}ms {count:>7}  {'#' * max(1, round(40 * count / peak))}")
+    for line in summary["client_errors"]:
+        print(f"  client error: {line}")
+    verdict = summary["verdict"]
+    print("verdict: " + ("OK" if verdict["ok"] else "FAIL — " + "; ".join(verdict["reasons"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server to load (ignored with --serve)")
+    parser.add_argument("--serve", action="store_true", help="seed a throw-away SQLite DB and start gunicorn")
+    parser.add_argument("--seed", action="store_true", help="only seed DATABASE_URL (and write --map) and exit")
+    parser.add_argument("--map", help="task_code -> id/answer JSON written by --seed, needed with --url")
+    parser.add_argument("--password", default=os.getenv("LOADTEST_PASSWORD"),
+                        help="password of the replay_s<N> accounts (default: $LOADTEST_PASSWORD; "
+                             "--seed/--serve generate a random one)")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan and exit (no HTTP)")
+    parser.add_argument("--gunicorn-args", default="", help='extra gunicorn flags, e.g. "--workers 4 --threads 2"')
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--students", type=int, default=50, help="synthetic students")
+    parser.add_argument("--window", type=float, default=3600.0, help="simulated seconds to replay")
+    parser.add_argument("--speed", type=float, default=10.0, help="time compression factor")
+    parser.add_argument("--ramp", type=float, default=300.0, help="simulated seconds over which students log in")
+    parser.add_argument("--jitter", type=float, default=0.2, help="random +- factor on every recorded gap")
+    parser.add_argument("--session-gap", type=float, default=3600.0,
+                        help="gaps longer than this (s) separate study sessions")
+    parser.add_argument("--break", dest="pause", type=float, default=60.0,
+                        help="simulated pause that replaces a gap between sessions")
+    parser.add_argument("--timelines", default=TIMELINES, help="glob of attempt timeline JSON files")
+    parser.add_argument("--slo", type=float, default=500.0, help="p95 latency budget per endpoint, ms")
+    parser.add_argument("--lag-budget", type=float, default=1000.0, help="p95 schedule lag budget, ms")
+    parser.add_argument("--seed-value", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    plan = build_plan(load_timelines(args.timelines), args.students, window=args.window, ramp=args.ramp,
+                      jitter=args.jitter, session_gap=args.session_gap, pause=args.pause,
+                      seed_value=args.seed_value)
+    stats = plan_stats(plan, args.window)
+    if args.dry_run:
+        if args.json:
+            print(json.dumps(stats, ensure_ascii=False))
+        else:
+            print_plan(stats, args.speed)
+        return
+
+    password = resolve_password(parser, args)
+    proc = None
+    if args.serve:
+        tmp = tempfile.mkdtemp()
+        os.environ["DATABASE_URL"] = f"sqlite:////{os.path.join(tmp, 'replay.db')}"
+    if args.serve or args.seed:
+        tasks = seed(args.students, password, args.map, throwaway=args.serve)
+        if args.seed:
+            print(f"seeded: {args.students} students, {len(tasks)} tasks; password of replay_s<N>: {password}"
+                  + (f", map -> {args.map}" if args.map else ""))
+            return
+    else:
+        if not args.map:
+            parser.error("--url needs --map (written by --seed against the server's database)")
+        with open(args.map, encoding="utf-8") as f:
+            tasks = json.load(f)
+    unknown = {code for entry in plan for _, _, code, _ in entry["actions"]} - set(tasks)
+    if unknown:
+        raise SystemExit(f"tasks missing on the server: {', '.join(sorted(unknown)[:5])}...")
+
+    url = args.url
+    if args.serve:
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        env.pop("FLASK_RUN_FROM_CLI", None)
+        proc, url = spawn_gunicorn(args.port, shlex.split(args.gunicorn_args), env)
+
+    if not args.json:
+        print_plan(stats, args.speed)
+    recorder = Recorder()
+    try:
+        elapsed = replay(url, plan, tasks, args.speed, recorder, password)
+    finally:
+        if proc is not None:
+            stop(proc)
+    summary = summarize(recorder, elapsed, stats, args.slo, args.lag_budget)
+    summary["config"] = {"url": url, "students": args.students, "speed": args.speed,
+                         "gunicorn_args": args.gunicorn_args}
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+    else:
+        print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
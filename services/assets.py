@@ -0,0 +1,230 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+
+# Сборка статики: отпечатки, предсжатие, «вечный» кэш.
+# `flask assets-build` берёт из static/ только те CSS/JS, на которые ссылаются шаблоны
+# (url_for('static', filename=...)), — неиспользуемые темы Bootstrap в сборку не попадают.
+# Каждый файл копируется в ASSETS_DIST_DIR (по умолчанию static/dist) под именем
+# с хешем содержимого (style.3f2a1b4c.css) вместе со сжатыми вариантами .gz
+# (и .br, если установлен модуль brotli); соответствие имён — в manifest.json.
+# Приложение при старте читает манифест, и url_for('static', filename='css/style.css')
+# сам отдаёт адрес с отпечатком (хук url_defaults; asset_url — то же из Python-кода).
+# Такие файлы отдаются с Cache-Control: immutable на год и в сжатом виде по
+# Accept-Encoding — повторный заход на страницу статику не скачивает вовсе.
+# Если исходник изменился после сборки (размер/время не совпали с манифестом),
+# для него отдаётся живой файл без отпечатка — устаревшая сборка не «залипает».
+# Настройки:
+#   ASSETS_DIST_DIR — каталог сборки (по умолчанию <static>/dist)
+#   ASSETS_ENABLED  — использовать манифест (по умолчанию да, если он есть)
+
+DIST_PREFIX = 'dist/'
+MANIFEST = 'manifest.json'
+ASSET_DIRS = ('css', 'js')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+_HASH_LEN = 8
+
+# url_for('static', filename='...') и asset_url('...') в шаблонах
+_REFERENCE = re.compile(r"""(?:url_for\(\s*['"]static['"]\s*,\s*filename\s*=|asset_url\()\s*['"]([^'"]+)['"]""")
+
+try:  # brotli — необязательная зависимость: без неё собираются только .gz
+    import brotli
+except ImportError:  # pragma: no cover - зависит от окружения
+    brotli = None
+
+
+@dataclass
+class BuildReport:
+    built: Dict[str, str] = field(default_factory=dict)      # исходник -> файл с отпечатком
+    dropped: List[str] = field(default_factory=list)         # CSS/JS, на которые нет ссылок
+    missing: List[str] = field(default_factory=list)         # ссылки на несуществующие файлы
+    source_bytes: int = 0
+    gzip_bytes: int = 0
+    brotli_bytes: int = 0
+
+
+def referenced_assets(template_dirs: Iterable[str]) -> Set[str]:
+    """Пути статики, на которые ссылаются шаблоны."""
+    found: Set[str] = set()
+    for root_dir in template_dirs:
+        for root, _, files in os.walk(root_dir):
+            for name in files:
+                if not name.endswith(('.html', '.jinja', '.j2', '.txt')):
+                    continue
+                with open(os.path.join(root, name), encoding='utf-8', errors='replace') as fh:
+                    found.update(_REFERENCE.findall(fh.read()))
+    return found
+
+
+def _fingerprinted(rel: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:_HASH_LEN]
+    base, ext = os.path.splitext(rel)
+    return f'{base}.{digest}{ext}'
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(data)
+
+
+def build(static_dir: str, template_dirs: Iterable[str], dist_dir: str, clean: bool = False) -> BuildReport:
+    """Собирает отпечатки и сжатые варианты в dist_dir; манифест пишется последним.
+
+    Файлы прошлых сборок не удаляются (их имена не пересекаются с новыми): воркеры,
+    ещё не перечитавшие манифест, и закэшированные страницы продолжают на них ссылаться.
+    clean=True удаляет из dist_dir всё, чего нет в новом манифесте."""
+    report = BuildReport()
+    wanted = referenced_assets(template_dirs)
+    candidates = set()
+    for sub in ASSET_DIRS:
+        for root, _, files in os.walk(os.path.join(static_dir, sub)):
+            for name in files:
+                candidates.add(os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/'))
+    report.dropped = sorted(candidates - wanted)
+    report.missing = sorted(rel for rel in wanted
+                            if rel.split('/', 1)[0] in ASSET_DIRS and rel not in candidates)
+
+    manifest: Dict[str, Dict[str, object]] = {}
+    keep = {MANIFEST}
+    for rel in sorted(wanted & candidates):
+        src = os.path.join(static_dir, rel)
+        with open(src, 'rb') as fh:
+            data = fh.read()
+        target = _fingerprinted(rel, data)
+        variants = {target: data,
+                    # mtime=0 — одинаковый исходник даёт байт-в-байт одинаковый .gz
+                    target + '.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[target + '.br'] = brotli.compress(data, quality=11)
+        for name, payload in variants.items():
+            _write(os.path.join(dist_dir, name), payload)
+            keep.add(name)
+        report.gzip_bytes += len(variants[target + '.gz'])
+        report.brotli_bytes += len(variants.get(target + '.br', b''))
+        stat = os.stat(src)
+        manifest[rel] = {'file': target, 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+        report.built[rel] = target
+        report.source_bytes += len(data)
+
+    os.makedirs(dist_dir, exist_ok=True)
+    tmp = os.path.join(dist_dir, MANIFEST + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(dist_dir, MANIFEST))
+
+    if clean:
+        for root, _, files in os.walk(dist_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.relpath(path, dist_dir).replace(os.sep, '/') not in keep:
+                    os.unlink(path)
+    return report
+
+
+def load_manifest(static_dir: str, dist_dir: str) -> Dict[str, str]:
+    """Исходник -> файл с отпечатком; записи с изменившимся после сборки исходником пропускаются."""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST), encoding='utf-8') as fh:
+            raw = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    mapping = {}
+    for rel, entry in raw.items():
+        try:
+            stat = os.stat(os.path.join(static_dir, rel))
+        except OSError:
+            continue
+        if stat.st_size == entry.get('size') and int(stat.st_mtime) == entry.get('mtime') \
+                and os.path.isfile(os.path.join(dist_dir, entry['file'])):
+            mapping[rel] = entry['file']
+    return mapping
+
+
+def template_dirs(app) -> List[str]:
+    """Каталоги шаблонов приложения и блюпринтов (без повторов)."""
+    dirs = []
+    for owner in [app, *app.blueprints.values()]:
+        if owner.template_folder:
+            path = os.path.abspath(os.path.join(owner.root_path, owner.template_folder))
+            if os.path.isdir(path) and path not in dirs:
+                dirs.append(path)
+    return dirs
+
+
+def _state():
+    return current_app.extensions['assets']
+
+
+def asset_url(filename: str, **values) -> str:
+    """url_for('static', filename=...) с отпечатком, если файл есть в сборке."""
+    return url_for('static', filename=filename, **values)
+
+
+def _fingerprint_defaults(endpoint: str, values: dict) -> None:
+    if endpoint != 'static':
+        return
+    filename = values.get('filename')
+    target = _state()['manifest'].get(filename) if filename else None
+    if target:
+        values['filename'] = DIST_PREFIX + target
+
+
+def _send_dist(dist_dir: str, rel: str):
+    mimetype = mimetypes.guess_type(rel)[0] or 'application/octet-stream'
+    accept = request.accept_encodings
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accept[encoding] and os.path.isfile(os.path.join(dist_dir, rel + suffix)):
+            resp = send_from_directory(dist_dir, rel + suffix, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+            resp.headers['Content-Encoding'] = encoding
+            break
+    else:
+        resp = send_from_directory(dist_dir, rel, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+
+def _static_view(filename: str):
+    dist_dir = _state()['dist_dir']
+    if filename.startswith(DIST_PREFIX):
+        return _send_dist(dist_dir, filename[len(DIST_PREFIX):])
+    return current_app.send_static_file(filename)
+
+
+def init_app(app) -> None:
+    app.config.setdefault('ASSETS_DIST_DIR', os.getenv('ASSETS_DIST_DIR') or os.path.join(app.static_folder, 'dist'))
+    app.config.setdefault('ASSETS_ENABLED', os.getenv('ASSETS_ENABLED', '1').lower() not in ('0', 'false', 'no'))
+    dist_dir = app.config['ASSETS_DIST_DIR']
+    state = app.extensions['assets'] = {'dist_dir': dist_dir, 'manifest': {}}
+    if app.config['ASSETS_ENABLED']:
+        state['manifest'] = load_manifest(app.static_folder, dist_dir)
+    app.view_functions['static'] = _static_view
+    app.url_defaults(_fingerprint_defaults)
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.cli.command('assets-build')
+    @click.option('--clean', is_flag=True, help='удалить файлы прошлых сборок')
+    def assets_build(clean):
+        """Собирает статику с отпечатками и .gz/.br в ASSETS_DIST_DIR (см. services.assets)"""
+        report = build(app.static_folder, template_dirs(app), app.config['ASSETS_DIST_DIR'], clean=clean)
+        for rel, target in sorted(report.built.items()):
+            print(f'  {rel} -> {target}')
+        if report.dropped:
+            print('Не используются шаблонами (не собраны): ' + ', '.join(report.dropped))
+        if report.missing:
+            print('Шаблоны ссылаются на отсутствующие файлы: ' + ', '.join(report.missing))
+        line = f'Собрано файлов: {len(report.built)}; {report.source_bytes} байт -> gzip {report.gzip_bytes}'
+        if brotli is not None:
+            line += f', brotli {report.brotli_bytes}'
+        print(line)
@@ -0,0 +1,429 @@
+from __future__ import annotations
+import csv
+import io
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import MathTask, TaskAttempt, TopicLevelConfig, User
+from services import metrics
+from services.bulk import ImportRowError, as_int, in_chunks
+from services.submission import attempt_score, invalidate_attempt_counters
+
+# Массовый импорт попыток.
+# Строки обрабатываются пачками: на пачку — несколько IN-запросов (задачи по коду/id,
+# пользователи по логину/id, уже записанные номера попыток по парам, веса тем),
+# номера попыток и баллы считаются в памяти, вставка — одним executemany,
+# коммит и отчёт о прогрессе — после каждой пачки.
+# CSV и NDJSON читаются из потока построчно (iter_csv_rows/iter_ndjson_rows),
+# поэтому память ограничена размером пачки, а не размером файла.
+
+CHUNK_SIZE = 1000
+
+
+def parse_created_at(val) -> Optional[datetime]:
+    """ISO8601 или 'YYYY-MM-DD HH:MM:SS' / 'YYYY-MM-DD'; иначе None."""
+    if not val:
+        return None
+    if isinstance(val, datetime):
+        return val
+    try:
+        return datetime.fromisoformat(str(val))
+    except ValueError:
+        pass
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(str(val), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_answer(val):
+    """Приводит ответ к пригодному для сохранения виду:
+    - если строка — пытаемся распарсить JSON, иначе возвращаем исходную строку
+    - если пустая строка/None — возвращаем None
+    - dict/list/числа/булевы — возвращаем как есть
+    """
+    if val is None:
+        return None
+    if isinstance(val, (dict, list, int, float, bool)):
+        return val
+    if isinstance(val, str):
+        s = val.strip()
+        if not s:
+            return None
+        try:
+            return json.loads(s)
+        except ValueError:
+            return s
+    return val
+
+
+def partial_score(weights: Optional[Sequence], attempt_number: int, is_correct: bool) -> float:
+    """partial_score попытки: неуспешная -> 0.0, успешная — по attempt_score
+    (та же политика, что при отправке ответа студентом)."""
+    return attempt_score(attempt_number, weights) if is_correct else 0.0
+
+
+@dataclass
+class ImportReport:
+    total: int = 0                 # обработано строк
+    created: int = 0               # вставлено попыток
+    chunks: int = 0                # закоммиченных пачек
+    errors: List[ImportRowError] = field(default_factory=list)
+
+    @property
+    def error_count(self) -> int:
+        return len(self.errors)
+
+    def as_dict(self, max_errors: int = 100) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'created': self.created,
+            'chunks': self.chunks,
+            'error_count': self.error_count,
+            'errors': [{'row': e.row, 'message': e.message} for e in self.errors[:max_errors]],
+        }
+
+
+@dataclass
+class _TaskInfo:
+    id: int
+    topic_id: int
+    level: str
+    max_score: Optional[float]
+    correct_answer: Any
+
+
+_TRUE_STRINGS = {'1', 'true', 't', 'yes', 'y', 'да', '+'}
+
+
+def _as_bool(val) -> bool:
+    """is_correct из JSON (true/1) или CSV ('TRUE', 'false', '1', 'да')."""
+    if isinstance(val, str):
+        return val.strip().lower() in _TRUE_STRINGS
+    return bool(val)
+
+
+# ---------------------------------------------------------------- readers
+
+IMPORT_FORMATS = ('json', 'csv', 'ndjson')
+_EXTENSIONS = {'.json': 'json', '.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+
+@dataclass
+class BadRow:
+    """Строка, которую не удалось разобрать (попадёт в отчёт как ошибка)."""
+    message: str
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Формат по расширению файла: 'json' | 'csv' | 'ndjson' или None."""
+    name = (filename or '').lower()
+    for ext, fmt in _EXTENSIONS.items():
+        if name.endswith(ext):
+            return fmt
+    return None
+
+
+@contextmanager
+def _text_stream(stream: IO) -> Iterator[IO[str]]:
+    """Текстовая обёртка над бинарным потоком загрузки (BOM от Excel срезается).
+    Сам поток после чтения не закрывается — им владеет вызывающий код."""
+    if isinstance(stream, io.TextIOBase):
+        yield stream
+        return
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield text
+    finally:
+        text.detach()
+
+
+def iter_csv_rows(stream: IO) -> Iterator[dict]:
+    """Строки CSV с заголовком как словари; пустые ячейки -> None."""
+    with _text_stream(stream) as text:
+        for record in csv.DictReader(text):
+            if None in record:
+                yield BadRow(f'лишние значения в строке CSV ({len(record[None])})')
+                continue
+            yield {k.strip(): (v.strip() or None) if isinstance(v, str) else v
+                   for k, v in record.items() if k}
+
+
+def iter_ndjson_rows(stream: IO) -> Iterator[Any]:
+    """Объекты NDJSON (по одному JSON на строку); пустые строки пропускаются."""
+    with _text_stream(stream) as text:
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield BadRow(f'некорректный JSON ({e.msg})')
+
+
+class AttemptImporter:
+    """Импорт попыток пачками. Состояние (найденные задачи/пользователи,
+    занятые номера по парам, веса) переиспользуется между пачками."""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE,
+                 progress: Optional[Callable[[ImportReport], None]] = None):
+        self.chunk_size = max(1, chunk_size)
+        self.progress = progress
+        self.report = ImportReport()
+        self._tasks_by_code: Dict[str, Optional[_TaskInfo]] = {}
+        self._tasks_by_id: Dict[int, Optional[_TaskInfo]] = {}
+        self._users_by_name: Dict[str, Optional[int]] = {}
+        self._users_by_id: Dict[int, Optional[int]] = {}
+        self._pair_numbers: Dict[Tuple[int, int], Set[int]] = {}
+        self._weights: Dict[Tuple[int, str], list] = {}
+
+    # ------------------------------------------------------------ resolution
+    def _load_tasks(self, codes: Set[str], ids: Set[int]) -> None:
+        cols = (MathTask.id, MathTask.code, MathTask.topic_id, MathTask.level,
+                MathTask.max_score, MathTask.correct_answer)
+        codes = sorted(c for c in codes if c not in self._tasks_by_code)
+        for part in in_chunks(codes):
+            for row in db.session.execute(select(*cols).where(MathTask.code.in_(part))):
+                self._tasks_by_code[row.code] = _TaskInfo(row.id, row.topic_id, row.level,
+                                                          row.max_score, row.correct_answer)
+        for c in codes:
+            self._tasks_by_code.setdefault(c, None)
+
+        ids = sorted(i for i in ids if i not in self._tasks_by_id)
+        for part in in_chunks(ids):
+            for row in db.session.execute(select(*cols).where(MathTask.id.in_(part))):
+                self._tasks_by_id[row.id] = _TaskInfo(row.id, row.topic_id, row.level,
+                                                      row.max_score, row.correct_answer)
+        for i in ids:
+            self._tasks_by_id.setdefault(i, None)
+
+    def _load_users(self, names: Set[str], ids: Set[int]) -> None:
+        names = sorted(n for n in names if n not in self._users_by_name)
+        for part in in_chunks(names):
+            for uid, username in db.session.execute(
+                    select(User.id, User.username).where(User.username.in_(part))):
+                self._users_by_name[username] = uid
+        for n in names:
+            self._users_by_name.setdefault(n, None)
+
+        ids = sorted(i for i in ids if i not in self._users_by_id)
+        for part in in_chunks(ids):
+            for (uid,) in db.session.execute(select(User.id).where(User.id.in_(part))):
+                self._users_by_id[uid] = uid
+        for i in ids:
+            self._users_by_id.setdefault(i, None)
+
+    def _load_pairs(self, pairs: Set[Tuple[int, int]]) -> None:
+        missing = sorted(p for p in pairs if p not in self._pair_numbers)
+        for p in missing:
+            self._pair_numbers[p] = set()
+        for part in in_chunks(missing):
+            for uid, tid, number in db.session.execute(
+                    select(TaskAttempt.user_id, TaskAttempt.task_id, TaskAttempt.attempt_number)
+                    .where(tuple_(TaskAttempt.user_id, TaskAttempt.task_id).in_(part))):
+                if number:
+                    self._pair_numbers[(uid, tid)].add(number)
+
+    def _load_weights(self, keys: Set[Tuple[int, str]]) -> None:
+        missing = [k for k in keys if k not in self._weights]
+        if not missing:
+            return
+        topic_ids = sorted({k[0] for k in missing})
+        for part in in_chunks(topic_ids):
+            for topic_id, level, weights in db.session.execute(
+                    select(TopicLevelConfig.topic_id, TopicLevelConfig.level, TopicLevelConfig.penalty_weights)
+                    .where(TopicLevelConfig.topic_id.in_(part))):
+                self._weights[(topic_id, level)] = list(weights) if isinstance(weights, (list, tuple)) else []
+        for k in missing:
+            self._weights.setdefault(k, [])
+
+    def _resolve_task(self, item: dict) -> Optional[_TaskInfo]:
+        code = str(item.get('task_code') or '').strip()
+        task = self._tasks_by_code.get(code) if code else None
+        if task is None and item.get('task_id'):
+            tid = as_int(item.get('task_id'))
+            task = self._tasks_by_id.get(tid) if tid is not None else None
+        return task
+
+    def _resolve_user(self, item: dict) -> Optional[int]:
+        username = str(item.get('username') or '').strip()
+        uid = self._users_by_name.get(username) if username else None
+        if uid is None and item.get('user_id'):
+            raw = as_int(item.get('user_id'))
+            uid = self._users_by_id.get(raw) if raw is not None else None
+        return uid
+
+    # ------------------------------------------------------------ processing
+    def _prepare(self, rows: List[Tuple[int, dict]]) -> List[dict]:
+        codes, task_ids, names, user_ids = set(), set(), set(), set()
+        for _, item in rows:
+            if not isinstance(item, dict):
+                continue
+            code = str(item.get('task_code') or '').strip()
+            if code:
+                codes.add(code)
+            if item.get('task_id') and as_int(item.get('task_id')) is not None:
+                task_ids.add(as_int(item.get('task_id')))
+            username = str(item.get('username') or '').strip()
+            if username:
+                names.add(username)
+            if item.get('user_id') and as_int(item.get('user_id')) is not None:
+                user_ids.add(as_int(item.get('user_id')))
+        self._load_tasks(codes, task_ids)
+        self._load_users(names, user_ids)
+
+        resolved = []
+        for i, item in rows:
+            if isinstance(item, BadRow):
+                self.report.errors.append(ImportRowError(i, f'Строка {i}: {item.message}'))
+                continue
+            if not isinstance(item, dict):
+                self.report.errors.append(ImportRowError(i, f'Строка {i}: ожидается объект'))
+                continue
+            task = self._resolve_task(item)
+            if task is None:
+                self.report.errors.append(ImportRowError(i, f'Строка {i}: задача не найдена (task_code/task_id)'))
+                continue
+            user_id = self._resolve_user(item)
+            if user_id is None:
+                self.report.errors.append(ImportRowError(i, f'Строка {i}: студент не найден (username/user_id)'))
+                continue
+            resolved.append((i, item, task, user_id))
+
+        self._load_pairs({(uid, task.id) for _, _, task, uid in resolved})
+        self._load_weights({(task.topic_id, task.level) for _, _, task, _ in resolved})
+
+        values = []
+        for i, item, task, user_id in resolved:
+            numbers = self._pair_numbers[(user_id, task.id)]
+            raw_number = item.get('attempt_number')
+            if raw_number:
+                attempt_number = as_int(raw_number)
+                if attempt_number is None or attempt_number < 1:
+                    self.report.errors.append(ImportRowError(i, f'Строка {i}: некорректный attempt_number'))
+                    continue
+                if attempt_number in numbers:
+                    self.report.errors.append(
+                        ImportRowError(i, f'Строка {i}: попытка №{attempt_number} уже существует'))
+                    continue
+            else:
+                attempt_number = max(numbers, default=0) + 1
+            try:
+                time_spent = int(item.get('time_spent') or 0)
+                hints_used = int(item.get('hints_used') or 0)
+            except (TypeError, ValueError):
+                self.report.errors.append(ImportRowError(i, f'Строка {i}: некорректные time_spent/hints_used'))
+                continue
+
+            ua = normalize_answer(item.get('user_answer'))
+            if ua is None:
+                ua = normalize_answer(task.correct_answer)
+            is_correct = _as_bool(item.get('is_correct', False))
+            try:
+                component_scores = float(task.max_score or 0)
+            except (TypeError, ValueError):
+                component_scores = 0.0
+
+            numbers.add(attempt_number)
+            values.append({
+                'user_id': user_id,
+                'task_id': task.id,
+                'attempt_number': attempt_number,
+                'is_correct': is_correct,
+                'partial_score': partial_score(self._weights[(task.topic_id, task.level)],
+                                               attempt_number, is_correct),
+                'component_scores': component_scores,
+                'time_spent': time_spent,
+                'hints_used': hints_used,
+                'created_at': parse_created_at(item.get('created_at')) or datetime.utcnow(),
+                'user_answer': ua,
+                '_row': i,
+            })
+        return values
+
+    def _insert(self, values: List[dict]) -> int:
+        if not values:
+            return 0
+        rows = [{k: v for k, v in val.items() if k != '_row'} for val in values]
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(TaskAttempt), rows)
+            return len(rows)
+        except IntegrityError:
+            # Номер успел занять кто-то другой — вставляем пачку построчно
+            created = 0
+            for val, row in zip(values, rows):
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(TaskAttempt), [row])
+                    created += 1
+                except IntegrityError:
+                    self.report.errors.append(ImportRowError(
+                        val['_row'], f"Строка {val['_row']}: попытка №{row['attempt_number']} уже существует"))
+            return created
+
+    def feed(self, rows: List[Tuple[int, dict]]) -> None:
+        """Обрабатывает одну пачку строк [(номер строки, объект)] и коммитит её."""
+        seen = len(self.report.errors)
+        values = self._prepare(rows)
+        created = self._insert(values)
+        # ошибки пачки — в порядке строк файла, как при построчном импорте
+        self.report.errors[seen:] = sorted(self.report.errors[seen:], key=lambda e: e.row)
+        invalidate_attempt_counters({(v['user_id'], v['task_id']) for v in values})
+        db.session.commit()
+        self.report.total += len(rows)
+        self.report.created += created
+        self.report.chunks += 1
+        if self.progress:
+            self.progress(self.report)
+
+    def run(self, items: Iterable[dict], start: int = 1) -> ImportReport:
+        numbered = enumerate(items, start=start)
+        while True:
+            chunk = list(islice(numbered, self.chunk_size))
+            if not chunk:
+                break
+            self.feed(chunk)
+        return self.report
+
+
+def import_attempts(items: Iterable[dict], chunk_size: int = CHUNK_SIZE,
+                    progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+    """Импортирует попытки из последовательности объектов (формат JSON-импорта админки)."""
+    started = time.perf_counter()
+    report = AttemptImporter(chunk_size=chunk_size, progress=progress).run(items)
+    metrics.record_rows('import', 'attempts', report.total, time.perf_counter() - started, written=report.created)
+    return report
+
+
+def import_attempts_stream(stream: IO, fmt: str, chunk_size: int = CHUNK_SIZE,
+                           progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+    """Импорт из файла загрузки: CSV и NDJSON читаются построчно, JSON — целиком.
+
+    Номер строки в ошибках — номер записи (для CSV — без заголовка).
+    """
+    if fmt == 'csv':
+        items = iter_csv_rows(stream)
+    elif fmt == 'ndjson':
+        items = iter_ndjson_rows(stream)
+    elif fmt == 'json':
+        with _text_stream(stream) as text:
+            payload = json.load(text)
+        if not isinstance(payload, list):
+            raise ValueError('JSON должен содержать массив попыток')
+        items = payload
+    else:
+        raise ValueError(f'Неизвестный формат импорта: {fmt}')
+    return import_attempts(items, chunk_size=chunk_size, progress=progress)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, func, select
+
+from extensions import db
+from models import TaskAttempt
+from services.bulk import in_chunks
+from services.keyset import reset_counts
+from services.submission import invalidate_attempt_counters
+
+# Массовое удаление попыток (по фильтру журнала или по списку id).
+# Удаляем пачками по BATCH_SIZE, каждая пачка — своя короткая транзакция:
+# сброс счётчиков затронутых пар (студент, задача) и DELETE по id коммитятся
+# вместе, поэтому счётчики никогда не расходятся с task_attempts, а отправки
+# ответов в SQLite ждут блокировку не дольше одной пачки.
+# Граница — максимальный id на момент старта: попытки, созданные во время
+# удаления, не трогаем, и цикл гарантированно заканчивается.
+
+BATCH_SIZE = 500
+
+
+@dataclass
+class PurgeReport:
+    total: int = 0                 # подходило под условие на старте
+    deleted: int = 0               # удалено попыток
+    batches: int = 0               # закоммиченных пачек
+    touched: Set[Tuple[int, int]] = field(default_factory=set, repr=False)  # пары студент–задача
+
+    @property
+    def pairs(self) -> int:
+        """Сколько счётчиков попыток сброшено (различных пар)."""
+        return len(self.touched)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'total': self.total, 'deleted': self.deleted, 'batches': self.batches, 'pairs': self.pairs}
+
+
+def _delete_rows(rows: Sequence[Any], report: PurgeReport) -> None:
+    """Удаляет одну пачку (строки id, user_id, task_id) и коммитит."""
+    pairs = {(r.user_id, r.task_id) for r in rows}
+    invalidate_attempt_counters(pairs)
+    res = db.session.execute(
+        delete(TaskAttempt)
+        .where(TaskAttempt.id.in_([r.id for r in rows]))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    report.deleted += res.rowcount
+    report.batches += 1
+    report.touched |= pairs
+
+
+def purge_attempts(clauses: List[Any], batch: int = BATCH_SIZE,
+                   progress: Optional[Callable[[PurgeReport], None]] = None) -> PurgeReport:
+    """Удаляет все попытки под условиями clauses (как у фильтров журнала) пачками."""
+    batch = max(1, batch)
+    report = PurgeReport()
+    max_id, report.total = db.session.execute(
+        select(func.max(TaskAttempt.id), func.count(TaskAttempt.id)).where(*clauses)
+    ).one()
+    db.session.commit()  # не держим читающую транзакцию между пачками
+    last_id = 0
+    while max_id is not None:
+        rows = db.session.execute(
+            select(TaskAttempt.id, TaskAttempt.user_id, TaskAttempt.task_id)
+            .where(*clauses, TaskAttempt.id > last_id, TaskAttempt.id <= max_id)
+            .order_by(TaskAttempt.id)
+            .limit(batch)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        _delete_rows(rows, report)
+        if progress:
+            progress(report)
+    reset_counts()  # «Всего ≈» в журнале не должно показывать удалённое
+    return report
+
+
+def delete_attempts(ids: Iterable[int], batch: int = BATCH_SIZE) -> PurgeReport:
+    """Удаляет попытки по списку id — пачками, а не одним огромным IN (...)."""
+    report = PurgeReport()
+    ids = sorted({int(i) for i in ids})
+    report.total = len(ids)
+    for part in in_chunks(ids, max(1, batch)):
+        rows = db.session.execute(
+            select(TaskAttempt.id, TaskAttempt.user_id, TaskAttempt.task_id).where(TaskAttempt.id.in_(part))
+        ).all()
+        if rows:
+            _delete_rows(rows, report)
+    reset_counts()
+    return report
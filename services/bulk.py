@@ -0,0 +1,70 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional, Sequence
+
+# Общее для массовых операций (импорт попыток, заданий и пользователей, удаление
+# попыток): разбиение IN-списков на части, разбор чисел из файла, строка отчёта
+# об ошибке и проверка структуры correct_answer.
+# Модуль не зависит от Flask и форм — его используют и фоновые задачи, и CLI.
+
+IN_CHUNK = 500  # ограничение числа параметров в IN (SQLite)
+
+LEVELS = ('low', 'medium', 'high')
+ANSWER_TYPES = ('number', 'variables', 'interval', 'sequence')
+
+
+@dataclass
+class ImportRowError:
+    row: int
+    message: str
+
+
+def in_chunks(values: Sequence, size: int = IN_CHUNK) -> Iterator[Sequence]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def as_int(val) -> Optional[int]:
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return None
+
+
+def check_answer_json(obj: Any) -> bool:
+    """
+    Мини-валидация структуры correct_answer:
+    ожидаем объект с ключом type и минимальными полями по типу.
+    Ошибка — ValueError с текстом для пользователя.
+    """
+    if not isinstance(obj, dict):
+        raise ValueError("Правильный ответ: ожидается JSON-объект.")
+    t = obj.get("type")
+    if t not in ANSWER_TYPES:
+        raise ValueError("Правильный ответ: неизвестный type.")
+    if t == "number" and not isinstance(obj.get("value"), (int, float)):
+        raise ValueError("Правильный ответ: для type=number нужен числовой value.")
+    if t == "variables":
+        if not isinstance(obj.get("variables"), list):
+            raise ValueError("Правильный ответ: для type=variables нужен список variables.")
+        if not all(isinstance(v, dict) and "name" in v and "value" in v for v in obj.get("variables", [])):
+            raise ValueError("Правильный ответ: для type=variables все переменные должны иметь name и value.")
+    if t == "sequence":
+        vals = obj.get("sequence_values")
+        if not isinstance(vals, list):
+            raise ValueError("Правильный ответ: для type=sequence нужен список sequence_values.")
+        if not all(isinstance(v, (int, float)) for v in vals):
+            raise ValueError("Правильный ответ: для type=sequence значения должны быть числами.")
+    if t == "interval":
+        if "start" not in obj or "end" not in obj:
+            raise ValueError("Правильный ответ: для type=interval нужны поля start/end.")
+        start = obj.get("start")
+        end = obj.get("end")
+        # null допустим для -∞/+∞, иначе — число
+        if start is not None and not isinstance(start, (int, float)):
+            raise ValueError("Правильный ответ: start должен быть числом или null.")
+        if end is not None and not isinstance(end, (int, float)):
+            raise ValueError("Правильный ответ: end должен быть числом или null.")
+        if start is not None and end is not None and start >= end:
+            raise ValueError("Правильный ответ: start должен быть меньше end для интервала.")
+    return True
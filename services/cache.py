@@ -0,0 +1,434 @@
+from __future__ import annotations
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+from urllib.parse import urlsplit
+
+import click
+
+# Кэш приложения: пространства имён поверх двух уровней.
+# - локальный: LRU с TTL в памяти процесса, отдельный на каждое пространство
+#   (большие фрагменты не вытесняют справочник); значения хранятся как есть,
+#   без копирования — повторный get возвращает тот же объект;
+# - общий (CACHE_URL): один на все воркеры — файл SQLite (sqlite:////dev/shm/app-cache.db)
+#   или сервер с протоколом Redis (redis://host:6379/0; Valkey, KeyDB и т.п.; нужен пакет redis).
+#   Значения — pickle; без CACHE_URL общего уровня нет, всё живёт в памяти процесса.
+# Промах локального уровня идёт в общий, найденное копируется в локальный.
+# get_or_set защищает от «лавины» промахов: в процессе значение по ключу считает один
+# поток, остальные ждут его результат (single-flight); между процессами то же делает
+# аренда ключа в общем уровне (add с TTL) — остальные процессы ждут значение там.
+# Сбой общего уровня не ломает запрос: он считается промахом (stats.errors).
+# Локальные копии не инвалидируются из других процессов — живут до TTL; где нужна
+# мгновенная инвалидация, в ключ входит версия данных (справочник, фрагменты задач).
+# Общий уровень переживает деплой (Redis; при выкатке старые и новые воркеры работают
+# вместе), поэтому в его ключах есть версии: CACHE_VERSION — версия схемы БД (по
+# умолчанию отпечаток списка миграций) и version пространства — её повышают, когда
+# меняется форма кэшируемого значения. Запись другой версии просто не находится.
+# Настройки TopicLevelConfig и EvaluationSystemConfig не кэшируются: это одна строка
+# по уникальному индексу на отправку ответа или запуск оценки, а правят их несколько
+# админских маршрутов — сбросы кэша во всех них стоили бы дороже выигрыша.
+# Настройки:
+#   CACHE_URL          — общий уровень (по умолчанию нет; gunicorn.conf.py задаёт SQLite в /dev/shm)
+#   CACHE_PREFIX       — префикс ключей в общем уровне (по умолчанию app)
+#   CACHE_VERSION      — версия в ключах общего уровня (по умолчанию отпечаток migrations/versions)
+#   CACHE_LOCK_SECONDS — сколько ждать значение, которое считает другой процесс (по умолчанию 10)
+
+log = logging.getLogger(__name__)
+
+try:  # redis — необязательная зависимость: нужен только для redis:// в CACHE_URL
+    import redis
+except ImportError:  # pragma: no cover - зависит от окружения
+    redis = None
+
+MISSING = object()
+SHARED_MAX_TTL = 24 * 3600     # записи без TTL в общем уровне всё же не вечные
+_POLL_SECONDS = 0.02
+
+
+class MemoryBackend:
+    """Потокобезопасный LRU с TTL в памяти процесса."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()   # ключ -> (истекает, значение)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return MISSING
+            expires, value = item
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """Общий уровень в файле SQLite (WAL): воркеры одной машины. Значения — байты."""
+
+    _PURGE_EVERY = 500   # записей между чистками протухшего
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():   # после fork — своё соединение
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')   # кэш: потеря при сбое питания не страшна
+            conn.execute('CREATE TABLE IF NOT EXISTS cache '
+                         '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute('SELECT value FROM cache WHERE key = ? AND expires > ?',
+                                   (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, data: bytes, ttl: float) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)', (key, data, now + ttl))
+        self._writes += 1
+        if self._writes % self._PURGE_EVERY == 0:
+            conn.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+
+    def add(self, key: str, data: bytes, ttl: float) -> bool:
+        """Записывает, только если ключа нет (или он протух); True — записали."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+        cur = conn.execute('INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                           (key, data, now + ttl))
+        return cur.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self, prefix: str = '') -> None:
+        if prefix:
+            self._conn().execute('DELETE FROM cache WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+        else:
+            self._conn().execute('DELETE FROM cache')
+
+
+class RedisBackend:
+    """Общий уровень на сервере с протоколом Redis (через пакет redis)."""
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError('для CACHE_URL=redis://... нужен пакет redis')
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, data: bytes, ttl: float) -> None:
+        self.client.set(key, data, px=max(1, int(ttl * 1000)))
+
+    def add(self, key: str, data: bytes, ttl: float) -> bool:
+        return bool(self.client.set(key, data, px=max(1, int(ttl * 1000)), nx=True))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def clear(self, prefix: str = '') -> None:
+        batch = []
+        pattern = re.sub(r'([*?\[\]\\])', r'\\\1', prefix) + '*'   # префикс буквально, не glob
+        for key in self.client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+
+def make_backend(url: str):
+    """Общий уровень по CACHE_URL; пустая строка или memory:// — без общего уровня."""
+    if not url or url.startswith('memory:'):
+        return None
+    scheme = urlsplit(url).scheme
+    if scheme == 'sqlite':
+        path = urlsplit(url).path[1:]   # sqlite:///rel.db, sqlite:////abs/path.db — как у SQLAlchemy
+        if not path:
+            raise ValueError(f'CACHE_URL без пути к файлу: {url}')
+        return SQLiteBackend(path)
+    if scheme in ('redis', 'rediss', 'unix'):
+        return RedisBackend(url)
+    raise ValueError(f'Неизвестная схема CACHE_URL: {url}')
+
+
+def schema_version(root: str) -> str:
+    """Отпечаток миграций (имена файлов migrations/versions): новая миграция — новая версия.
+    Без импорта alembic — он нужен только командам flask db."""
+    try:
+        names = sorted(n for n in os.listdir(os.path.join(root, 'migrations', 'versions')) if n.endswith('.py'))
+    except OSError:
+        return ''
+    return hashlib.sha1('\n'.join(names).encode()).hexdigest()[:8]
+
+
+@dataclass
+class CacheStats:
+    # Счётчики увеличиваются без блокировки: под потоками gthread они приблизительные
+    # (редкие потерянные инкременты) — для метрик этого достаточно.
+    hits: int = 0          # из локального уровня
+    shared_hits: int = 0   # из общего уровня
+    misses: int = 0
+    loads: int = 0         # вызовов загрузчика в get_or_set
+    waits: int = 0         # промахов, дождавшихся чужой загрузки (single-flight/аренда)
+    errors: int = 0        # сбоев общего уровня
+
+
+class _Flight:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = MISSING
+        self.error: Optional[BaseException] = None
+
+
+class Namespace:
+    """Пространство имён кэша: свой локальный LRU, общий уровень — с префиксом имени."""
+
+    def __init__(self, cache: 'Cache', name: str, ttl: Optional[float] = None,
+                 maxsize: int = 1024, shared: bool = True, version: int = 1):
+        self.cache = cache
+        self.name = name
+        self.version = version
+        self.ttl = ttl
+        self.shared = shared
+        self.local = MemoryBackend(maxsize)
+        self.stats = CacheStats()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._flights_lock = threading.Lock()
+
+    # --- совместимость со счётчиками прежних кэшей (metrics.register_cache)
+    @property
+    def hits(self) -> int:
+        return self.stats.hits + self.stats.shared_hits
+
+    @property
+    def misses(self) -> int:
+        return self.stats.misses
+
+    @property
+    def maxsize(self) -> int:
+        return self.local.maxsize
+
+    @maxsize.setter
+    def maxsize(self, value: int) -> None:
+        self.local.maxsize = value
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    # --- общий уровень
+    def _backend(self):
+        return self.cache.backend if self.shared else None
+
+    def _shared_prefix(self) -> str:
+        return f'{self.cache.prefix}:{self.cache.version}:{self.name}:'
+
+    def _shared_key(self, key: Hashable) -> str:
+        return f'{self._shared_prefix()}v{self.version}:{key!r}'
+
+    def _shared_call(self, method: str, *args, default=None):
+        backend = self._backend()
+        if backend is None:
+            return default
+        try:
+            return getattr(backend, method)(*args)
+        except Exception as exc:   # недоступен или испорчен — работаем как без него
+            self.stats.errors += 1
+            if self.stats.errors == 1:
+                log.warning('cache %s: shared backend error: %s', self.name, exc)
+            return default
+
+    def _shared_get(self, key: Hashable) -> Any:
+        data = self._shared_call('get', self._shared_key(key))
+        if data is None:
+            return MISSING
+        try:
+            return pickle.loads(data)
+        except Exception:   # запись от другой версии кода — считаем промахом
+            return MISSING
+
+    # --- чтение/запись
+    def _lookup(self, key: Hashable) -> Any:
+        value = self.local.get(key)
+        if value is not MISSING:
+            self.stats.hits += 1
+            return value
+        value = self._shared_get(key)
+        if value is not MISSING:
+            self.stats.shared_hits += 1
+            self.local.set(key, value, self.ttl)
+            return value
+        self.stats.misses += 1
+        return MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._lookup(key)
+        return default if value is MISSING else value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl or self.ttl
+        self.local.set(key, value, ttl)
+        if self._backend() is not None:
+            self._shared_call('set', self._shared_key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                              min(ttl or SHARED_MAX_TTL, SHARED_MAX_TTL))
+
+    def delete(self, key: Hashable) -> None:
+        self.local.delete(key)
+        self._shared_call('delete', self._shared_key(key))
+
+    def clear(self) -> None:
+        """Очищает пространство (в общем уровне — для всех процессов и версий пространства).
+        Счётчики не сбрасываются: метрики — монотонные счётчики."""
+        self.local.clear()
+        self._shared_call('clear', self._shared_prefix())
+
+    def get_or_set(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Значение из кэша или loader() — один на ключ, сколько бы потоков и процессов ни промахнулись."""
+        value = self._lookup(key)
+        if value is not MISSING:
+            return value
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            self.stats.waits += 1
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._load(key, loader, ttl)
+            return flight.value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float]) -> Any:
+        lease_key = self._shared_key(key) + ':lease'
+        leased = False
+        if self._backend() is not None:
+            wait = self.cache.lock_seconds
+            leased = self._shared_call('add', lease_key, str(os.getpid()).encode(), wait, default=True)
+            if not leased:
+                # считает другой процесс — ждём его результат в общем уровне
+                deadline = time.monotonic() + wait
+                while time.monotonic() < deadline:
+                    time.sleep(_POLL_SECONDS)
+                    value = self._shared_get(key)
+                    if value is not MISSING:
+                        self.stats.waits += 1
+                        self.local.set(key, value, ttl or self.ttl)
+                        return value
+                # не дождались (процесс упал или загрузка дольше аренды) — считаем сами
+        try:
+            self.stats.loads += 1
+            value = loader()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            if leased:
+                self._shared_call('delete', lease_key)
+
+
+class Cache:
+    """Расширение Flask: реестр пространств имён и общий уровень (см. заголовок модуля)."""
+
+    def __init__(self):
+        self.backend = None
+        self.prefix = 'app'
+        self.version = ''
+        self.lock_seconds = 10.0
+        self.namespaces: Dict[str, Namespace] = {}
+
+    def namespace(self, name: str, ttl: Optional[float] = None, maxsize: int = 1024,
+                  shared: bool = True, version: int = 1) -> Namespace:
+        """Пространство имён (повторный вызов с тем же именем возвращает существующее).
+        version — версия формы значений: повысьте, если кэшируемое значение изменило вид."""
+        ns = self.namespaces.get(name)
+        if ns is None:
+            ns = self.namespaces[name] = Namespace(self, name, ttl=ttl, maxsize=maxsize,
+                                                   shared=shared, version=version)
+        return ns
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: asdict(ns.stats) for name, ns in sorted(self.namespaces.items())}
+
+    def clear(self) -> None:
+        for ns in self.namespaces.values():
+            ns.clear()
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('CACHE_URL', os.getenv('CACHE_URL', ''))
+        app.config.setdefault('CACHE_PREFIX', os.getenv('CACHE_PREFIX', 'app'))
+        app.config.setdefault('CACHE_VERSION', os.getenv('CACHE_VERSION') or schema_version(app.root_path))
+        app.config.setdefault('CACHE_LOCK_SECONDS', float(os.getenv('CACHE_LOCK_SECONDS', '10')))
+        self.prefix = app.config['CACHE_PREFIX']
+        self.version = app.config['CACHE_VERSION']
+        self.lock_seconds = app.config['CACHE_LOCK_SECONDS']
+        try:
+            self.backend = make_backend(app.config['CACHE_URL'])
+        except (ValueError, RuntimeError) as exc:   # общий уровень не поднялся — только память процесса
+            app.logger.warning('shared cache disabled: %s', exc)
+            self.backend = None
+        app.extensions['cache'] = self
+
+        @app.cli.command('cache-clear')
+        @click.argument('names', nargs=-1)
+        def cache_clear(names):
+            """Очищает кэш (все пространства или перечисленные), включая общий уровень"""
+            targets = [self.namespaces[n] for n in names if n in self.namespaces] if names \
+                else list(self.namespaces.values())
+            for ns in targets:
+                ns.clear()
+            print('Очищено: ' + (', '.join(ns.name for ns in targets) or 'ничего'))
@@ -0,0 +1,158 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from extensions import cache, db
+from models import CacheVersion, MathTask, Topic
+from services import metrics
+
+# Справочник тем и названий задач для селектов.
+# Копия живёт в кэше приложения (extensions.cache) под ключом (БД, версия из cache_versions).
+# На запрос — одно чтение версии по первичному ключу; полная перезагрузка
+# только после записи в темы/задачи (версию увеличивает хук after_flush
+# в той же транзакции, поэтому откат записи откатывает и инвалидацию).
+# После записи справочник загружает один воркер, остальные берут его из общего уровня кэша.
+
+NAMESPACE = 'catalog'
+
+# Поля задачи, которые попадают в справочник
+_TASK_FIELDS = ('title', 'topic_id')
+
+
+@dataclass(frozen=True)
+class TopicEntry:
+    id: int
+    code: str
+    name: str
+    task_count: int = 0
+
+
+@dataclass(frozen=True)
+class TaskEntry:
+    id: int
+    title: str
+    topic_id: int
+
+
+@dataclass(frozen=True)
+class Catalog:
+    source: str                      # URL БД: в одном процессе может быть несколько приложений
+    version: int
+    topics: Tuple[TopicEntry, ...]   # по имени
+    tasks: Tuple[TaskEntry, ...]     # по названию
+
+
+# текущая версия и предыдущая (её ещё могут дочитывать запросы, начатые до записи)
+_catalogs = cache.namespace(NAMESPACE, maxsize=2)
+
+
+def current_version() -> int:
+    row = db.session.execute(
+        select(CacheVersion.version).where(CacheVersion.namespace == NAMESPACE)
+    ).scalar()
+    return row or 0
+
+
+def _load(source: str, version: int) -> Catalog:
+    counts = dict(db.session.execute(
+        select(MathTask.topic_id, func.count(MathTask.id)).group_by(MathTask.topic_id)
+    ).all())
+    topics = tuple(
+        TopicEntry(id=tid, code=code, name=name, task_count=counts.get(tid, 0))
+        for tid, code, name in db.session.execute(
+            select(Topic.id, Topic.code, Topic.name).order_by(Topic.name.asc(), Topic.id.asc())
+        )
+    )
+    tasks = tuple(
+        TaskEntry(id=tid, title=title, topic_id=topic_id)
+        for tid, title, topic_id in db.session.execute(
+            select(MathTask.id, MathTask.title, MathTask.topic_id).order_by(MathTask.title.asc(), MathTask.id.asc())
+        )
+    )
+    return Catalog(source=source, version=version, topics=topics, tasks=tasks)
+
+
+def get_catalog() -> Catalog:
+    """Актуальный справочник: из кэша, если версия в БД не изменилась."""
+    source = str(db.engine.url)
+    version = current_version()
+    return _catalogs.get_or_set((source, version), lambda: _load(source, version))
+
+
+def get_topics() -> Tuple[TopicEntry, ...]:
+    return get_catalog().topics
+
+
+def get_tasks() -> Tuple[TaskEntry, ...]:
+    return get_catalog().tasks
+
+
+def topic_choices(with_code: bool = False) -> List[Tuple[int, str]]:
+    if with_code:
+        return [(t.id, f"{t.name} ({t.code})") for t in get_topics()]
+    return [(t.id, t.name) for t in get_topics()]
+
+
+def task_choices() -> List[Tuple[int, str]]:
+    return [(t.id, t.title) for t in get_tasks()]
+
+
+def reset() -> None:
+    """Сбрасывает закэшированный справочник (тесты, смена БД)."""
+    _catalogs.clear()
+
+
+# ----------------------------- инвалидация -----------------------------
+
+def _touches_catalog(session: Session) -> bool:
+    for obj in session.new:
+        if isinstance(obj, (Topic, MathTask)):
+            return True
+    for obj in session.deleted:
+        if isinstance(obj, (Topic, MathTask)):
+            return True
+    for obj in session.dirty:
+        if isinstance(obj, Topic) and session.is_modified(obj, include_collections=False):
+            return True
+        if isinstance(obj, MathTask):
+            attrs = inspect(obj).attrs
+            if any(attrs[name].history.has_changes() for name in _TASK_FIELDS):
+                return True
+    return False
+
+
+def _bump(connection) -> None:
+    result = connection.execute(
+        update(CacheVersion.__table__)
+        .where(CacheVersion.__table__.c.namespace == NAMESPACE)
+        .values(version=CacheVersion.__table__.c.version + 1)
+    )
+    if result.rowcount == 0:
+        # Строки ещё нет (БД создана через create_all) — заводим её
+        dialect = connection.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            connection.execute(
+                insert(CacheVersion.__table__)
+                .values(namespace=NAMESPACE, version=1)
+                .on_conflict_do_nothing()
+            )
+        else:
+            connection.execute(CacheVersion.__table__.insert().values(namespace=NAMESPACE, version=1))
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    if _touches_catalog(session):
+        _bump(session.connection())
+
+
+def init_app(app) -> None:
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+    metrics.register_cache('catalog', lambda: (_catalogs.hits, _catalogs.misses))
@@ -0,0 +1,214 @@
+from __future__ import annotations
+import csv
+import io
+import time
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Union
+
+from flask import Response, stream_with_context
+from sqlalchemy import tuple_
+
+from extensions import db
+from services import metrics
+from services.json_provider import dumps_compact
+
+# Потоковый экспорт: строки читаются из БД порциями по ключу (iter_batches), сериализуются
+# по одной и отдаются клиенту кусками по ~64 КБ. Память не зависит от размера
+# таблицы, первый байт уходит сразу после первой порции.
+#
+# Форматы: json (компактный массив), ndjson (объект на строку), csv (заголовок + строки;
+# вложенные значения — JSON в ячейке). Опционально gzip (?gzip=1).
+# JSON строк — через services.json_provider.dumps_compact (orjson, если установлен).
+
+EXPORT_FORMATS = ('json', 'ndjson', 'csv')
+YIELD_PER = 1000
+_FLUSH_BYTES = 64 * 1024
+
+_MIMETYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _dumps(obj) -> bytes:
+    return dumps_compact(obj)
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return _dumps(value).decode('utf-8')
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_batches(stmt, *key_cols, descending: bool = False, batch: int = YIELD_PER) -> Iterator[List[Any]]:
+    """Строки select() порциями по batch с курсором по key_cols (keyset, без OFFSET).
+
+    Каждая порция читается целиком и отдельным запросом: между порциями нет
+    открытого курсора, поэтому параллельные записи (прогресс фоновой задачи,
+    в SQLite — любые) не ждут окончания экспорта. Ключ должен быть уникален,
+    колонки ключа — присутствовать в select под своими именами.
+    """
+    key = tuple_(*key_cols)
+    order = [c.desc() for c in key_cols] if descending else list(key_cols)
+    last = None
+    while True:
+        q = stmt.order_by(*order).limit(batch)
+        if last is not None:
+            q = q.where(key < tuple_(*last) if descending else key > tuple_(*last))
+        rows = db.session.execute(q).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch:
+            return
+        last = tuple(rows[-1]._mapping[c.key] for c in key_cols)
+
+
+def iter_rows(stmt, *key_cols, descending: bool = False, batch: int = YIELD_PER) -> Iterator[Any]:
+    for rows in iter_batches(stmt, *key_cols, descending=descending, batch=batch):
+        yield from rows
+
+
+def _buffered(pieces: Iterable[Union[str, bytes]]) -> Iterator[bytes]:
+    """Склеивает мелкие куски в блоки ~_FLUSH_BYTES (меньше системных вызовов при отдаче)."""
+    buf, size = [], 0
+    for piece in pieces:
+        data = piece if isinstance(piece, bytes) else piece.encode('utf-8')
+        buf.append(data)
+        size += len(data)
+        if size >= _FLUSH_BYTES:
+            yield b''.join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b''.join(buf)
+
+
+def _json_pieces(rows: Iterable[dict]) -> Iterator[bytes]:
+    yield b'['
+    first = True
+    for row in rows:
+        yield _dumps(row) if first else b',' + _dumps(row)
+        first = False
+    yield b']'
+
+
+def _ndjson_pieces(rows: Iterable[dict]) -> Iterator[bytes]:
+    for row in rows:
+        yield _dumps(row) + b'\n'
+
+
+def _csv_pieces(rows: Iterable[dict], fields: Sequence[str]) -> Iterator[str]:
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\r\n')
+    writer.writerow(fields)
+    yield out.getvalue()
+    for row in rows:
+        out.seek(0)
+        out.truncate()
+        writer.writerow([_csv_cell(row.get(f)) for f in fields])
+        yield out.getvalue()
+
+
+def serialize_rows(rows: Iterable[dict], fmt: str, fields: Sequence[str] = ()) -> Iterator[bytes]:
+    """Поток байтов экспорта rows в формате fmt (fields — колонки для CSV)."""
+    if fmt == 'json':
+        pieces = _json_pieces(rows)
+    elif fmt == 'ndjson':
+        pieces = _ndjson_pieces(rows)
+    elif fmt == 'csv':
+        pieces = _csv_pieces(rows, fields)
+    else:
+        raise ValueError(f'Неизвестный формат экспорта: {fmt}')
+    return _buffered(pieces)
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Сжимает поток на лету (формат gzip, совместим с gunzip / Content-Encoding)."""
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = comp.compress(chunk)
+        if data:
+            yield data
+    yield comp.flush()
+
+
+def export_options(args) -> tuple:
+    """(формат, gzip) из query string: ?format=json|ndjson|csv&gzip=1."""
+    fmt = (args.get('format') or 'json').strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'json'
+    use_gzip = (args.get('gzip') or '').strip().lower() in ('1', 'true', 'yes', 'on')
+    return fmt, use_gzip
+
+
+def _counted(rows: Iterable[dict], kind: str) -> Iterator[dict]:
+    """Пропускает строки насквозь; по завершении (или обрыву) — строки и время в метрики экспорта."""
+    started = time.perf_counter()
+    count = 0
+    try:
+        for row in rows:
+            yield row
+            count += 1
+    finally:
+        metrics.record_rows('export', kind, count, time.perf_counter() - started)
+
+
+def export_response(rows_factory: Callable[[], Iterable[dict]], fmt: str, filename: str,
+                    fields: Sequence[str] = (), use_gzip: bool = False, kind: str = 'other') -> Response:
+    """Потоковый ответ-вложение. rows_factory вызывается уже внутри генератора ответа,
+    чтобы запрос к БД стартовал при отдаче, а не при формировании Response.
+
+    filename — без расширения; расширение (и .gz) подставляются по формату;
+    kind — что выгружается (метка в метриках экспорта).
+    """
+    def generate():
+        body = serialize_rows(_counted(rows_factory(), kind), fmt, fields)
+        yield from (gzip_stream(body) if use_gzip else body)
+
+    name = export_filename(filename, fmt, use_gzip)
+    resp = Response(stream_with_context(generate()), mimetype=export_mimetype(fmt, use_gzip))
+    if not use_gzip:
+        resp.headers['Content-Type'] = f'{_MIMETYPES[fmt]}; charset=utf-8'
+    resp.headers['Content-Disposition'] = f'attachment; filename="{name}"'
+    resp.headers['X-Accel-Buffering'] = 'no'  # nginx/прокси: не копить ответ целиком
+    return resp
+
+
+def write_export(path: str, rows: Iterable[dict], fmt: str, fields: Sequence[str] = (),
+                 use_gzip: bool = False, progress: Optional[Callable[[int], None]] = None,
+                 every: int = YIELD_PER, kind: str = 'other') -> int:
+    """Пишет экспорт в файл (для фоновых задач). Возвращает число строк;
+    progress(n) вызывается каждые every строк и в конце."""
+    started = time.perf_counter()
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            yield row
+            count += 1
+            if progress and count % every == 0:
+                progress(count)
+
+    body = serialize_rows(counted(), fmt, fields)
+    with open(path, 'wb') as fh:
+        for chunk in (gzip_stream(body) if use_gzip else body):
+            fh.write(chunk)
+    if progress:
+        progress(count)
+    metrics.record_rows('export', kind, count, time.perf_counter() - started)
+    return count
+
+
+def export_filename(filename: str, fmt: str, use_gzip: bool = False) -> str:
+    return f'{filename}.{fmt}' + ('.gz' if use_gzip else '')
+
+
+def export_mimetype(fmt: str, use_gzip: bool = False) -> str:
+    return 'application/gzip' if use_gzip else _MIMETYPES[fmt]
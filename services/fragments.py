@@ -0,0 +1,44 @@
+from __future__ import annotations
+from typing import Dict
+
+from flask import render_template
+from markupsafe import Markup
+
+from extensions import cache
+from services import metrics
+
+# Кэш отрендеренных фрагментов карточек задач.
+# Описание, пояснение и поля ответа одинаковы для всех студентов, поэтому
+# рендерятся один раз на (фрагмент, задача, время изменения) и переиспользуются
+# между пользователями. Персональный статус (попытки/решено/заблокировано)
+# по-прежнему рендерится в самой странице поверх закэшированного фрагмента.
+
+TASK_FRAGMENTS: Dict[str, str] = {
+    'description': 'student/fragments/task_description.html',
+    'answer_fields': 'student/fragments/task_answer_fields.html',
+    'explanation': 'student/fragments/task_explanation.html',
+    'card_header': 'shared/fragments/task_card_header.html',
+}
+
+
+# Ключ содержит время изменения задачи — правка сама уводит на новый ключ,
+# поэтому фрагменты можно держать и в общем уровне кэша для всех воркеров
+fragment_cache = cache.namespace('task_fragments', maxsize=1024)
+
+
+def task_version(task) -> str:
+    stamp = getattr(task, 'updated_at', None) or getattr(task, 'created_at', None)
+    return stamp.isoformat() if stamp else ''
+
+
+def task_fragment(name: str, task) -> Markup:
+    """Возвращает отрендеренный фрагмент задачи из кэша (или рендерит и кладёт в кэш)."""
+    template = TASK_FRAGMENTS[name]
+    key = (name, task.id, task_version(task))
+    return fragment_cache.get_or_set(key, lambda: Markup(render_template(template, task=task)))
+
+
+def init_app(app) -> None:
+    fragment_cache.maxsize = int(app.config.get('FRAGMENT_CACHE_SIZE', fragment_cache.maxsize))
+    app.jinja_env.globals['task_fragment'] = task_fragment
+    metrics.register_cache('task_fragments', lambda: (fragment_cache.hits, fragment_cache.misses))
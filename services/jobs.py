@@ -0,0 +1,287 @@
+from __future__ import annotations
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import func, update
+
+from extensions import db
+from models import BackgroundJob
+from services import metrics
+
+# Фоновые задачи без внешнего брокера.
+# Запись о задаче лежит в таблице background_jobs (статус, прогресс, итог),
+# выполняет её пул потоков текущего процесса. Обработчики регистрируются
+# декоратором @job_handler('kind') и получают JobContext: через него сообщают
+# прогресс и складывают файл результата в каталог задачи (JOBS_DIR/<id>/).
+#
+# Пул — потоки, а не процессы: обработчики — это в основном ожидание БД и
+# запись файлов, а процессу-потомку пришлось бы заново поднимать приложение.
+# Настройки:
+#   JOBS_MAX_WORKERS   — размер пула (по умолчанию 2)
+#   JOBS_SYNC          — выполнять сразу в текущем потоке (тесты, отладка)
+#   JOBS_DIR           — каталог файлов задач (по умолчанию instance/jobs)
+#   JOBS_STALE_SECONDS — через сколько секунд без «пульса» задача считается прерванной
+#   JOBS_KEEP_DAYS     — сколько хранить завершённые задачи (flask jobs-cleanup)
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+STATUS_LABELS = {
+    STATUS_QUEUED: 'В очереди',
+    STATUS_RUNNING: 'Выполняется',
+    STATUS_SUCCEEDED: 'Готово',
+    STATUS_FAILED: 'Ошибка',
+}
+
+_PROGRESS_INTERVAL = 0.5  # не чаще раза в полсекунды пишем прогресс в БД
+
+_handlers: Dict[str, Callable[['JobContext', dict], Optional[dict]]] = {}
+_titles: Dict[str, str] = {}
+
+
+def job_handler(kind: str, title: Optional[str] = None):
+    """Регистрирует обработчик задачи вида kind: fn(ctx, params) -> dict | None (итог)."""
+    def decorator(fn):
+        _handlers[kind] = fn
+        _titles[kind] = title or kind
+        return fn
+    return decorator
+
+
+def job_title(kind: str) -> str:
+    return _titles.get(kind, kind)
+
+
+class JobContext:
+    """То, что обработчик знает о своей задаче: id, каталог файлов и прогресс."""
+
+    def __init__(self, job_id: int, workdir: str, user_id: Optional[int] = None):
+        self.job_id = job_id
+        self.workdir = workdir
+        self.user_id = user_id  # кто поставил задачу
+        self.result_file: Optional[tuple] = None  # (path, name, mimetype)
+        self._last_write = 0.0
+
+    def path(self, name: str) -> str:
+        os.makedirs(self.workdir, exist_ok=True)
+        return os.path.join(self.workdir, os.path.basename(name))
+
+    def set_result_file(self, path: str, name: Optional[str] = None,
+                        mimetype: str = 'application/octet-stream') -> None:
+        self.result_file = (path, name or os.path.basename(path), mimetype)
+
+    def progress(self, done: int, total: Optional[int] = None,
+                 message: Optional[str] = None, force: bool = False) -> None:
+        """Сохраняет прогресс отдельным коротким соединением — транзакция
+        обработчика при этом не коммитится. Ошибки записи прогресса задачу не роняют."""
+        now = time.monotonic()
+        if not force and now - self._last_write < _PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        values = {'progress': int(done), 'updated_at': datetime.utcnow()}
+        if total is not None:
+            values['total'] = int(total)
+        if message is not None:
+            values['message'] = message
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(update(BackgroundJob).where(BackgroundJob.id == self.job_id).values(**values))
+        except Exception:
+            current_app.logger.warning('job %s: не удалось записать прогресс', self.job_id, exc_info=True)
+
+
+class JobRunner:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[tuple, Future] = {}
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('JOBS_MAX_WORKERS', int(os.getenv('JOBS_MAX_WORKERS', '2')))
+        app.config.setdefault('JOBS_SYNC', False)
+        app.config.setdefault('JOBS_DIR', os.path.join(app.instance_path, 'jobs'))
+        app.config.setdefault('JOBS_STALE_SECONDS', 900)
+        app.config.setdefault('JOBS_KEEP_DAYS', 7)
+        app.extensions['jobs'] = self
+
+        @app.cli.command('jobs-cleanup')
+        def jobs_cleanup():
+            """Удаляет завершённые фоновые задачи старше JOBS_KEEP_DAYS вместе с файлами"""
+            print(f'Удалено задач: {self.cleanup()}')
+
+    # -------------------------------------------------------------- executor
+    def _pool(self, app) -> ThreadPoolExecutor:
+        # Пул создаётся при первой задаче, а не при импорте: при gunicorn --preload
+        # потоки не переживают fork, у каждого воркера должен быть свой пул
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(1, app.config['JOBS_MAX_WORKERS']),
+                                                    thread_name_prefix='job')
+            return self._executor
+
+    def _key(self, job_id: int) -> tuple:
+        return (str(db.engine.url), job_id)
+
+    def workdir(self, job_id: int) -> str:
+        return os.path.join(current_app.config['JOBS_DIR'], str(job_id))
+
+    def submit(self, kind: str, params: Optional[dict] = None, user_id: Optional[int] = None,
+               upload=None) -> BackgroundJob:
+        """Создаёт задачу и ставит её в пул. upload (FileStorage) сохраняется в каталог
+        задачи до ответа на запрос; путь к нему попадает в params['upload_path']."""
+        if kind not in _handlers:
+            raise ValueError(f'Неизвестный тип фоновой задачи: {kind}')
+        params = dict(params or {})
+        job = BackgroundJob(kind=kind, status=STATUS_QUEUED, params=params, progress=0,
+                            created_by=user_id, updated_at=datetime.utcnow())
+        db.session.add(job)
+        db.session.flush()
+        if upload is not None:
+            workdir = self.workdir(job.id)
+            os.makedirs(workdir, exist_ok=True)
+            path = os.path.join(workdir, 'upload' + os.path.splitext(upload.filename or '')[1].lower())
+            upload.save(path)
+            # новый словарь: изменение «на месте» JSON-колонка не заметила бы
+            job.params = {**params, 'upload_path': path, 'upload_name': upload.filename}
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        if app.config['JOBS_SYNC']:
+            self._run(app, job.id)
+            db.session.refresh(job)
+        else:
+            key = self._key(job.id)
+            future = self._pool(app).submit(self._run, app, job.id)
+            self._futures[key] = future
+            future.add_done_callback(lambda _f, key=key: self._futures.pop(key, None))
+        return job
+
+    def active(self) -> int:
+        """Сколько задач этого процесса ещё в пуле (в очереди или выполняются)."""
+        return len(self._futures)
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> None:
+        """Дожидается задачи этого процесса (для тестов и CLI)."""
+        future = self._futures.get(self._key(job_id))
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def _run(self, app, job_id: int) -> None:
+        # Свой контекст приложения = своя сессия БД (и в потоке пула, и в режиме JOBS_SYNC);
+        # при выходе из контекста Flask-SQLAlchemy её закрывает
+        with app.app_context():
+            job = db.session.get(BackgroundJob, job_id)
+            if job is None or job.status != STATUS_QUEUED:
+                return
+            now = datetime.utcnow()
+            job.status, job.started_at, job.updated_at = STATUS_RUNNING, now, now
+            kind, params, user_id = job.kind, dict(job.params or {}), job.created_by
+            db.session.commit()
+
+            ctx = JobContext(job_id, self.workdir(job_id), user_id=user_id)
+            started = time.perf_counter()
+            try:
+                result = _handlers[kind](ctx, params)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.exception('job %s (%s) failed', job_id, kind)
+                self._finish(job_id, STATUS_FAILED, message=str(e) or e.__class__.__name__)
+                self._record(kind, STATUS_FAILED, started)
+                return
+            self._finish(job_id, STATUS_SUCCEEDED, result=result, ctx=ctx)
+            self._record(kind, STATUS_SUCCEEDED, started)
+
+    @staticmethod
+    def _record(kind: str, status: str, started: float) -> None:
+        metrics.inc('jobs_total', kind=kind, status=status)
+        metrics.observe('job_duration_seconds', time.perf_counter() - started, kind=kind)
+
+    def _finish(self, job_id: int, status: str, result: Optional[dict] = None,
+                message: Optional[str] = None, ctx: Optional[JobContext] = None,
+                stale_before: Optional[datetime] = None) -> bool:
+        """Переводит задачу в итоговый статус одним условным UPDATE.
+
+        Завершённую задачу не трогает (False): итог, записанный другим процессом, не
+        перетирается. С stale_before — только если пульса не было с этого момента:
+        воркер-владелец мог обновить прогресс между чтением и записью.
+        """
+        now = datetime.utcnow()
+        values = {'status': status, 'finished_at': now, 'updated_at': now, 'result': result}
+        if message is not None:
+            values['message'] = message
+        if ctx is not None and ctx.result_file:
+            values['result_path'], values['result_name'], values['result_mimetype'] = ctx.result_file
+        stmt = (update(BackgroundJob)
+                .where(BackgroundJob.id == job_id, BackgroundJob.status.in_(ACTIVE_STATUSES))
+                .values(**values))
+        if stale_before is not None:
+            stmt = stmt.where(func.coalesce(BackgroundJob.updated_at, BackgroundJob.created_at) < stale_before)
+        done = db.session.execute(stmt, execution_options={'synchronize_session': False}).rowcount == 1
+        db.session.commit()
+        if not done and stale_before is None:
+            current_app.logger.warning('job %s: уже завершена, статус %s не записан', job_id, status)
+        return done
+
+    # -------------------------------------------------------------- queries
+    def get(self, job_id: int) -> Optional[BackgroundJob]:
+        """Задача по id; «зависшая» (нет пульса дольше JOBS_STALE_SECONDS) помечается
+        прерванной. Задачи других процессов этот процесс не видит, поэтому решает только
+        время пульса, и проверяется оно в самом UPDATE, а не по прочитанной строке."""
+        job = db.session.get(BackgroundJob, job_id)
+        if job is None or job.is_finished or self._key(job_id) in self._futures:
+            return job
+        stale = datetime.utcnow() - timedelta(seconds=current_app.config['JOBS_STALE_SECONDS'])
+        if (job.updated_at or job.created_at) < stale:
+            self._finish(job_id, STATUS_FAILED, message='Задача прервана (перезапуск сервера?)',
+                         stale_before=stale)
+            db.session.refresh(job)
+        return job
+
+    def cleanup(self, keep_days: Optional[int] = None) -> int:
+        days = current_app.config['JOBS_KEEP_DAYS'] if keep_days is None else keep_days
+        border = datetime.utcnow() - timedelta(days=days)
+        old = (BackgroundJob.query
+               .filter(BackgroundJob.status.in_((STATUS_SUCCEEDED, STATUS_FAILED)),
+                       BackgroundJob.finished_at < border)
+               .all())
+        for job in old:
+            shutil.rmtree(self.workdir(job.id), ignore_errors=True)
+            db.session.delete(job)
+        db.session.commit()
+        return len(old)
+
+
+def job_to_dict(job: BackgroundJob) -> Dict[str, Any]:
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'title': job_title(job.kind),
+        'status': job.status,
+        'status_label': STATUS_LABELS.get(job.status, job.status),
+        'finished': job.is_finished,
+        'progress': job.progress,
+        'total': job.total,
+        'message': job.message,
+        'result': job.result,
+        'has_file': bool(job.result_path),
+        'result_name': job.result_name,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+jobs = JobRunner()
+
+
+def init_app(app) -> None:
+    jobs.init_app(app)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import json
+import os
+from datetime import date, datetime
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+# Быстрая сериализация JSON: orjson, если установлен, иначе стандартный json.
+# FastJSONProvider подменяет app.json — через него идут jsonify (предпросмотр
+# оценивания, stats.json, API весов), результаты фоновых задач и фильтр tojson.
+# Вывод совпадает с провайдером Flask по смыслу: datetime/date — в формате HTTP-даты
+# (RFC 822), UUID, dataclass и Markup — как у Flask, ключи отсортированы; отличие одно —
+# не-ASCII символы пишутся как есть (UTF-8), а не экранами \uXXXX.
+# То, чего orjson не умеет (целые больше 64 бит, indent кроме 2, нестандартные
+# аргументы dumps), молча уходит в стандартный json.
+# dumps_compact — компактная сериализация для экспорта: даты в ISO 8601, результат — байты.
+# Настройки:
+#   FAST_JSON_ENABLED — использовать orjson, если он установлен (по умолчанию да)
+
+try:  # orjson — необязательная зависимость: без неё работает стандартный json
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+# аргументы json.dumps, которые orjson воспроизводит сам
+_NATIVE_KWARGS = frozenset(('default', 'ensure_ascii', 'sort_keys', 'separators', 'indent'))
+
+
+def backend() -> str:
+    return 'orjson' if orjson is not None else 'json'
+
+
+def _iso_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps_compact(obj: Any) -> bytes:
+    """Компактный JSON в UTF-8 (экспорт): без пробелов, даты — isoformat()."""
+    if orjson is not None:
+        try:
+            # datetime/date orjson пишет сам, и совпадает это с isoformat()
+            return orjson.dumps(obj, default=_iso_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass   # например, целое больше 64 бит — пусть разбирается json
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_iso_default).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider поверх orjson (с откатом на json, см. заголовок модуля)."""
+
+    ensure_ascii = False
+
+    def __init__(self, app, fast: bool = True):
+        super().__init__(app)
+        self.fast = fast and orjson is not None
+
+    def _orjson_dumps(self, obj: Any, kwargs: dict):
+        """bytes или None, если запрос не выразить опциями orjson."""
+        if not self.fast or not _NATIVE_KWARGS.issuperset(kwargs):
+            return None
+        if kwargs.get('ensure_ascii', self.ensure_ascii):
+            return None
+        indent = kwargs.get('indent')
+        separators = kwargs.get('separators')
+        if indent not in (None, 2) or (indent is None and separators not in (None, (',', ':'))):
+            return None
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        try:
+            # даты отдаём в default провайдера — формат HTTP-даты, как у Flask
+            return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option)
+        except TypeError:
+            return None
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        data = self._orjson_dumps(obj, kwargs)
+        if data is not None:
+            return data.decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if self.fast and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass   # NaN/Infinity, огромные целые — json их принимает; ошибку даст он же
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args['indent'] = 2
+        else:
+            dump_args['separators'] = (',', ':')
+        data = self._orjson_dumps(obj, dump_args)
+        if data is None:
+            data = super().dumps(obj, **dump_args).encode('utf-8')
+        # байты сразу в тело: без промежуточной str и повторного кодирования
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app) -> None:
+    app.config.setdefault('FAST_JSON_ENABLED',
+                          os.getenv('FAST_JSON_ENABLED', '1').lower() not in ('0', 'false', 'no'))
+    app.json = FastJSONProvider(app, fast=app.config['FAST_JSON_ENABLED'])
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Hashable, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+from extensions import cache, db
+from services import metrics
+
+# Курсорная (keyset) пагинация по паре (created_at, id), новые сверху.
+# Страница = WHERE (created_at, id) < курсор ORDER BY created_at DESC, id DESC LIMIT n —
+# запрос идёт по индексу и не зависит от глубины (никакого OFFSET).
+# Точный COUNT(*) по фильтру заменён приблизительным: он считается один раз
+# на набор фильтров и живёт COUNT_TTL секунд в кэше приложения (общем для воркеров).
+
+COUNT_TTL = 60
+_COUNT_CACHE_MAX = 256
+
+
+@dataclass
+class KeysetPage:
+    items: List[Any]
+    per_page: int
+    next_cursor: Optional[str] = None   # к более старым записям
+    prev_cursor: Optional[str] = None   # к более новым записям
+    total: Optional[int] = None         # приблизительно (кэш)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    # created_at ключа обязан быть NOT NULL: строка с NULL не сравнима с курсором
+    # и выпала бы из всех страниц, кроме первой
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Разбирает курсор; битый курсор = первая страница."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        stamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(stamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(query, created_col, id_col, per_page: int,
+                    cursor: Optional[str] = None, direction: str = 'next') -> KeysetPage:
+    """Страница query (без ORDER BY) по ключу (created_col, id_col) в порядке убывания.
+
+    direction='next' — записи старше курсора, 'prev' — новее курсора.
+    """
+    key = decode_cursor(cursor)
+    key_cols = tuple_(created_col, id_col)
+    going_back = key is not None and direction == 'prev'
+
+    if key is None:
+        q = query.order_by(created_col.desc(), id_col.desc())
+    elif going_back:
+        q = query.filter(key_cols > tuple_(*key)).order_by(created_col.asc(), id_col.asc())
+    else:
+        q = query.filter(key_cols < tuple_(*key)).order_by(created_col.desc(), id_col.desc())
+
+    rows = q.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if going_back:
+        rows.reverse()
+
+    page = KeysetPage(items=rows, per_page=per_page)
+    if rows:
+        first, last = rows[0], rows[-1]
+        if going_back:
+            page.prev_cursor = encode_cursor(first.created_at, first.id) if more else None
+            page.next_cursor = encode_cursor(last.created_at, last.id)
+        else:
+            page.prev_cursor = encode_cursor(first.created_at, first.id) if key is not None else None
+            page.next_cursor = encode_cursor(last.created_at, last.id) if more else None
+    elif key is not None:
+        # Пустая страница после курсора (например, записи удалены) — дадим вернуться назад
+        if going_back:
+            page.next_cursor = cursor
+        else:
+            page.prev_cursor = cursor
+    return page
+
+
+_counts = cache.namespace('journal_counts', ttl=COUNT_TTL, maxsize=_COUNT_CACHE_MAX)
+
+
+def cached_count(key: Hashable, query, ttl: int = COUNT_TTL) -> int:
+    """COUNT(*) по query, закэшированный по ключу фильтров на ttl секунд."""
+    return _counts.get_or_set((str(db.engine.url), key), lambda: query.order_by(None).count(), ttl=ttl)
+
+
+def reset_counts() -> None:
+    _counts.clear()
+
+
+metrics.register_cache('journal_counts', lambda: (_counts.hits, _counts.misses))
@@ -0,0 +1,78 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+
+from extensions import db
+from models import MathTask, User
+
+# Поиск пользователей и задач по префиксу для автодополнения в админке.
+# Вместо тысяч <option> в форме остаётся только выбранное значение,
+# остальное подгружается по мере ввода. Запросы выбирают только нужные
+# колонки (без ORM-объектов и их selectin-связей) и идут по индексам:
+# users.username (unique) и ix_math_tasks_title.
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+
+def _prefix_clause(column, q: str):
+    """Префиксный поиск диапазоном [q, q + U+FFFF) — использует B-tree индекс
+    в любой СУБД (в отличие от LIKE/ILIKE). Регистр учитываем вариантами
+    написания: как ввели, с заглавной, строчными."""
+    variants = {q, q[:1].upper() + q[1:], q.lower()}
+    return or_(*[(column >= v) & (column < v + '\uffff') for v in sorted(variants)])
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_LIMIT
+    return min(limit, MAX_LIMIT)
+
+
+def user_label(username: str, first_name: Optional[str], last_name: Optional[str]) -> str:
+    full = f"{(first_name or '').strip()} {(last_name or '').strip()}".strip()
+    return f"{username} ({full})" if full else username
+
+
+def search_users(q: str, limit: int = DEFAULT_LIMIT, role: Optional[str] = None) -> List[Dict]:
+    q = (q or '').strip()
+    stmt = select(User.id, User.username, User.first_name, User.last_name)
+    if q.isdigit():
+        stmt = stmt.where(or_(User.id == int(q), _prefix_clause(User.username, q)))
+    elif q:
+        stmt = stmt.where(_prefix_clause(User.username, q))
+    if role:
+        stmt = stmt.where(User.role == role)
+    stmt = stmt.order_by(User.username.asc()).limit(clamp_limit(limit))
+    return [{'id': uid, 'text': user_label(username, fn, ln)}
+            for uid, username, fn, ln in db.session.execute(stmt)]
+
+
+def search_tasks(q: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+    q = (q or '').strip()
+    stmt = select(MathTask.id, MathTask.title)
+    if q.isdigit():
+        stmt = stmt.where(or_(MathTask.id == int(q), _prefix_clause(MathTask.title, q)))
+    elif q:
+        stmt = stmt.where(_prefix_clause(MathTask.title, q))
+    stmt = stmt.order_by(MathTask.title.asc(), MathTask.id.asc()).limit(clamp_limit(limit))
+    return [{'id': tid, 'text': title} for tid, title in db.session.execute(stmt)]
+
+
+def user_choice(user_id: Optional[int]) -> List[Tuple[int, str]]:
+    """Choices для SelectField: только выбранный пользователь (или пусто)."""
+    if not user_id:
+        return []
+    row = db.session.execute(
+        select(User.id, User.username, User.first_name, User.last_name).where(User.id == user_id)
+    ).first()
+    return [(row[0], user_label(*row[1:]))] if row else []
+
+
+def task_choice(task_id: Optional[int]) -> List[Tuple[int, str]]:
+    """Choices для SelectField: только выбранная задача (или пусто)."""
+    if not task_id:
+        return []
+    row = db.session.execute(select(MathTask.id, MathTask.title).where(MathTask.id == task_id)).first()
+    return [(row[0], row[1])] if row else []
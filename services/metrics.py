@@ -0,0 +1,391 @@
+from __future__ import annotations
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Response, current_app, g, request
+from sqlalchemy import event
+
+# Метрики приложения в текстовом формате Prometheus (GET /metrics), без внешних зависимостей.
+# Счётчики и гистограммы живут в памяти процесса (реестр ниже, один на процесс).
+# Под gunicorn у каждого воркера свой реестр, поэтому при заданном METRICS_DIR
+# каждый процесс раз в METRICS_FLUSH_SECONDS (и при выходе) сбрасывает снимок
+# в METRICS_DIR/metrics-<pid>.json, а /metrics складывает свой живой реестр
+# со снимками остальных процессов. Снимки завершившихся воркеров мастер
+# сливает в metrics-archive.json (mark_process_dead), чтобы счётчики не падали
+# при перезапуске воркеров. Без METRICS_DIR — только свой процесс (тесты, dev-сервер).
+# Настройки:
+#   METRICS_ENABLED       — включить сбор и /metrics (по умолчанию да)
+#   METRICS_DIR           — общий каталог снимков процессов (gunicorn.conf.py задаёт сам)
+#   METRICS_FLUSH_SECONDS — как часто воркер обновляет свой снимок (по умолчанию 2)
+#   METRICS_TOKEN         — если задан, /metrics требует Authorization: Bearer <token>
+#   METRICS_PUBLIC        — отдавать /metrics всем (по умолчанию нет)
+# Без токена и METRICS_PUBLIC /metrics отвечает только на прямые запросы с loopback
+# (Prometheus/агент на той же машине); запрос через прокси (X-Forwarded-For) — 403.
+
+# секунды: от быстрых SQL-запросов до тяжёлых страниц админки
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DURATION_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+PAIR_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+COUNTER, HISTOGRAM = 'counter', 'histogram'
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Registry:
+    """Счётчики и гистограммы процесса. Значения гистограммы — [счётчики корзин..., sum, count]."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.meta: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}   # имя -> (тип, help, корзины)
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+        self.caches: Dict[str, Callable[[], Tuple[int, int]]] = {}     # имя -> () -> (hits, misses)
+
+    def counter(self, name: str, help: str) -> None:
+        self.meta[name] = (COUNTER, help, ())
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.meta[name] = (HISTOGRAM, help, tuple(buckets))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        buckets = self.meta[name][2]
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            row = self.histograms.get(key)
+            if row is None:
+                row = self.histograms[key] = [0] * len(buckets) + [0.0, 0]
+            for i, upper in enumerate(buckets):
+                if value <= upper:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def snapshot(self) -> dict:
+        """Значения процесса (включая статистику кэшей) в виде, пригодном для JSON."""
+        with self._lock:
+            counters = [[name, dict(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [[name, dict(labels), list(row)] for (name, labels), row in self.histograms.items()]
+        for cache, stats in list(self.caches.items()):
+            hits, misses = stats()
+            counters.append(['cache_requests_total', {'cache': cache, 'result': 'hit'}, hits])
+            counters.append(['cache_requests_total', {'cache': cache, 'result': 'miss'}, misses])
+        return {'counters': counters, 'histograms': histograms}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+registry = Registry()
+
+registry.counter('http_requests_total', 'HTTP requests by endpoint, method and status')
+registry.histogram('http_request_duration_seconds', 'HTTP request latency by endpoint (until the response object is ready)')
+registry.counter('db_statements_total', 'SQL statements by operation')
+registry.histogram('db_statement_duration_seconds', 'SQL statement execution time by operation')
+registry.counter('db_errors_total', 'SQL statements that raised')
+registry.counter('evaluation_runs_total', 'Evaluation runs (preview)')
+registry.histogram('evaluation_run_duration_seconds', 'Evaluation run duration', DURATION_BUCKETS)
+registry.histogram('evaluation_run_pairs', 'Student-topic pairs per evaluation run', PAIR_BUCKETS)
+registry.counter('evaluation_pairs_total', 'Student-topic pairs evaluated')
+registry.counter('import_rows_total', 'Rows read by imports')
+registry.counter('import_rows_written_total', 'Rows written by imports')
+registry.histogram('import_duration_seconds', 'Import duration', DURATION_BUCKETS)
+registry.counter('export_rows_total', 'Rows written by exports')
+registry.histogram('export_duration_seconds', 'Export duration', DURATION_BUCKETS)
+registry.counter('jobs_total', 'Finished background jobs by kind and status')
+registry.histogram('job_duration_seconds', 'Background job duration', DURATION_BUCKETS)
+registry.counter('cache_requests_total', 'Cache lookups by cache and result')
+
+inc = registry.inc
+observe = registry.observe
+
+
+def register_cache(name: str, stats: Callable[[], Tuple[int, int]]) -> None:
+    """Кэш сообщает (hits, misses) — они попадают в cache_requests_total и cache_hit_ratio."""
+    registry.caches[name] = stats
+
+
+def record_rows(direction: str, kind: str, rows: int, seconds: float, written: Optional[int] = None) -> None:
+    """Итог импорта (direction='import') или экспорта ('export'): строк и длительность."""
+    inc(f'{direction}_rows_total', rows, kind=kind)
+    if written is not None:
+        inc(f'{direction}_rows_written_total', written, kind=kind)
+    observe(f'{direction}_duration_seconds', seconds, kind=kind)
+
+
+def record_evaluation(pairs: int, seconds: float) -> None:
+    inc('evaluation_runs_total')
+    inc('evaluation_pairs_total', pairs)
+    observe('evaluation_run_duration_seconds', seconds)
+    observe('evaluation_run_pairs', pairs)
+
+
+# --------------------------------------------------------------------------- снимки процессов
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f'metrics-{pid}.json')
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)   # читатель видит либо старый, либо новый снимок целиком
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def flush(directory: Optional[str]) -> None:
+    """Записывает снимок текущего процесса в каталог снимков."""
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    _write_json(_snapshot_path(directory, os.getpid()), registry.snapshot())
+
+
+def _merge(into: dict, snap: dict) -> None:
+    for name, labels, value in snap.get('counters', ()):
+        key = (name, tuple(sorted(labels.items())))
+        into['counters'][key] = into['counters'].get(key, 0) + value
+    for name, labels, row in snap.get('histograms', ()):
+        key = (name, tuple(sorted(labels.items())))
+        have = into['histograms'].get(key)
+        if have is None or len(have) != len(row):
+            into['histograms'][key] = list(row)
+        else:
+            into['histograms'][key] = [a + b for a, b in zip(have, row)]
+
+
+def collect(directory: Optional[str]) -> dict:
+    """Сумма по всем процессам: живой реестр этого процесса + снимки остальных."""
+    total = {'counters': {}, 'histograms': {}}
+    _merge(total, registry.snapshot())
+    if directory and os.path.isdir(directory):
+        own = _snapshot_path(directory, os.getpid())
+        for path in sorted(glob.glob(os.path.join(directory, 'metrics-*.json'))):
+            if path != own:
+                _merge(total, _read_json(path) or {})
+    return total
+
+
+def mark_process_dead(pid: int, directory: Optional[str]) -> None:
+    """Сливает снимок завершившегося процесса в metrics-archive.json (вызывает мастер gunicorn)."""
+    if not directory:
+        return
+    path = _snapshot_path(directory, pid)
+    snap = _read_json(path)
+    if snap is None:
+        return
+    archive_path = os.path.join(directory, 'metrics-archive.json')
+    merged = {'counters': {}, 'histograms': {}}
+    _merge(merged, _read_json(archive_path) or {})
+    _merge(merged, snap)
+    _write_json(archive_path, {
+        'counters': [[name, dict(labels), v] for (name, labels), v in merged['counters'].items()],
+        'histograms': [[name, dict(labels), row] for (name, labels), row in merged['histograms'].items()],
+    })
+    os.unlink(path)
+
+
+def clear_directory(directory: Optional[str]) -> None:
+    """Удаляет снимки прошлого запуска (мастер gunicorn при старте)."""
+    if directory and os.path.isdir(directory):
+        for path in glob.glob(os.path.join(directory, 'metrics-*')):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+# --------------------------------------------------------------------------- текстовый формат
+def _fmt(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    items = [f'{k}="{_escape(v)}"' for k, v in pairs]
+    return '{' + ','.join(items) + '}' if items else ''
+
+
+def render(data: dict) -> str:
+    """Текстовый формат экспозиции Prometheus 0.0.4."""
+    by_name: Dict[str, list] = {}
+    for (name, labels), value in data['counters'].items():
+        by_name.setdefault(name, []).append((labels, value))
+    for (name, labels), row in data['histograms'].items():
+        by_name.setdefault(name, []).append((labels, row))
+
+    lines: List[str] = []
+    for name, (kind, help, buckets) in registry.meta.items():
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name.get(name, ()), key=lambda item: item[0]):
+            if kind == COUNTER:
+                lines.append(f'{name}{_labels(labels)} {_fmt(value)}')
+                continue
+            cumulative = 0
+            for upper, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", _fmt(upper)),))} {_fmt(cumulative)}')
+            lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {_fmt(value[-1])}')
+            lines.append(f'{name}_sum{_labels(labels)} {_fmt(value[-2])}')
+            lines.append(f'{name}_count{_labels(labels)} {_fmt(value[-1])}')
+
+    # доля попаданий — из суммы по процессам, а не средним по воркерам
+    lines.append('# HELP cache_hit_ratio Cache hits / lookups since start')
+    lines.append('# TYPE cache_hit_ratio gauge')
+    lookups: Dict[str, List[float]] = {}
+    for labels, value in by_name.get('cache_requests_total', ()):
+        d = dict(labels)
+        pair = lookups.setdefault(d.get('cache', ''), [0, 0])
+        pair[0 if d.get('result') == 'hit' else 1] += value
+    for cache, (hits, misses) in sorted(lookups.items()):
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f'cache_hit_ratio{_labels([("cache", cache)])} {_fmt(round(ratio, 6))}')
+    return '\n'.join(lines) + '\n'
+
+
+# --------------------------------------------------------------------------- Flask и SQLAlchemy
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return word if word in ('SELECT', 'INSERT', 'UPDATE', 'DELETE') else 'OTHER'
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_started')
+    if not started:
+        return
+    op = _operation(statement)
+    inc('db_statements_total', operation=op)
+    observe('db_statement_duration_seconds', time.perf_counter() - started.pop(), operation=op)
+
+
+def _execute_error(context):
+    started = context.connection.info.get('metrics_started') if context.connection is not None else None
+    if started:
+        started.pop()
+    inc('db_errors_total')
+
+
+def instrument_engine(engine) -> None:
+    """Счётчик и время SQL-выражений движка (executemany считается одним выражением)."""
+    if event.contains(engine, 'before_cursor_execute', _before_execute):
+        return
+    event.listen(engine, 'before_cursor_execute', _before_execute)
+    event.listen(engine, 'after_cursor_execute', _after_execute)
+    event.listen(engine, 'handle_error', _execute_error)
+
+
+class _Flusher:
+    """Поток процесса, который раз в METRICS_FLUSH_SECONDS пишет снимок — и когда запросов нет,
+    иначе хвост счётчиков простаивающего воркера не попал бы в /metrics. Запускается
+    при первом запросе процесса (после fork: потоки мастера воркерам не достаются)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+
+    def ensure(self, app) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._loop, name='metrics-flush', daemon=True,
+                             args=(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_SECONDS'], app.logger)).start()
+
+    @staticmethod
+    def _loop(directory: str, interval: float, logger) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                flush(directory)
+            except OSError:
+                logger.warning('metrics: не удалось записать снимок в %s', directory, exc_info=True)
+
+
+_flusher = _Flusher()
+
+
+_LOOPBACK = ('127.0.0.1', '::1')
+
+
+def _scrape_allowed() -> bool:
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if current_app.config.get('METRICS_PUBLIC'):
+        return True
+    return request.remote_addr in _LOOPBACK and 'X-Forwarded-For' not in request.headers
+
+
+def _metrics_view():
+    if not _scrape_allowed():
+        return Response('forbidden\n', status=403, mimetype='text/plain')
+    directory = current_app.config.get('METRICS_DIR')
+    flush(directory)
+    return Response(render(collect(directory)), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app) -> None:
+    app.config.setdefault('METRICS_ENABLED', os.getenv('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no'))
+    app.config.setdefault('METRICS_DIR', os.getenv('METRICS_DIR') or None)
+    app.config.setdefault('METRICS_FLUSH_SECONDS', float(os.getenv('METRICS_FLUSH_SECONDS', '2')))
+    app.config.setdefault('METRICS_TOKEN', os.getenv('METRICS_TOKEN') or None)
+    app.config.setdefault('METRICS_PUBLIC', os.getenv('METRICS_PUBLIC', '').lower() in ('1', 'true', 'yes'))
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    from extensions import db
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _metrics_record(response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+        observe('http_request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+        if app.config['METRICS_DIR']:
+            _flusher.ensure(app)
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', _metrics_view)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Sequence
+
+from werkzeug.security import generate_password_hash
+
+# Хеширование паролей пачкой для массового импорта пользователей.
+# PBKDF2 (600 000 итераций) — это ~0.2 с процессорного времени на пароль, поэтому
+# тысячи паролей раскладываются по пулу процессов (по одному на ядро).
+# Модуль намеренно лёгкий: дочерний процесс (контекст spawn — без копии
+# соединений с БД и потоков родителя) импортирует только его и werkzeug.
+
+HASH_METHOD = 'pbkdf2:sha256'   # как в User.set_password
+MIN_PARALLEL = 32               # меньше — запуск пула дороже самого хеширования
+
+log = logging.getLogger(__name__)
+
+
+def hash_password(password: str, method: Optional[str] = None) -> str:
+    return generate_password_hash(password, method=method or HASH_METHOD)
+
+
+def _hash_many(passwords: Sequence[str], method: str) -> List[str]:
+    return [generate_password_hash(p, method=method) for p in passwords]
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def hash_passwords(passwords: Sequence[str], workers: Optional[int] = None,
+                   method: Optional[str] = None, min_parallel: int = MIN_PARALLEL) -> List[str]:
+    """Хеши паролей в том же порядке. workers: None/0 — по числу CPU, 1 — без пула.
+
+    Если пул процессов поднять не удалось (ограничения окружения), хеширует
+    в текущем процессе — медленнее, но импорт не падает.
+    """
+    passwords = list(passwords)
+    method = method or HASH_METHOD
+    workers = min(workers or default_workers(), len(passwords))
+    if workers <= 1 or len(passwords) < min_parallel:
+        return _hash_many(passwords, method)
+
+    # пароли режутся на крупные куски: меньше пересылок между процессами
+    size = -(-len(passwords) // (workers * 4))
+    parts = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            hashed = list(pool.map(_hash_many, parts, [method] * len(parts)))
+    except (OSError, BrokenProcessPool):
+        log.warning('пул процессов для хеширования недоступен, хешируем последовательно', exc_info=True)
+        return _hash_many(passwords, method)
+    return [h for part in hashed for h in part]
@@ -0,0 +1,296 @@
+from __future__ import annotations
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from flask import Response, current_app, g, jsonify, request
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+
+from extensions import db
+from models import User
+
+# Профилирование отдельного запроса «по флагу» — для медленных страниц, которые
+# не воспроизводятся локально. Запрос с ?_profile=1 от администратора выполняется
+# под сэмплирующим профилировщиком: фоновый поток раз в PROFILER_INTERVAL_MS снимает
+# стек потока запроса (sys._current_frames). Вместо обычного ответа возвращается
+# отчёт: стеки в формате collapsed (flamegraph.pl, speedscope, inferno), самые
+# «горячие» функции и хронология SQL-выражений запроса (текст без параметров).
+#   ?_profile_format=collapsed — только стеки, text/plain (сразу в flamegraph.pl)
+# Страницы, куда администратор не ходит (например, student.tasks), профилируются
+# по токену: администратор получает его в GET /admin/api/profile-token?user_id=<id>
+# и отдаёт тестовому пользователю — тот добавляет ?_profile=<токен> (токен живёт
+# PROFILER_TOKEN_TTL секунд). Токен действует только для этого пользователя и только
+# пока выдавший его ещё администратор. Флаг от остальных молча игнорируется.
+# Не больше PROFILER_MAX_PER_MINUTE профилей в минуту, сверх — 429. Окно у каждого
+# процесса своё: на сервере в целом предел — число воркеров × PROFILER_MAX_PER_MINUTE.
+# Настройки:
+#   PROFILER_ENABLED         — включить (по умолчанию да)
+#   PROFILER_MAX_PER_MINUTE  — лимит профилей в минуту на процесс (по умолчанию 6)
+#   PROFILER_INTERVAL_MS     — шаг сэмплирования (по умолчанию 5 мс — порядок интервала переключения GIL)
+#   PROFILER_TOKEN_TTL       — срок жизни токена, секунды (по умолчанию 600)
+
+PARAM = '_profile'
+FORMAT_PARAM = '_profile_format'
+MAX_STATEMENTS = 500      # выражений SQL в отчёте
+MAX_STATEMENT_CHARS = 500
+TOP_FRAMES = 25
+_SALT = 'request-profile'
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class RateLimiter:
+    """Скользящее окно в 60 секунд: не больше limit разрешений."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamps: deque = deque()
+
+    def allow(self, limit: int, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._stamps and now - self._stamps[0] >= 60:
+                self._stamps.popleft()
+            if len(self._stamps) >= limit:
+                return False
+            self._stamps.append(now)
+            return True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stamps.clear()
+
+
+limiter = RateLimiter()
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    if path.startswith(_ROOT + os.sep):
+        path = os.path.relpath(path, _ROOT)
+    elif 'site-packages' + os.sep in path:
+        path = path.split('site-packages' + os.sep, 1)[1]
+    name = getattr(code, 'co_qualname', code.co_name)
+    # ';' разделяет кадры в формате collapsed, пробел отделяет число сэмплов
+    return f'{path}:{name}'.replace(';', ':').replace(' ', '_')
+
+
+class Sampler:
+    """Фоновый поток, который снимает стек одного потока через равные интервалы."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+
+class RequestProfile:
+    def __init__(self, interval: float, requested_by: Optional[int]):
+        self.thread_id = threading.get_ident()
+        self.requested_by = requested_by
+        self.sampler = Sampler(self.thread_id, interval)
+        self.statements: List[Dict[str, Any]] = []
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.started = time.perf_counter()
+        self.wall = 0.0
+
+    def start(self) -> None:
+        _active[self.thread_id] = self
+        self.sampler.start()
+
+    def stop(self) -> None:
+        if _active.get(self.thread_id) is self:
+            del _active[self.thread_id]
+            self.sampler.stop()
+            self.wall = time.perf_counter() - self.started
+
+    def add_statement(self, started: float, seconds: float, statement: str) -> None:
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append({
+                'start_ms': round((started - self.started) * 1000, 2),
+                'duration_ms': round(seconds * 1000, 3),
+                'statement': ' '.join(statement.split())[:MAX_STATEMENT_CHARS],
+            })
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {n}\n' for stack, n in self.sampler.stacks.most_common())
+
+    def top(self) -> List[Dict[str, Any]]:
+        own, total = Counter(), Counter()
+        for stack, n in self.sampler.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += n
+            for frame in set(frames):
+                total[frame] += n
+        return [{'frame': frame, 'self': n, 'total': total[frame]} for frame, n in own.most_common(TOP_FRAMES)]
+
+    def report(self, status: int) -> Dict[str, Any]:
+        return {
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': status,
+            'wall_ms': round(self.wall * 1000, 2),
+            'interval_ms': round(self.sampler.interval * 1000, 2),
+            'samples': self.sampler.samples,
+            'top': self.top(),
+            'collapsed': self.collapsed(),
+            'sql': {
+                'count': self.sql_count,
+                'total_ms': round(self.sql_seconds * 1000, 2),
+                'truncated': self.sql_count > len(self.statements),
+                'statements': self.statements,
+            },
+        }
+
+
+_active: Dict[int, RequestProfile] = {}   # id потока -> профиль его текущего запроса
+
+
+# --------------------------------------------------------------------------- SQL
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if threading.get_ident() in _active:
+        conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active.get(threading.get_ident())
+    started = conn.info.get('profile_started')
+    if profile is None or not started:
+        return
+    begin = started.pop()
+    profile.add_statement(begin, time.perf_counter() - begin, statement)
+
+
+def _execute_error(context):
+    started = context.connection.info.get('profile_started') if context.connection is not None else None
+    if started and threading.get_ident() in _active:
+        started.pop()
+
+
+def instrument_engine(engine) -> None:
+    if event.contains(engine, 'before_cursor_execute', _before_execute):
+        return
+    event.listen(engine, 'before_cursor_execute', _before_execute)
+    event.listen(engine, 'after_cursor_execute', _after_execute)
+    event.listen(engine, 'handle_error', _execute_error)
+
+
+# --------------------------------------------------------------------------- токены
+def _serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=_SALT)
+
+
+def make_token(user_id: int, for_user_id: int) -> str:
+    """Токен профилирования от имени администратора user_id для пользователя for_user_id."""
+    return _serializer().dumps({'by': user_id, 'for': for_user_id})
+
+
+def _token_owner(token: str) -> Optional[int]:
+    """id выдавшего администратора, если токен выдан текущему пользователю и тот всё ещё админ."""
+    try:
+        data = _serializer().loads(token, max_age=current_app.config['PROFILER_TOKEN_TTL'])
+    except BadSignature:
+        return None
+    if not isinstance(data, dict) or not current_user.is_authenticated:
+        return None
+    if data.get('for') != current_user.id:
+        return None
+    issuer = db.session.get(User, data.get('by')) if isinstance(data.get('by'), int) else None
+    if issuer is None or issuer.role != 'admin' or not issuer.is_active:
+        return None   # администратора разжаловали или отключили — его токены больше не действуют
+    return issuer.id
+
+
+def _requester(flag: str) -> Optional[int]:
+    """Кто разрешил профилирование: id администратора или None (флаг игнорируется)."""
+    if flag in ('1', 'true', 'yes'):
+        if current_user.is_authenticated and getattr(current_user, 'role', None) == 'admin':
+            return current_user.id
+        return None
+    return _token_owner(flag)
+
+
+# --------------------------------------------------------------------------- Flask
+def _start():
+    flag = request.args.get(PARAM)
+    if not flag:
+        return None
+    requested_by = _requester(flag)
+    if requested_by is None:
+        return None
+    if not limiter.allow(current_app.config['PROFILER_MAX_PER_MINUTE']):
+        return jsonify({'ok': False, 'error': 'profile_rate_limited',
+                        'message': 'Превышен лимит профилирования, попробуйте через минуту'}), 429
+    profile = RequestProfile(current_app.config['PROFILER_INTERVAL_MS'] / 1000.0, requested_by)
+    g._profile = profile
+    profile.start()
+    return None
+
+
+def _finish(response):
+    profile = g.pop('_profile', None)
+    if profile is None:
+        return response
+    if response.is_streamed and not response.direct_passthrough:
+        response.make_sequence()   # потоковый ответ (экспорт) — тоже внутри профиля
+    profile.stop()
+    current_app.logger.info('profile: %s %s (%s) by admin %s: %.1f ms, %d samples, %d SQL',
+                            request.method, request.path, request.endpoint, profile.requested_by,
+                            profile.wall * 1000, profile.sampler.samples, profile.sql_count)
+    if request.args.get(FORMAT_PARAM) == 'collapsed':
+        return Response(profile.collapsed(), mimetype='text/plain')
+    return jsonify(profile.report(response.status_code))
+
+
+def _teardown(exc):
+    profile = g.pop('_profile', None)
+    if profile is not None:   # запрос оборвался до after_request
+        profile.stop()
+
+
+def init_app(app) -> None:
+    app.config.setdefault('PROFILER_ENABLED', os.getenv('PROFILER_ENABLED', '1').lower() not in ('0', 'false', 'no'))
+    app.config.setdefault('PROFILER_MAX_PER_MINUTE', int(os.getenv('PROFILER_MAX_PER_MINUTE', '6')))
+    app.config.setdefault('PROFILER_INTERVAL_MS', float(os.getenv('PROFILER_INTERVAL_MS', '5')))
+    app.config.setdefault('PROFILER_TOKEN_TTL', int(os.getenv('PROFILER_TOKEN_TTL', '600')))
+    if not app.config['PROFILER_ENABLED']:
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.teardown_request(_teardown)
@@ -0,0 +1,271 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import func, case, select, update, delete, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import TaskAttempt, TaskAttemptCounter, TopicLevelConfig
+
+# Конвейер отправки ответа студентом.
+# Состояние задачи (попытки/решено/заблокировано) читается один раз до записи,
+# новое состояние вычисляется в памяти, попытка пишется одной транзакцией,
+# а результат вместе с баллом возвращается вызывающему коду без повторных запросов.
+#
+# Номер попытки выдаёт строка-счётчик TaskAttemptCounter: один условный UPDATE
+# (решено/заблокировано проверяется в WHERE) атомарно резервирует номер,
+# а уникальный индекс (user_id, task_id, attempt_number) страхует от дублей.
+
+MAX_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class TaskStatus:
+    attempts: int = 0
+    incorrect: int = 0
+    solved: bool = False
+
+    @property
+    def blocked(self) -> bool:
+        return self.incorrect >= MAX_ATTEMPTS and not self.solved
+
+    @property
+    def can_submit(self) -> bool:
+        return not (self.solved or self.blocked)
+
+    @property
+    def remaining(self) -> int:
+        if not self.can_submit:
+            return 0
+        return max(0, MAX_ATTEMPTS - self.incorrect)
+
+    def after(self, is_correct: bool) -> "TaskStatus":
+        """Состояние после ещё одной попытки (без обращения к БД)."""
+        return TaskStatus(
+            attempts=self.attempts + 1,
+            incorrect=self.incorrect + (0 if is_correct else 1),
+            solved=self.solved or bool(is_correct),
+        )
+
+
+@dataclass(frozen=True)
+class SubmitResult:
+    accepted: bool
+    is_correct: bool
+    attempt_number: Optional[int]
+    score: float
+    status: TaskStatus
+    attempt: Optional[TaskAttempt] = None
+    created_at: Optional[datetime] = None
+
+
+def load_task_status(user_id: int, task_id: int) -> TaskStatus:
+    """Один агрегирующий запрос по попыткам пары (user, task)."""
+    row = (db.session.query(
+                func.count(TaskAttempt.id).label('cnt'),
+                func.sum(case((TaskAttempt.is_correct == False, 1), else_=0)).label('incorrect_cnt'),  # noqa: E712
+                func.max(func.cast(TaskAttempt.is_correct, db.Integer)).label('solved'))
+           .filter(TaskAttempt.user_id == user_id, TaskAttempt.task_id == task_id)
+           .one())
+    return TaskStatus(
+        attempts=int(row.cnt or 0),
+        incorrect=int(row.incorrect_cnt or 0),
+        solved=bool(row.solved),
+    )
+
+
+def status_from_attempts(attempts: Iterable[TaskAttempt]) -> TaskStatus:
+    """То же состояние, но из уже загруженных строк (например, истории попыток)."""
+    cnt = incorrect = 0
+    solved = False
+    for a in attempts:
+        cnt += 1
+        if a.is_correct:
+            solved = True
+        else:
+            incorrect += 1
+    return TaskStatus(attempts=cnt, incorrect=incorrect, solved=solved)
+
+
+def attempt_score(attempt_number: int, penalty_weights: Optional[Sequence]) -> float:
+    """Балл за успешную попытку: 1-я -> 1.0, 2-я/3-я -> penalty_weights[0/1], дальше 0.0."""
+    if attempt_number <= 1:
+        return 1.0
+    if not isinstance(penalty_weights, (list, tuple)):
+        return 0.0
+    idx = attempt_number - 2  # 0 для 2-й, 1 для 3-й
+    if idx >= len(penalty_weights) or attempt_number > MAX_ATTEMPTS:
+        return 0.0
+    try:
+        return max(0.0, min(1.0, float(penalty_weights[idx])))
+    except Exception:
+        return 0.0
+
+
+def _level_penalty_weights(topic_id: int, level: str):
+    conf = TopicLevelConfig.query.filter_by(topic_id=topic_id, level=level).first()
+    return conf.penalty_weights if conf else None
+
+
+def _insert_ignore(model, values: dict):
+    """INSERT, который молча пропускает конфликт по ключу (SQLite/PostgreSQL)."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        db.session.execute(insert(model).values(**values).on_conflict_do_nothing())
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        db.session.execute(insert(model).values(**values).on_conflict_do_nothing())
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(model.__table__.insert().values(**values))
+        except IntegrityError:
+            pass
+
+
+def _counter_filter(user_id: int, task_id: int):
+    return (TaskAttemptCounter.user_id == user_id, TaskAttemptCounter.task_id == task_id)
+
+
+def ensure_attempt_counter(user_id: int, task_id: int) -> None:
+    """Создаёт строку-счётчик по уже записанным попыткам, если её ещё нет."""
+    exists = db.session.execute(
+        select(TaskAttemptCounter.attempts_count).where(*_counter_filter(user_id, task_id))
+    ).first()
+    if exists is not None:
+        return
+    row = (db.session.query(
+                func.count(TaskAttempt.id).label('cnt'),
+                func.max(TaskAttempt.attempt_number).label('last_no'),
+                func.sum(case((TaskAttempt.is_correct == False, 1), else_=0)).label('incorrect_cnt'),  # noqa: E712
+                func.max(func.cast(TaskAttempt.is_correct, db.Integer)).label('solved'))
+           .filter(TaskAttempt.user_id == user_id, TaskAttempt.task_id == task_id)
+           .one())
+    cnt = int(row.cnt or 0)
+    _insert_ignore(TaskAttemptCounter, {
+        'user_id': user_id,
+        'task_id': task_id,
+        'attempts_count': cnt,
+        'last_attempt_number': max(cnt, int(row.last_no or 0)),
+        'incorrect_count': int(row.incorrect_cnt or 0),
+        'solved': bool(row.solved),
+    })
+
+
+def allocate_attempt(user_id: int, task_id: int, is_correct: bool) -> Optional[Tuple[int, TaskStatus]]:
+    """Атомарно резервирует следующий номер попытки.
+
+    Возвращает (attempt_number, состояние после попытки) или None, если задача
+    уже решена или заблокирована. Вызывается внутри транзакции, которую
+    фиксирует вызывающий код вместе со вставкой самой попытки.
+    """
+    ensure_attempt_counter(user_id, task_id)
+    values = {
+        'attempts_count': TaskAttemptCounter.attempts_count + 1,
+        'last_attempt_number': TaskAttemptCounter.last_attempt_number + 1,
+    }
+    if is_correct:
+        values['solved'] = True
+    else:
+        values['incorrect_count'] = TaskAttemptCounter.incorrect_count + 1
+    res = db.session.execute(
+        update(TaskAttemptCounter)
+        .where(*_counter_filter(user_id, task_id))
+        .where(TaskAttemptCounter.solved == False,  # noqa: E712
+               TaskAttemptCounter.incorrect_count < MAX_ATTEMPTS)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount != 1:
+        return None
+    row = db.session.execute(
+        select(TaskAttemptCounter.attempts_count,
+               TaskAttemptCounter.last_attempt_number,
+               TaskAttemptCounter.incorrect_count,
+               TaskAttemptCounter.solved)
+        .where(*_counter_filter(user_id, task_id))
+    ).one()
+    status = TaskStatus(attempts=int(row.attempts_count), incorrect=int(row.incorrect_count),
+                        solved=bool(row.solved))
+    return int(row.last_attempt_number), status
+
+
+def invalidate_attempt_counters(pairs: Iterable[Tuple[int, int]]) -> None:
+    """Сбрасывает счётчики для пар (user_id, task_id) после ручных правок попыток.
+
+    Строки пересоздаются из task_attempts при следующей отправке ответа.
+    Не коммитит — изменения уходят вместе с транзакцией вызывающего кода.
+    """
+    pairs = list({(int(u), int(t)) for u, t in pairs if u is not None and t is not None})
+    for i in range(0, len(pairs), 500):
+        chunk = pairs[i:i + 500]
+        db.session.execute(
+            delete(TaskAttemptCounter)
+            .where(tuple_(TaskAttemptCounter.user_id, TaskAttemptCounter.task_id).in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def submit_answer(user_id: int, task, given, is_correct: bool,
+                  status: Optional[TaskStatus] = None) -> SubmitResult:
+    """Записывает попытку и возвращает результат с баллом и новым состоянием.
+
+    ``status`` — состояние до записи, если вызывающий код его уже посчитал:
+    тогда заведомо запрещённая отправка отсекается без записи в БД.
+    Новое состояние приходит из строки-счётчика, повторного агрегата нет.
+    """
+    if status is not None and not status.can_submit:
+        return SubmitResult(accepted=False, is_correct=False, attempt_number=None,
+                            score=0.0, status=status)
+
+    for retry in (False, True):
+        try:
+            allocated = allocate_attempt(user_id, task.id, is_correct)
+            if allocated is None:
+                db.session.rollback()
+                return SubmitResult(accepted=False, is_correct=False, attempt_number=None,
+                                    score=0.0, status=load_task_status(user_id, task.id))
+            attempt_number, new_status = allocated
+
+            score = 0.0
+            if is_correct:
+                weights = None if attempt_number == 1 else _level_penalty_weights(task.topic_id, task.level)
+                score = attempt_score(attempt_number, weights)
+
+            created_at = datetime.utcnow()
+            attempt = TaskAttempt(
+                user_id=user_id,
+                task_id=task.id,
+                user_answer=given,
+                is_correct=bool(is_correct),
+                partial_score=score,
+                attempt_number=attempt_number,
+                created_at=created_at,
+            )
+            db.session.add(attempt)
+            db.session.commit()
+        except IntegrityError:
+            # Счётчик отстал от попыток, добавленных в обход него (правка админом) —
+            # пересоздаём его по фактическим строкам и пробуем ещё раз
+            db.session.rollback()
+            if retry:
+                raise
+            invalidate_attempt_counters([(user_id, task.id)])
+            db.session.commit()
+            continue
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return SubmitResult(
+            accepted=True,
+            is_correct=bool(is_correct),
+            attempt_number=attempt_number,
+            score=score,
+            status=new_status,
+            attempt=attempt,
+            created_at=created_at,
+        )
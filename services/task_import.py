@@ -0,0 +1,187 @@
+from __future__ import annotations
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from extensions import db
+from models import MathTask, Topic
+from services import metrics
+from services.bulk import ANSWER_TYPES, LEVELS, ImportRowError, as_int, check_answer_json, in_chunks
+
+# Импорт банка заданий в два этапа.
+# 1) Проверка: каждое задание валидируется целиком (обязательные поля, correct_answer
+#    через check_answer_json, уровень, max_score), темы по коду/id и занятые коды
+#    заданий разрешаются несколькими IN-запросами на весь файл, дубли кодов внутри
+#    файла тоже ловятся. Все ошибки собираются в отчёт, а не обрывают импорт на первой.
+# 2) Запись — только если ошибок нет и это не пробный прогон (dry_run): пачками,
+#    коммит после каждой пачки.
+
+CHUNK_SIZE = 500
+
+
+@dataclass
+class TaskImportReport:
+    total: int = 0                 # заданий в файле
+    valid: int = 0                 # прошли проверку
+    created: int = 0               # записано в БД
+    chunks: int = 0                # закоммиченных пачек
+    dry_run: bool = False
+    errors: List[ImportRowError] = field(default_factory=list)
+
+    @property
+    def error_count(self) -> int:
+        return len(self.errors)
+
+    def as_dict(self, max_errors: int = 100) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'valid': self.valid,
+            'created': self.created,
+            'chunks': self.chunks,
+            'dry_run': self.dry_run,
+            'error_count': self.error_count,
+            'errors': [{'row': e.row, 'message': e.message} for e in self.errors[:max_errors]],
+        }
+
+
+class TaskImporter:
+    def __init__(self, user_id: Optional[int], chunk_size: int = CHUNK_SIZE, dry_run: bool = False,
+                 progress: Optional[Callable[[TaskImportReport], None]] = None):
+        self.user_id = user_id
+        self.chunk_size = max(1, chunk_size)
+        self.progress = progress
+        self.report = TaskImportReport(dry_run=dry_run)
+
+    def _error(self, i: int, message: str) -> None:
+        self.report.errors.append(ImportRowError(i, f'Задание {i}: {message}'))
+
+    # ------------------------------------------------------------ phase 1
+    def _lookup(self, items: List[Tuple[int, Any]]):
+        codes, ids, task_codes = set(), set(), set()
+        for _, item in items:
+            if not isinstance(item, dict):
+                continue
+            topic_code = str(item.get('topic_code') or '').strip()
+            if topic_code:
+                codes.add(topic_code)
+            if as_int(item.get('topic_id')) is not None:
+                ids.add(as_int(item.get('topic_id')))
+            code = str(item.get('code') or '').strip()
+            if code:
+                task_codes.add(code)
+
+        topics_by_code: Dict[str, int] = {}
+        for part in in_chunks(sorted(codes)):
+            topics_by_code.update(db.session.execute(select(Topic.code, Topic.id).where(Topic.code.in_(part))).all())
+        topic_ids: Set[int] = set()
+        for part in in_chunks(sorted(ids)):
+            topic_ids.update(db.session.scalars(select(Topic.id).where(Topic.id.in_(part))))
+        taken: Set[str] = set()
+        for part in in_chunks(sorted(task_codes)):
+            taken.update(db.session.scalars(select(MathTask.code).where(MathTask.code.in_(part))))
+        return topics_by_code, topic_ids, taken
+
+    def validate(self, items: List[Tuple[int, Any]]) -> List[dict]:
+        """Проверяет все задания; возвращает значения для вставки (по валидным)."""
+        topics_by_code, topic_ids, taken = self._lookup(items)
+        seen_codes: Dict[str, int] = {}
+        values = []
+        for i, item in items:
+            if not isinstance(item, dict):
+                self._error(i, 'ожидается объект')
+                continue
+            before = self.report.error_count
+            title = str(item.get('title') or '').strip()
+            answer_type = item.get('answer_type')
+            correct_answer = item.get('correct_answer')
+            if not title or not answer_type or not correct_answer:
+                self._error(i, 'title, answer_type и correct_answer — обязательны')
+            elif answer_type not in ANSWER_TYPES:
+                self._error(i, f"неизвестный answer_type '{answer_type}'")
+            if correct_answer:
+                try:
+                    check_answer_json(correct_answer)
+                except ValueError as e:
+                    self._error(i, str(e))
+
+            # тема: код предпочтительнее id
+            topic_code = str(item.get('topic_code') or '').strip()
+            topic_id = topics_by_code.get(topic_code) if topic_code else None
+            if topic_id is None and as_int(item.get('topic_id')) in topic_ids:
+                topic_id = as_int(item.get('topic_id'))
+            if topic_id is None:
+                self._error(i, 'тема не найдена (topic_code/topic_id)')
+
+            level = item.get('level') or 'medium'
+            if level not in LEVELS:
+                self._error(i, f"неизвестный уровень '{level}'")
+            try:
+                max_score = float(item.get('max_score', 1.0))
+            except (TypeError, ValueError):
+                self._error(i, 'max_score должен быть числом')
+                max_score = None
+
+            # опциональный внешний код: уникален и в БД, и внутри файла
+            code = str(item.get('code') or '').strip() or None
+            if code and code in taken:
+                self._error(i, f"код '{code}' уже используется")
+            elif code and code in seen_codes:
+                self._error(i, f"код '{code}' повторяется (см. задание {seen_codes[code]})")
+            elif code:
+                seen_codes[code] = i
+
+            if self.report.error_count > before:
+                continue
+            values.append({
+                'title': title,
+                'code': code,
+                'description': item.get('description') or '',
+                'answer_type': answer_type,
+                'correct_answer': correct_answer,
+                'answer_schema': item.get('answer_schema'),
+                'explanation': item.get('explanation'),
+                'topic_id': topic_id,
+                'level': level,
+                'max_score': max_score,
+                'created_by': self.user_id,
+                'is_active': bool(item.get('is_active', True)),
+            })
+        self.report.valid = len(values)
+        return values
+
+    # ------------------------------------------------------------ phase 2
+    def _insert(self, values: List[dict]) -> None:
+        for start in range(0, len(values), self.chunk_size):
+            part = values[start:start + self.chunk_size]
+            # через ORM (а не Core insert): after_flush справочника видит новые задания
+            db.session.add_all([MathTask(**v) for v in part])
+            db.session.commit()
+            db.session.expunge_all()
+            self.report.created += len(part)
+            self.report.chunks += 1
+            if self.progress:
+                self.progress(self.report)
+
+    def run(self, items: Iterable[Any]) -> TaskImportReport:
+        numbered = list(enumerate(items, start=1))
+        self.report.total = len(numbered)
+        values = self.validate(numbered)
+        if self.progress:
+            self.progress(self.report)
+        if self.report.errors or self.report.dry_run:
+            return self.report
+        self._insert(values)
+        return self.report
+
+
+def import_tasks(items: Iterable[Any], user_id: Optional[int], dry_run: bool = False,
+                 chunk_size: int = CHUNK_SIZE,
+                 progress: Optional[Callable[[TaskImportReport], None]] = None) -> TaskImportReport:
+    """Проверяет задания и, если ошибок нет и это не dry_run, записывает их пачками."""
+    started = time.perf_counter()
+    report = TaskImporter(user_id, chunk_size=chunk_size, dry_run=dry_run, progress=progress).run(items)
+    if not dry_run:
+        metrics.record_rows('import', 'tasks', report.total, time.perf_counter() - started, written=report.created)
+    return report
@@ -0,0 +1,83 @@
+from __future__ import annotations
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import click
+from jinja2 import FileSystemBytecodeCache, TemplateError
+
+# Компиляция шаблонов Jinja — заметная часть первого запроса свежего воркера
+# (крупные admin/edit_task.html, admin/analytics.html, student/task_view.html — десятки мс каждый).
+# Два уровня, чтобы её не платить:
+# - байткод-кэш на диске (FileSystemBytecodeCache в TEMPLATES_CACHE_DIR): скомпилированный
+#   код шаблона общий для всех воркеров и перезапусков; при правке шаблона запись
+#   не подходит по контрольной сумме исходника и перекомпилируется сама;
+# - precompile: все шаблоны загружаются заранее — `flask templates-compile` при деплое
+#   наполняет кэш на диске, а при gunicorn preload мастер компилирует их в память
+#   до fork (when_ready в gunicorn.conf.py), и воркеры стартуют уже с готовыми шаблонами.
+# Настройки:
+#   TEMPLATES_BYTECODE_CACHE — включить кэш на диске (по умолчанию да)
+#   TEMPLATES_CACHE_DIR      — каталог кэша (по умолчанию <instance>/jinja-cache)
+
+TEMPLATE_EXTENSIONS = ('html', 'htm', 'xml', 'txt', 'j2', 'jinja')   # остальное в templates/ — не шаблоны
+
+
+@dataclass
+class CompileReport:
+    compiled: int = 0
+    seconds: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)   # шаблон -> ошибка
+    slowest: List[tuple] = field(default_factory=list)     # (секунды, шаблон), по убыванию
+
+
+def precompile(app, top: int = 5) -> CompileReport:
+    """Загружает все шаблоны приложения (компиляция или чтение байткода из кэша)."""
+    report = CompileReport()
+    env = app.jinja_env
+    timings = []
+    started = time.perf_counter()
+    for name in env.list_templates(extensions=TEMPLATE_EXTENSIONS):
+        t0 = time.perf_counter()
+        try:
+            env.get_template(name)
+        except (TemplateError, UnicodeDecodeError) as exc:
+            report.errors[name] = str(exc)
+            continue
+        timings.append((time.perf_counter() - t0, name))
+        report.compiled += 1
+    report.seconds = time.perf_counter() - started
+    report.slowest = sorted(timings, reverse=True)[:top]
+    return report
+
+
+def init_app(app) -> None:
+    app.config.setdefault('TEMPLATES_BYTECODE_CACHE',
+                          os.getenv('TEMPLATES_BYTECODE_CACHE', '1').lower() not in ('0', 'false', 'no'))
+    app.config.setdefault('TEMPLATES_CACHE_DIR',
+                          os.getenv('TEMPLATES_CACHE_DIR') or os.path.join(app.instance_path, 'jinja-cache'))
+    if app.config['TEMPLATES_BYTECODE_CACHE']:
+        directory = app.config['TEMPLATES_CACHE_DIR']
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as exc:   # каталог недоступен — работаем без кэша, как раньше
+            app.logger.warning('jinja bytecode cache disabled: %s', exc)
+        else:
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+    @app.cli.command('templates-compile')
+    @click.option('--clear', is_flag=True, help='очистить кэш перед компиляцией')
+    def templates_compile(clear):
+        """Компилирует все шаблоны в байткод-кэш (TEMPLATES_CACHE_DIR) — запускать при деплое"""
+        cache = app.jinja_env.bytecode_cache
+        if cache is None:
+            print('Байткод-кэш выключен (TEMPLATES_BYTECODE_CACHE=0)')
+            return
+        if clear:
+            cache.clear()
+        report = precompile(app)
+        for seconds, name in report.slowest:
+            print(f'  {name}: {seconds * 1000:.1f} мс')
+        for name, error in sorted(report.errors.items()):
+            print(f'  ОШИБКА {name}: {error}')
+        print(f'Шаблонов: {report.compiled} за {report.seconds * 1000:.0f} мс -> {cache.directory}')
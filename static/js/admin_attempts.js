@@ -240,5 +240,64 @@
         updateUI();
     })();
 
+    // -------------------------------
+    // 6) Автодополнение студентов/задач: select[data-lookup-url]
+    // Сервер отдаёт в select только выбранное значение (и «Все» в фильтре);
+    // остальные варианты подгружаются по префиксу из поля поиска над списком.
+    // -------------------------------
+    (function(){
+        document.querySelectorAll('select[data-lookup-url]').forEach(function(select){
+        const url = select.getAttribute('data-lookup-url');
+        const input = document.createElement('input');
+        input.type = 'search';
+        input.autocomplete = 'off';
+        input.className = 'form-control form-control-sm mb-1';
+        input.placeholder = select.getAttribute('data-lookup-placeholder') || 'Поиск…';
+        select.parentNode.insertBefore(input, select);
+
+        let timer = null, seq = 0, loaded = false;
+
+        // «Все» (0/пусто) и текущий выбор остаются в списке, чтобы value не менялся сам
+        function isKept(opt){ return opt.value === '0' || opt.value === '' || opt.selected; }
+
+        function load(){
+            const my = ++seq;
+            const q = input.value.trim();
+            loaded = true;
+            fetch(url + '?q=' + encodeURIComponent(q), {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' }
+            })
+            .then(r => r.ok ? r.json() : { items: [] })
+            .then(function(data){
+                if (my !== seq) return; // ответ на устаревший запрос
+                const kept = Array.from(select.options).filter(isKept);
+                const keptValues = new Set(kept.map(o => o.value));
+                select.innerHTML = '';
+                kept.forEach(o => select.appendChild(o));
+                (data.items || []).forEach(function(item){
+                if (!keptValues.has(String(item.id))) select.appendChild(new Option(item.text, item.id));
+                });
+            })
+            .catch(function(e){ console.error(e); });
+        }
+
+        input.addEventListener('input', function(){
+            clearTimeout(timer);
+            timer = setTimeout(load, 250);
+        });
+        input.addEventListener('focus', function(){ if (!loaded) load(); });
+        input.addEventListener('keydown', function(e){
+            // Enter в поле поиска не отправляет форму фильтров
+            if (e.key === 'Enter') {
+            e.preventDefault();
+            e.stopPropagation();
+            clearTimeout(timer);
+            load();
+            }
+        });
+        });
+    })();
+
     });
   })();
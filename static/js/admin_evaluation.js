@@ -688,6 +688,7 @@
       topic_ids: topic_id != null ? [topic_id] : [], // backward compatibility
       period_start: period_start,
       period_end: period_end,
+      background: typeof window.pollJob === 'function', // расчёт фоновой задачей, см. admin_jobs.js
     };
 
     if (!payload.user_ids.length){
@@ -720,6 +721,16 @@
       } else {
         rawText = await resp.text().catch(() => '');
       }
+      // 202: задача поставлена в очередь — ждём её и берём итог из job.result
+      if (resp.status === 202 && data.status_url){
+        showFlashMessage('info', 'Расчёт выполняется в фоне…');
+        const job = await window.pollJob(data.status_url);
+        if (job.status !== 'succeeded'){
+          showFlashMessage('error', job.message || 'Фоновый расчёт завершился с ошибкой');
+          return;
+        }
+        data = job.result || {};
+      }
       if (!resp.ok || data.ok === false){
         const msg = buildErrorMessage(resp.status, data, rawText);
         showFlashMessage('error', msg);
@@ -0,0 +1,49 @@
+// Страница фоновой задачи: опрашиваем статус, пока задача не завершится,
+// затем перезагружаем страницу — итог (отчёт, ссылка на файл) рендерит сервер.
+(function () {
+  'use strict';
+
+  const POLL_MS = 1000;
+
+  // Общий помощник: дождаться завершения задачи по status_url.
+  // onProgress(job) вызывается на каждом опросе; промис разрешается итоговым job.
+  window.pollJob = function pollJob(statusUrl, onProgress) {
+    return new Promise((resolve, reject) => {
+      async function tick() {
+        try {
+          const resp = await fetch(statusUrl, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } });
+          const data = await resp.json();
+          if (!resp.ok || !data.ok) throw new Error((data && data.error) || `HTTP ${resp.status}`);
+          if (onProgress) onProgress(data.job);
+          if (data.job.finished) { resolve(data.job); return; }
+          setTimeout(tick, POLL_MS);
+        } catch (e) {
+          reject(e);
+        }
+      }
+      tick();
+    });
+  };
+
+  document.addEventListener('DOMContentLoaded', function () {
+    const card = document.getElementById('jobCard');
+    if (!card || card.dataset.finished === 'true') return;
+
+    const statusEl = document.getElementById('jobStatus');
+    const progressEl = document.getElementById('jobProgress');
+    const messageEl = document.getElementById('jobMessage');
+    const bar = document.getElementById('jobProgressBar');
+
+    window.pollJob(card.dataset.statusUrl, function (job) {
+      if (statusEl) statusEl.textContent = job.status_label;
+      if (progressEl) progressEl.textContent = job.progress;
+      if (messageEl) messageEl.textContent = job.message || '';
+      if (bar && job.total) {
+        const pct = Math.min(100, Math.floor(job.progress * 100 / job.total));
+        bar.style.width = pct + '%';
+        bar.textContent = pct + '%';
+      }
+    }).then(() => window.location.reload())
+      .catch(() => { if (messageEl) messageEl.textContent = 'Не удалось получить статус задачи. Обновите страницу.'; });
+  });
+})();
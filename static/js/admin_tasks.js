@@ -31,6 +31,14 @@ document.addEventListener('DOMContentLoaded', function() {
     }
   }
 
+  // Фильтры списка обрабатываются на сервере: смена select сразу перезапрашивает страницу
+  const filterForm = document.querySelector('form[action$="/admin/tasks"][method="get"]');
+  if (filterForm) {
+    filterForm.querySelectorAll('select').forEach(sel => {
+      sel.addEventListener('change', () => filterForm.submit());
+    });
+  }
+
   // Delete modal setup
   const deleteModal = document.getElementById('deleteTaskModal');
   if (deleteModal) {
@@ -0,0 +1,111 @@
+(function(){
+  // Отправка ответа без перезагрузки страницы: POST на JSON-эндпоинт
+  // и обновление карточки задачи на месте. Без JS форма работает как раньше.
+
+  function $(id){ return document.getElementById(id); }
+
+  function escapeHtml(s){
+    return String(s == null ? '' : s)
+      .replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')
+      .replace(/"/g, '&quot;').replace(/'/g, '&#39;');
+  }
+
+  function showResult(kind, message){
+    const box = $('task-result');
+    if (!box) return;
+    box.innerHTML = '<div class="alert alert-' + kind + ' alert-dismissible fade show" role="alert">'
+      + escapeHtml(message)
+      + '<button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Закрыть"></button></div>';
+  }
+
+  function appendHistory(attempt){
+    const body = $('task-history-body');
+    if (!body || !attempt) return;
+    const tr = document.createElement('tr');
+    const ok = attempt.is_correct;
+    tr.innerHTML = '<td>' + escapeHtml(attempt.attempt_number) + '</td>'
+      + '<td>' + escapeHtml(attempt.created_at || '') + '</td>'
+      + '<td><code>' + escapeHtml(JSON.stringify(attempt.user_answer)) + '</code></td>'
+      + '<td>' + (ok
+          ? '<span class="text-success"><i class="fas fa-check"></i> верно</span>'
+          : '<span class="text-danger"><i class="fas fa-times"></i> неверно</span>') + '</td>';
+    body.insertBefore(tr, body.firstChild);
+    const empty = $('task-history-empty');
+    const table = $('task-history');
+    if (empty) empty.classList.add('d-none');
+    if (table) table.classList.remove('d-none');
+  }
+
+  function applyState(data){
+    const cnt = $('task-attempts-count');
+    if (cnt && typeof data.attempts === 'number') cnt.textContent = data.attempts;
+
+    const badge = $('task-status-badge');
+    const state = $('task-state');
+    if (data.solved){
+      if (badge) badge.innerHTML = '<div class="badge text-bg-success"><i class="fas fa-check-circle"></i> Решено</div>';
+      if (state){
+        let html = '<div class="alert alert-success d-flex align-items-center justify-content-between">'
+          + '<div><i class="fas fa-check-circle"></i> Верно! Отличная работа.</div>';
+        if (data.next_task_url){
+          html += '<a href="' + escapeHtml(data.next_task_url) + '" class="btn btn-success btn-sm">'
+            + '<i class="fas fa-forward"></i> Следующая задача</a>';
+        }
+        state.innerHTML = html + '</div>';
+      }
+    } else if (data.blocked){
+      if (badge) badge.innerHTML = '<div class="badge text-bg-danger"><i class="fas fa-lock"></i> Заблокирована</div>';
+      if (state){
+        state.innerHTML = '<div class="alert alert-warning"><i class="fas fa-lock"></i> Задача заблокирована после 3 неудачных попыток.'
+          + (data.tasks_url ? ' <a href="' + escapeHtml(data.tasks_url) + '" class="alert-link">К списку задач</a>' : '')
+          + '</div>';
+      }
+    } else if (data.hint){
+      const hint = $('task-hint');
+      // Подсказку формирует автор задачи (HTML), как и в серверном шаблоне
+      if (hint) hint.innerHTML = '<div class="alert alert-info"><i class="fas fa-lightbulb"></i> Подсказка: ' + data.hint + '</div>';
+    }
+  }
+
+  document.addEventListener('DOMContentLoaded', function(){
+    const form = $('task-answer-form');
+    if (!form || !window.fetch || !window.FormData) return;
+    const url = form.getAttribute('data-submit-url');
+    if (!url) return;
+
+    form.addEventListener('submit', function(ev){
+      ev.preventDefault();
+      const btn = $('task-submit-btn');
+      if (btn) btn.disabled = true;
+
+      fetch(url, {
+        method: 'POST',
+        body: new FormData(form),
+        headers: { 'Accept': 'application/json', 'X-Requested-With': 'fetch' },
+        credentials: 'same-origin'
+      })
+        .then(function(resp){
+          return resp.json().catch(function(){ return { ok: false, message: 'Ошибка ' + resp.status }; });
+        })
+        .then(function(data){
+          if (!data.ok){
+            showResult('warning', data.message || 'Отправка ответа недоступна');
+            applyState(data);
+            return;
+          }
+          showResult(data.is_correct ? 'success' : 'danger', data.message);
+          appendHistory(data.attempt);
+          applyState(data);
+          if (!data.solved && !data.blocked) form.reset();
+        })
+        .catch(function(){
+          // Не повторяем отправку сами: ответ мог уже записаться на сервере
+          // (обрыв после коммита), и повтор съел бы ещё одну попытку.
+          showResult('danger', 'Не удалось получить ответ сервера. Обновите страницу, чтобы увидеть результат, или отправьте ответ ещё раз.');
+        })
+        .finally(function(){
+          if (btn) btn.disabled = false;
+        });
+    });
+  });
+})();
@@ -1,6 +1,7 @@
 import pytest
 import tempfile
 import os
+import shutil
 from app import create_app
 from extensions import db
 from models import User
@@ -21,6 +22,8 @@ def app():
     
     # Set environment variable before creating the app
     os.environ['DATABASE_URL'] = db_uri
+    # Jinja bytecode cache goes with the test DB, not into the checkout's instance/
+    os.environ['TEMPLATES_CACHE_DIR'] = os.path.join(temp_dir, 'jinja-cache')
     
     try:
         # Create the app with test config
@@ -33,7 +36,10 @@ def app():
             SECRET_KEY='test-secret-key',
             SERVER_NAME='localhost.localdomain',
             SQLALCHEMY_DATABASE_URI=db_uri,
-            SQLALCHEMY_TRACK_MODIFICATIONS=False
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            # Фоновые задачи выполняются сразу, файлы — во временном каталоге
+            JOBS_SYNC=True,
+            JOBS_DIR=os.path.join(temp_dir, 'jobs'),
         )
         
         # Safety: ensure we are pointing at the temp DB, not the main DB
@@ -69,7 +75,7 @@ def app():
             if os.path.exists(db_path):
                 os.unlink(db_path)
             if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+                shutil.rmtree(temp_dir)
             # Clean up environment variable
             if 'DATABASE_URL' in os.environ:
                 del os.environ['DATABASE_URL']
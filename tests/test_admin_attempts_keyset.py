@@ -0,0 +1,119 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import Topic, MathTask, TaskAttempt, User
+from services.keyset import decode_cursor, encode_cursor, reset_counts
+
+
+@pytest.fixture
+def attempts_log(app, admin_user):
+    """25 попыток двух студентов; у части одинаковый created_at (проверка тай-брейка по id)."""
+    reset_counts()
+    with app.app_context():
+        topic = Topic(code='ks', name='Keyset')
+        db.session.add(topic)
+        db.session.flush()
+        task = MathTask(title='KS', description='d', answer_type='number',
+                        correct_answer={'type': 'number', 'value': 1.0}, topic_id=topic.id,
+                        level='low', max_score=1.0, created_by=admin_user.id, is_active=True)
+        db.session.add(task)
+        users = []
+        for i in range(2):
+            u = User(username=f'ks{i}', email=f'ks{i}@test.com', role='student')
+            u.set_password('x')
+            db.session.add(u)
+            users.append(u)
+        db.session.flush()
+        base = datetime(2025, 1, 1, 12, 0, 0)
+        for n in range(25):
+            db.session.add(TaskAttempt(user_id=users[n % 2].id, task_id=task.id, is_correct=False,
+                                       attempt_number=n + 1, created_at=base + timedelta(minutes=n // 2)))
+        db.session.commit()
+        ordered = [a.id for a in TaskAttempt.query.order_by(TaskAttempt.created_at.desc(),
+                                                              TaskAttempt.id.desc())]
+        return ordered, users[0].id
+
+
+def _ids(body):
+    return [int(x) for x in re.findall(r'class="attempt-checkbox" value="(\d+)"', body)]
+
+
+def _link(body, label):
+    m = re.search(r'href="([^"]*)"[^>]*>' + re.escape(label), body)
+    return m.group(1).replace('&amp;', '&') if m else None
+
+
+def test_cursor_roundtrip():
+    stamp = datetime(2025, 3, 4, 5, 6, 7, 891011)
+    assert decode_cursor(encode_cursor(stamp, 42)) == (stamp, 42)
+    assert decode_cursor('not-a-cursor') is None
+
+
+def test_walk_forward_and_back(client, login_admin, attempts_log):
+    ordered, _ = attempts_log
+
+    body = client.get('/admin/attempts?per_page=10').get_data(as_text=True)
+    assert _ids(body) == ordered[:10]
+    assert 'Всего ≈ 25' in body
+
+    pages = [_ids(body)]
+    for _ in range(2):
+        body = client.get(_link(body, 'Старше')).get_data(as_text=True)
+        pages.append(_ids(body))
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert sum(pages, []) == ordered
+    assert 'cursor=' not in _link(body, 'Старше')  # дальше страниц нет
+
+    # назад с последней страницы
+    prev_body = client.get(_link(body, '‹ Новее')).get_data(as_text=True)
+    assert _ids(prev_body) == ordered[10:20]
+
+
+def test_filter_by_student(client, login_admin, attempts_log, app):
+    ordered, user_id = attempts_log
+    with app.app_context():
+        expected = [i for i in ordered if db.session.get(TaskAttempt, i).user_id == user_id]
+    body = client.get(f'/admin/attempts?student_id={user_id}&per_page=20').get_data(as_text=True)
+    assert _ids(body) == expected[:20]
+    assert f'Всего ≈ {len(expected)}' in body
+
+
+def test_broken_cursor_falls_back_to_first_page(client, login_admin, attempts_log):
+    ordered, _ = attempts_log
+    body = client.get('/admin/attempts?per_page=10&cursor=%%%').get_data(as_text=True)
+    assert _ids(body) == ordered[:10]
+
+
+def test_created_at_is_required(app, attempts_log):
+    from sqlalchemy.exc import IntegrityError
+    ordered, user_id = attempts_log
+    with app.app_context():
+        task_id = db.session.get(TaskAttempt, ordered[0]).task_id
+        insert = TaskAttempt.__table__.insert().values(user_id=user_id, task_id=task_id, is_correct=False,
+                                                       attempt_number=100, created_at=None)
+        with pytest.raises(IntegrityError):
+            db.session.execute(insert)
+        db.session.rollback()
+
+
+def test_backfilled_attempts_reached_from_last_page(client, login_admin, attempts_log, app):
+    """Попытки, которым миграция проставила 1970-01-01, идут последними и достижимы курсором."""
+    ordered, user_id = attempts_log
+    with app.app_context():
+        task_id = db.session.get(TaskAttempt, ordered[0]).task_id
+        old = [TaskAttempt(user_id=user_id, task_id=task_id, is_correct=False,
+                           attempt_number=100 + n, created_at=datetime(1970, 1, 1)) for n in range(3)]
+        db.session.add_all(old)
+        db.session.commit()
+        old_ids = sorted((a.id for a in old), reverse=True)
+    reset_counts()
+
+    body = client.get('/admin/attempts?per_page=10').get_data(as_text=True)
+    seen = _ids(body)
+    while 'cursor=' in (_link(body, 'Старше') or ''):
+        body = client.get(_link(body, 'Старше')).get_data(as_text=True)
+        seen += _ids(body)
+    assert seen == ordered + old_ids
@@ -0,0 +1,100 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import Topic, MathTask, TaskAttempt, TopicLevelConfig, User
+from services.attempt_import import iter_csv_rows
+from services.export import gzip_stream, serialize_rows
+
+
+@pytest.fixture
+def journal(app, admin_user):
+    with app.app_context():
+        topic = Topic(code='ex', name='Экспорт')
+        db.session.add(topic)
+        db.session.flush()
+        db.session.add(TopicLevelConfig(topic_id=topic.id, level='low', task_count_threshold=5,
+                                        reference_time=60, penalty_weights=[0.5]))
+        task = MathTask(title='EX', code='ex_1', description='d', answer_type='number',
+                        correct_answer={'type': 'number', 'value': 1.0}, topic_id=topic.id,
+                        level='low', max_score=1.0, created_by=admin_user.id)
+        db.session.add(task)
+        users = []
+        for i in range(2):
+            u = User(username=f'ex{i}', email=f'ex{i}@test.com', role='student', password_hash='x')
+            db.session.add(u)
+            users.append(u)
+        db.session.flush()
+        base = datetime(2025, 2, 1, 10, 0, 0)
+        for n in range(30):
+            db.session.add(TaskAttempt(user_id=users[n % 2].id, task_id=task.id, is_correct=n % 3 == 0,
+                                       attempt_number=n // 2 + 1, created_at=base + timedelta(minutes=n),
+                                       user_answer={'type': 'number', 'value': n}))
+        db.session.commit()
+        return users[0].id
+
+
+def test_serialize_rows_formats():
+    rows = [{'a': 1, 'b': {'x': 'ю'}}, {'a': 2, 'b': None}]
+    assert b''.join(serialize_rows(iter(rows), 'json')) == '[{"a":1,"b":{"x":"ю"}},{"a":2,"b":null}]'.encode()
+    assert b''.join(serialize_rows(iter(rows), 'ndjson')).decode().splitlines()[1] == '{"a":2,"b":null}'
+    assert b''.join(serialize_rows(iter(rows), 'csv', ('a', 'b'))).decode() == 'a,b\r\n1,"{""x"":""ю""}"\r\n2,\r\n'
+    assert b''.join(serialize_rows(iter([]), 'json')) == b'[]'
+    assert gzip.decompress(b''.join(gzip_stream(iter([b'abc', b'def'])))) == b'abcdef'
+
+
+def test_attempts_json_export_is_streamed_and_filtered(client, login_admin, journal):
+    r = client.get(f'/admin/attempts/export?student_id={journal}')
+    assert r.is_streamed
+    assert r.headers['Content-Type'] == 'application/json; charset=utf-8'
+    data = json.loads(r.get_data(as_text=True))
+    assert len(data) == 15 and {d['user_id'] for d in data} == {journal}
+    assert data[0]['created_at'] > data[-1]['created_at']  # новые сверху
+    assert data[0]['task_code'] == 'ex_1' and data[0]['username'] == 'ex0'
+
+
+def test_attempts_csv_export_roundtrips_to_import(client, login_admin, journal):
+    r = client.get('/admin/attempts/export?format=csv')
+    assert r.headers['Content-Type'].startswith('text/csv')
+    assert '.csv"' in r.headers['Content-Disposition']
+    rows = list(iter_csv_rows(io.BytesIO(r.data)))
+    assert len(rows) == 30
+    assert {'task_code', 'username', 'is_correct', 'attempt_number', 'created_at'} <= set(rows[0])
+    assert json.loads(rows[-1]['user_answer']) == {'type': 'number', 'value': 0}
+
+
+def test_gzip_ndjson_export(client, login_admin, journal):
+    r = client.get('/admin/attempts/export?format=ndjson&gzip=1')
+    assert r.headers['Content-Type'] == 'application/gzip'
+    assert r.headers['Content-Disposition'].endswith('.ndjson.gz"')
+    lines = gzip.decompress(r.data).decode().splitlines()
+    assert len(lines) == 30 and json.loads(lines[0])['task_code'] == 'ex_1'
+
+
+def test_topics_tasks_users_csv(client, login_admin, journal):
+    topics = list(csv.DictReader(io.StringIO(client.get('/admin/topics/export?format=csv').get_data(as_text=True))))
+    ex = next(t for t in topics if t['code'] == 'ex')
+    assert json.loads(ex['level_configs'])['low']['penalty_weights'] == [0.5]
+
+    tasks = client.get('/admin/tasks/export?format=ndjson').get_data(as_text=True).splitlines()
+    assert json.loads(tasks[0])['topic_code'] == 'ex'
+
+    users = list(csv.DictReader(io.StringIO(client.get('/admin/users/export?format=csv').get_data(as_text=True))))
+    assert 'password_hash' not in users[0]
+    assert {'ex0', 'ex1'} <= {u['username'] for u in users}
+
+
+def test_iter_rows_walks_key_batches(app, journal):
+    from sqlalchemy import select
+    from services.export import iter_rows
+    with app.app_context():
+        stmt = select(TaskAttempt.id, TaskAttempt.created_at)
+        expected = [a.id for a in TaskAttempt.query.order_by(TaskAttempt.created_at.desc(), TaskAttempt.id.desc())]
+        got = [r.id for r in iter_rows(stmt, TaskAttempt.created_at, TaskAttempt.id, descending=True, batch=7)]
+        assert got == expected
+        assert [r.id for r in iter_rows(stmt, TaskAttempt.id, batch=10)] == sorted(expected)
@@ -0,0 +1,93 @@
+import pytest
+
+from extensions import db
+from models import Topic, MathTask, TaskAttempt, User
+
+
+@pytest.fixture
+def roster(app, admin_user):
+    with app.app_context():
+        topic = Topic(code='lk', name='Lookup')
+        db.session.add(topic)
+        db.session.flush()
+        for title in ('Алгебра 1', 'Алгебра 2', 'Геометрия', 'algebra lower'):
+            db.session.add(MathTask(title=title, description='d', answer_type='number',
+                                    correct_answer={'type': 'number', 'value': 1.0}, topic_id=topic.id,
+                                    level='low', max_score=1.0, created_by=admin_user.id, is_active=True))
+        for name in ('ivanov', 'ivanova', 'petrov'):
+            u = User(username=name, email=f'{name}@test.com', role='student', first_name='Иван')
+            u.set_password('x')
+            db.session.add(u)
+        db.session.commit()
+
+
+def _texts(resp):
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['ok']
+    return [item['text'] for item in data['items']]
+
+
+@pytest.mark.usefixtures('roster')
+class TestLookupApi:
+    def test_users_prefix(self, client, login_admin):
+        assert _texts(client.get('/admin/api/lookup/users?q=ivan')) == ['ivanov (Иван)', 'ivanova (Иван)']
+        assert _texts(client.get('/admin/api/lookup/users?q=Ivan')) == ['ivanov (Иван)', 'ivanova (Иван)']
+        assert _texts(client.get('/admin/api/lookup/users?q=zzz')) == []
+
+    def test_users_role_and_limit(self, client, login_admin):
+        texts = _texts(client.get('/admin/api/lookup/users?role=student&limit=2'))
+        assert len(texts) == 2
+        assert 'admin' not in ' '.join(texts)
+
+    def test_tasks_prefix_case_variants(self, client, login_admin):
+        assert _texts(client.get('/admin/api/lookup/tasks?q=алг')) == ['Алгебра 1', 'Алгебра 2']
+        assert _texts(client.get('/admin/api/lookup/tasks?q=Algebra')) == ['algebra lower']
+
+    def test_tasks_by_id(self, app, client, login_admin):
+        with app.app_context():
+            tid = MathTask.query.filter_by(title='Геометрия').one().id
+        assert 'Геометрия' in _texts(client.get(f'/admin/api/lookup/tasks?q={tid}'))
+
+    def test_teacher_allowed(self, client, login_teacher):
+        assert client.get('/admin/api/lookup/tasks?q=a').status_code == 200
+
+
+def test_student_forbidden(client, login_student):
+    assert client.get('/admin/api/lookup/users?q=a').status_code == 403
+
+
+@pytest.mark.usefixtures('roster')
+def test_attempt_forms_render_only_selected(app, client, login_admin, student_user):
+    with app.app_context():
+        task = MathTask.query.filter_by(title='Геометрия').one()
+        task_id = task.id
+        db.session.add(TaskAttempt(user_id=student_user.id, task_id=task_id, is_correct=False, attempt_number=1))
+        db.session.commit()
+
+    body = client.get('/admin/attempts').get_data(as_text=True)
+    assert 'data-lookup-url="/admin/api/lookup/users"' in body
+    assert '<option value="' + str(task_id) + '"' not in body
+
+    body = client.get(f'/admin/attempts?task_id={task_id}').get_data(as_text=True)
+    assert 'Геометрия</option>' in body
+    assert 'Алгебра 1</option>' not in body
+
+    body = client.get(f'/admin/attempts/create?task_id={task_id}').get_data(as_text=True)
+    assert 'Геометрия</option>' in body
+    assert 'petrov</option>' not in body
+
+
+@pytest.mark.usefixtures('roster')
+def test_create_attempt_validates_against_selected(app, client, login_admin, student_user):
+    with app.app_context():
+        task_id = MathTask.query.filter_by(title='Геометрия').one().id
+
+    r = client.post('/admin/attempts/create', data={
+        'user_id': student_user.id, 'task_id': task_id, 'user_answer': '1', 'submit': '1'})
+    assert r.status_code in (302, 303)
+    r = client.post('/admin/attempts/create', data={
+        'user_id': 99999, 'task_id': task_id, 'user_answer': '1', 'submit': '1'})
+    assert r.status_code == 200
+    with app.app_context():
+        assert TaskAttempt.query.filter_by(task_id=task_id).count() == 1
@@ -0,0 +1,73 @@
+import pytest
+
+from extensions import db
+from models import Topic, MathTask, TaskAttempt
+
+
+@pytest.fixture
+def task_bank(app, admin_user, student_user, teacher_user):
+    with app.app_context():
+        algebra = Topic(code='alg', name='Алгебра')
+        geometry = Topic(code='geo', name='Геометрия')
+        db.session.add_all([algebra, geometry])
+        db.session.flush()
+        for i in range(45):
+            db.session.add(MathTask(
+                title=f'Задача {i:02d}', code=f'T-{i:02d}', description='x' * 200,
+                answer_type='number' if i % 3 else 'sequence',
+                correct_answer={'type': 'number', 'value': 1.0},
+                topic_id=algebra.id if i % 2 else geometry.id,
+                level=('low', 'medium', 'high')[i % 3], max_score=1.0,
+                created_by=admin_user.id, is_active=(i % 5 != 0)))
+        db.session.flush()
+        first = MathTask.query.filter_by(code='T-01').one()
+        db.session.add_all([
+            TaskAttempt(user_id=student_user.id, task_id=first.id, is_correct=False, attempt_number=1),
+            TaskAttempt(user_id=student_user.id, task_id=first.id, is_correct=True, attempt_number=2),
+            TaskAttempt(user_id=teacher_user.id, task_id=first.id, is_correct=True, attempt_number=1),
+        ])
+        db.session.commit()
+        return {'algebra': algebra.id, 'geometry': geometry.id, 'first': first.id}
+
+
+def _api(client, **params):
+    r = client.get('/admin/api/tasks', query_string=params)
+    assert r.status_code == 200
+    return r.get_json()
+
+
+def test_pages_cover_bank(client, login_admin, task_bank):
+    data = _api(client, per_page=20)
+    assert data['total'] == 45 and data['pages'] == 3 and len(data['items']) == 20
+    ids = [it['id'] for p in (1, 2, 3) for it in _api(client, per_page=20, page=p)['items']]
+    assert len(ids) == len(set(ids)) == 45
+    # страница за пределами — последняя
+    assert _api(client, per_page=20, page=99)['page'] == 3
+
+
+def test_filters(client, login_admin, task_bank):
+    assert _api(client, level='high')['total'] == 15
+    assert _api(client, answer_type='sequence')['total'] == 15
+    assert _api(client, active='0')['total'] == 9
+    assert _api(client, topic_id=task_bank['algebra'])['total'] == 22
+    data = _api(client, q='t-0')
+    assert {it['code'] for it in data['items']} == {f'T-0{i}' for i in range(10)}
+    assert _api(client, q='100%')['total'] == 0
+
+
+def test_stats_and_preview(client, login_admin, task_bank):
+    item = next(it for it in _api(client, q='T-01')['items'] if it['id'] == task_bank['first'])
+    assert item['stats'] == {'attempts': 3, 'students': 2, 'correct': 2, 'success_rate': 66.7}
+    assert item['topic_name'] == 'Алгебра'
+    assert item['description'] == 'x' * 80 + '…'
+
+
+def test_html_page_paginates(client, login_admin, task_bank):
+    body = client.get('/admin/tasks?per_page=20&page=2').get_data(as_text=True)
+    assert body.count('class="task-checkbox"') == 20
+    assert 'Страница 2 из 3' in body
+    assert 'Найдено: 45' in body
+
+
+def test_api_requires_admin(client, login_teacher, task_bank):
+    assert client.get('/admin/api/tasks').status_code == 403
@@ -0,0 +1,76 @@
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import Topic, MathTask, TaskAttempt, User
+
+
+@pytest.fixture
+def roster(app, admin_user):
+    with app.app_context():
+        topic = Topic(code='ul', name='Users listing')
+        db.session.add(topic)
+        db.session.flush()
+        task = MathTask(title='UL', description='d', answer_type='number',
+                        correct_answer={'type': 'number', 'value': 1.0}, topic_id=topic.id,
+                        level='low', max_score=1.0, created_by=admin_user.id)
+        db.session.add(task)
+        users = []
+        for i in range(120):
+            u = User(username=f'pupil_{i:03d}', email=f'pupil{i}@test.com', role='student',
+                     last_name='Смирнов' if i == 7 else None)
+            u.password_hash = 'x'
+            users.append(u)
+        db.session.add_all(users)
+        db.session.flush()
+        for n in range(4):
+            db.session.add(TaskAttempt(user_id=users[7].id, task_id=task.id, is_correct=False,
+                                       attempt_number=n + 1, created_at=datetime(2025, 2, 3, 10, n)))
+        db.session.commit()
+        return users[7].id
+
+
+def _rows(body):
+    return re.findall(r'<tr data-user-id="(\d+)">', body)
+
+
+def test_paginated(client, login_admin, roster):
+    body = client.get('/admin/users').get_data(as_text=True)
+    assert len(_rows(body)) == 100
+    assert 'Найдено: 121' in body
+    body = client.get('/admin/users?page=2').get_data(as_text=True)
+    assert len(_rows(body)) == 21
+    body = client.get('/admin/users?per_page=50&page=3').get_data(as_text=True)
+    assert len(_rows(body)) == 21
+
+
+def test_search_and_counts(client, login_admin, roster):
+    body = client.get('/admin/users?q=Смирн').get_data(as_text=True)
+    assert _rows(body) == [str(roster)]
+    assert 'data-attempts="4"' in body
+    assert 'посл. 03.02.2025 10:03' in body
+
+    body = client.get('/admin/users?q=pupil_00&role=student').get_data(as_text=True)
+    assert len(_rows(body)) == 10
+    assert client.get('/admin/users?q=%25').status_code == 200
+
+
+def test_no_per_user_relationship_loads(app, client, login_admin, roster):
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before)
+        try:
+            assert client.get('/admin/users').status_code == 200
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before)
+
+    attempt_queries = [s for s in statements if 'FROM task_attempts' in s]
+    assert len(attempt_queries) == 1 and 'GROUP BY' in attempt_queries[0]
+    assert not any('student_evaluation_logs' in s or 'student_topic_progress' in s for s in statements)
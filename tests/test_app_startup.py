@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PROBE = r"""
+import json, sys
+import app as m
+built_on_import = m._app is not None
+calls = []
+_create = m.create_app
+m.create_app = lambda: calls.append(1) or _create()
+import wsgi
+from app import app as again
+print(json.dumps({
+    'built_on_import': built_on_import,
+    'calls': len(calls),
+    'same': wsgi.app is again,
+    'migrate': 'migrate' in wsgi.app.extensions,
+    'loaded': [n for n in ('flask_migrate', 'services.user_import', 'services.evaluation') if n in sys.modules],
+}))
+"""
+
+
+def _probe(tmp_path, cli=False):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:////{tmp_path / 'startup.db'}")
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    if cli:
+        env['FLASK_RUN_FROM_CLI'] = 'true'   # так процесс выглядит для `flask ...`
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def test_app_built_once_and_lazily(tmp_path):
+    info = _probe(tmp_path)
+    assert info['built_on_import'] is False
+    assert info['calls'] == 1 and info['same'] is True
+    # веб-процессу не нужны alembic и модули отдельных действий админки
+    assert info['migrate'] is False and info['loaded'] == []
+
+
+def test_cli_gets_flask_migrate(tmp_path):
+    info = _probe(tmp_path, cli=True)
+    assert info['calls'] == 1 and info['migrate'] is True
@@ -0,0 +1,72 @@
+import gzip
+import os
+
+from flask import url_for
+
+from services import assets
+
+
+def _build(app, tmp_path):
+    dist = str(tmp_path / 'dist')
+    report = assets.build(app.static_folder, assets.template_dirs(app), dist)
+    app.extensions['assets'] = {'dist_dir': dist, 'manifest': assets.load_manifest(app.static_folder, dist)}
+    return dist, report
+
+
+def test_build_fingerprints_only_referenced(app, tmp_path):
+    dist, report = _build(app, tmp_path)
+    assert 'css/style.css' in report.built and 'js/app.js' in report.built
+    assert 'css/bootstrap-cosmo.css' in report.dropped
+    target = report.built['css/style.css']
+    assert target.startswith('css/style.') and target.endswith('.css')
+    with open(os.path.join(app.static_folder, 'css/style.css'), 'rb') as fh:
+        source = fh.read()
+    with open(os.path.join(dist, target + '.gz'), 'rb') as fh:
+        assert gzip.decompress(fh.read()) == source
+
+    # повторная сборка того же исходника даёт те же имена; clean убирает чужое
+    stale = os.path.join(dist, 'css', 'style.00000000.css')
+    with open(stale, 'w') as fh:
+        fh.write('old')
+    assert assets.build(app.static_folder, assets.template_dirs(app), dist).built == report.built
+    assert os.path.exists(stale)
+    assets.build(app.static_folder, assets.template_dirs(app), dist, clean=True)
+    assert not os.path.exists(stale)
+    assert os.path.exists(os.path.join(dist, target))
+
+
+def test_fingerprinted_urls_and_headers(app, client, tmp_path):
+    dist, report = _build(app, tmp_path)
+    url = url_for('static', filename='css/style.css')
+    assert url.endswith('/static/dist/' + report.built['css/style.css'])
+
+    resp = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert resp.status_code == 200
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert resp.mimetype == 'text/css'
+    assert 'immutable' in resp.headers['Cache-Control']
+    assert 'max-age=31536000' in resp.headers['Cache-Control']
+    assert resp.headers['Vary'] == 'Accept-Encoding'
+
+    plain = client.get(url)
+    assert 'Content-Encoding' not in plain.headers
+    with open(os.path.join(app.static_folder, 'css/style.css'), 'rb') as fh:
+        assert plain.data == fh.read()
+
+    # файлы вне сборки отдаются как раньше
+    raw = client.get('/static/css/bootstrap-cosmo.css')
+    assert raw.status_code == 200 and 'immutable' not in raw.headers.get('Cache-Control', '')
+    raw.close()
+
+
+def test_changed_source_falls_back_to_live_file(app, tmp_path):
+    dist, _ = _build(app, tmp_path)
+    manifest = os.path.join(dist, assets.MANIFEST)
+    static = str(tmp_path / 'static')
+    os.makedirs(os.path.join(static, 'css'))
+    with open(os.path.join(static, 'css', 'style.css'), 'w') as fh:
+        fh.write('body {}')
+    assert os.path.exists(manifest)
+    assert assets.load_manifest(static, dist) == {}
+    app.extensions['assets']['manifest'] = {}
+    assert url_for('static', filename='css/style.css').endswith('/static/css/style.css')
@@ -0,0 +1,174 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import Topic, MathTask, TaskAttempt, TaskAttemptCounter, TopicLevelConfig, User
+from services.attempt_import import (import_attempts, import_attempts_stream, normalize_answer,
+                                     parse_created_at, partial_score)
+from services.submission import submit_answer
+
+
+@pytest.fixture
+def bank(app, admin_user, student_user):
+    with app.app_context():
+        topic = Topic(code='imp', name='Import')
+        db.session.add(topic)
+        db.session.flush()
+        db.session.add(TopicLevelConfig(topic_id=topic.id, level='low', task_count_threshold=10,
+                                        reference_time=60, penalty_weights=[0.7, 0.4]))
+        tasks = []
+        for i in range(3):
+            t = MathTask(title=f'I{i}', code=f'imp_{i}', description='d', answer_type='number',
+                         correct_answer={'type': 'number', 'value': float(i)}, topic_id=topic.id,
+                         level='low', max_score=2.0, created_by=admin_user.id)
+            db.session.add(t)
+            tasks.append(t)
+        db.session.commit()
+        return {'tasks': [t.id for t in tasks], 'student': student_user.id}
+
+
+def _attempts(user_id, task_id):
+    return (TaskAttempt.query.filter_by(user_id=user_id, task_id=task_id)
+            .order_by(TaskAttempt.attempt_number).all())
+
+
+def test_helpers():
+    assert partial_score([0.7, 0.4], 1, True) == 1.0
+    assert partial_score([0.7, 0.4], 3, True) == 0.4
+    assert partial_score([0.7, 0.4], 4, True) == 0.0
+    assert partial_score([0.7], 2, False) == 0.0
+    # та же политика, что у отправки ответа: веса в 0..1, после MAX_ATTEMPTS — 0
+    assert partial_score([1.5, -0.2], 2, True) == 1.0
+    assert partial_score([1.5, -0.2], 3, True) == 0.0
+    assert partial_score([0.7, 0.4, 0.3], 4, True) == 0.0
+    assert partial_score(None, 2, True) == 0.0
+    assert normalize_answer(' {"a": 1} ') == {'a': 1}
+    assert normalize_answer('  ') is None
+    assert parse_created_at('2025-01-02').day == 2
+    assert parse_created_at('garbage') is None
+
+
+def test_numbering_scoring_and_errors(app, bank):
+    uid = bank['student']
+    t0, t1, _ = bank['tasks']
+    with app.app_context():
+        task = db.session.get(MathTask, t0)
+        submit_answer(uid, task, {'type': 'number', 'value': 9.0}, False)  # уже есть попытка №1
+
+        report = import_attempts([
+            {'username': 'student', 'task_code': 'imp_0', 'is_correct': False},
+            {'username': 'student', 'task_code': 'imp_0', 'is_correct': True},
+            {'user_id': uid, 'task_id': t1, 'attempt_number': 2, 'is_correct': False},
+            {'user_id': uid, 'task_id': t1, 'attempt_number': 2},        # дубль внутри файла
+            {'username': 'student', 'task_code': 'imp_0', 'attempt_number': 1},  # дубль с БД
+            {'username': 'nobody', 'task_code': 'imp_0'},
+            {'username': 'student', 'task_code': 'missing'},
+            {'username': 'student', 'task_code': 'imp_1', 'time_spent': 'abc'},
+            'not an object',
+        ], chunk_size=4)
+
+        assert report.total == 9 and report.created == 3 and report.chunks == 3
+        assert [e.row for e in report.errors] == [4, 5, 6, 7, 8, 9]
+        assert 'уже существует' in report.errors[0].message
+        assert 'студент не найден' in report.errors[2].message
+
+        rows = _attempts(uid, t0)
+        assert [(a.attempt_number, a.partial_score) for a in rows] == [(1, 0.0), (2, 0.0), (3, 0.4)]
+        assert rows[1].user_answer == {'type': 'number', 'value': 0.0}  # ответ по умолчанию — эталон
+        assert rows[2].component_scores == 2.0
+        assert [(a.attempt_number, a.partial_score) for a in _attempts(uid, t1)] == [(2, 0.0)]
+
+        # счётчик пары пересобран: следующая отправка получает следующий номер
+        assert db.session.get(TaskAttemptCounter, (uid, t0)) is None
+        result = submit_answer(uid, db.session.get(MathTask, t1), {'type': 'number', 'value': 1.0}, True)
+        assert result.attempt_number == 3
+
+
+def test_query_count_does_not_scale_with_rows(app, bank, admin_user):
+    with app.app_context():
+        names = []
+        for i in range(60):
+            u = User(username=f'bulk{i}', email=f'bulk{i}@test.com', role='student', password_hash='x')
+            db.session.add(u)
+            names.append(u.username)
+        db.session.commit()
+        rows = [{'username': n, 'task_code': f'imp_{k}', 'is_correct': k == 2}
+                for n in names for k in range(3)]
+
+        statements = []
+        listener = lambda conn, cursor, statement, *a: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        progress = []
+        try:
+            report = import_attempts(rows, chunk_size=100, progress=lambda r: progress.append(r.total))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert report.created == 180 and not report.errors
+        assert progress == [100, 180]
+        selects = [s for s in statements if s.lstrip().upper().startswith('SELECT')]
+        assert len(selects) <= 2 * 5  # задачи, пользователи, пары, веса — на пачку
+        assert TaskAttempt.query.filter_by(task_id=bank['tasks'][2], partial_score=1.0).count() == 60
+
+
+def test_csv_upload_streams_rows(app, client, login_admin, bank):
+    csv_body = ('﻿task_code,username,is_correct,time_spent,hints_used,attempt_number,created_at\n'
+                'imp_0,student,FALSE,30,0,,2025-07-14T09:15:00\n'
+                'imp_0,student,TRUE,40,1,,2025-07-14T09:20:00\n'
+                'imp_1,student,true,10,0,1,\n'
+                'imp_2,ghost,TRUE,10,0,1,\n'
+                'imp_2,student,TRUE,10,0,1,,extra\n')
+    r = client.post('/admin/attempts/import', data={'file': (io.BytesIO(csv_body.encode()), 'data.csv')},
+                    content_type='multipart/form-data', follow_redirects=True)
+    body = r.get_data(as_text=True)
+    assert 'Импортировано попыток: 3. Ошибок: 2' in body
+    assert 'Строка 4: студент не найден' in body
+    assert 'Строка 5: лишние значения в строке CSV' in body
+
+    with app.app_context():
+        uid = bank['student']
+        rows = _attempts(uid, bank['tasks'][0])
+        assert [(a.is_correct, a.time_spent, a.partial_score) for a in rows] == [(False, 30, 0.0), (True, 40, 0.7)]
+        assert rows[0].created_at.isoformat() == '2025-07-14T09:15:00'
+        assert _attempts(uid, bank['tasks'][1])[0].partial_score == 1.0
+
+
+def test_ndjson_stream_is_consumed_lazily(app, bank):
+    uid = bank['student']
+    seen = []
+
+    class Upload(io.RawIOBase):
+        """Поток, который помнит, сколько строк из него уже прочитали."""
+        def __init__(self, lines):
+            self._lines = iter(lines)
+
+        def readable(self):
+            return True
+
+        def readinto(self, buf):
+            line = next(self._lines, b'')
+            seen.append(line)
+            buf[:len(line)] = line
+            return len(line)
+
+    lines = [json.dumps({'user_id': uid, 'task_code': f'imp_{i % 3}'}).encode() + b'\n' for i in range(6)]
+    lines.insert(2, b'{broken\n')
+    progress = []
+    with app.app_context():
+        report = import_attempts_stream(io.BufferedReader(Upload(lines), buffer_size=16), 'ndjson',
+                                        chunk_size=3, progress=lambda r: progress.append(len(seen)))
+        assert report.created == 6 and report.chunks == 3
+        assert [e.message for e in report.errors] == ['Строка 3: некорректный JSON (Expecting property name '
+                                                      'enclosed in double quotes)']
+        # первая пачка ушла в БД до того, как файл был дочитан
+        assert progress[0] < len(lines)
+        assert TaskAttempt.query.filter_by(user_id=uid).count() == 6
+
+
+def test_unknown_extension_rejected(client, login_admin):
+    r = client.post('/admin/attempts/import', data={'file': (io.BytesIO(b'x'), 'data.xlsx')},
+                    content_type='multipart/form-data', follow_redirects=True)
+    assert 'Поддерживаются только .json, .csv и .ndjson' in r.get_data(as_text=True)
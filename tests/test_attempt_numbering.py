@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Topic, MathTask, TaskAttempt, TaskAttemptCounter, User
+from services.submission import submit_answer, load_task_status
+
+
+@pytest.fixture
+def task_id(app, admin_user):
+    with app.app_context():
+        topic = Topic(code='race', name='Race')
+        db.session.add(topic)
+        db.session.flush()
+        task = MathTask(title='Race', description='d', answer_type='number',
+                        correct_answer={'type': 'number', 'value': 7.0}, topic_id=topic.id,
+                        level='low', max_score=1.0, created_by=admin_user.id, is_active=True)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+
+def _hammer(app, user_id, task_id, answers):
+    """Run submit_answer for every answer in parallel threads, each with its own session."""
+    barrier = threading.Barrier(len(answers))
+    errors = []
+
+    def worker(is_correct):
+        with app.app_context():
+            task = db.session.get(MathTask, task_id)
+            barrier.wait()
+            try:
+                submit_answer(user_id, task, {'type': 'number', 'value': 0.0}, is_correct)
+            except Exception as e:  # pragma: no cover - surfaced via assertion below
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(a,)) for a in answers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def test_parallel_wrong_answers_never_exceed_block(app, student_user, task_id):
+    errors = _hammer(app, student_user.id, task_id, [False] * 12)
+    assert not errors
+    with app.app_context():
+        numbers = sorted(n for (n,) in db.session.query(TaskAttempt.attempt_number)
+                         .filter_by(user_id=student_user.id, task_id=task_id))
+        assert numbers == [1, 2, 3]
+        assert load_task_status(student_user.id, task_id).blocked
+
+
+def test_parallel_correct_answers_store_single_solution(app, student_user, task_id):
+    errors = _hammer(app, student_user.id, task_id, [True] * 8)
+    assert not errors
+    with app.app_context():
+        rows = TaskAttempt.query.filter_by(user_id=student_user.id, task_id=task_id).all()
+        assert len(rows) == 1 and rows[0].attempt_number == 1 and rows[0].is_correct
+
+
+def test_many_students_numbers_stay_unique(app, admin_user, task_id):
+    with app.app_context():
+        ids = []
+        for i in range(4):
+            u = User(username=f's{i}', email=f's{i}@test.com', role='student')
+            u.set_password('x')
+            db.session.add(u)
+            db.session.flush()
+            ids.append(u.id)
+        db.session.commit()
+
+    threads = [threading.Thread(target=_hammer, args=(app, uid, task_id, [False, False, True, False]))
+               for uid in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with app.app_context():
+        dupes = (db.session.query(TaskAttempt.user_id, TaskAttempt.attempt_number, db.func.count())
+                 .filter(TaskAttempt.task_id == task_id)
+                 .group_by(TaskAttempt.user_id, TaskAttempt.attempt_number)
+                 .having(db.func.count() > 1).all())
+        assert dupes == []
+        for uid in ids:
+            assert TaskAttempt.query.filter_by(user_id=uid, task_id=task_id).count() <= 3
+
+
+def test_unique_constraint_rejects_duplicate_number(app, student_user, task_id):
+    with app.app_context():
+        db.session.add(TaskAttempt(user_id=student_user.id, task_id=task_id, is_correct=False, attempt_number=1))
+        db.session.commit()
+        db.session.add(TaskAttempt(user_id=student_user.id, task_id=task_id, is_correct=False, attempt_number=1))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+
+def test_counter_resyncs_after_manual_attempts(app, student_user, task_id):
+    with app.app_context():
+        task = db.session.get(MathTask, task_id)
+        submit_answer(student_user.id, task, {'type': 'number', 'value': 0.0}, False)
+        # Attempt inserted behind the counter's back (e.g. raw admin tooling)
+        db.session.add(TaskAttempt(user_id=student_user.id, task_id=task_id, is_correct=False, attempt_number=2))
+        db.session.commit()
+
+        result = submit_answer(student_user.id, task, {'type': 'number', 'value': 7.0}, True)
+        assert result.accepted and result.attempt_number == 3
+        counter = db.session.get(TaskAttemptCounter, (student_user.id, task_id))
+        assert counter.solved and counter.last_attempt_number == 3
+
+
+def test_solve_route_resyncs_after_manual_attempts(app, client, login_student, student_user, task_id):
+    with app.app_context():
+        task = db.session.get(MathTask, task_id)
+        submit_answer(student_user.id, task, {'type': 'number', 'value': 0.0}, False)
+        db.session.add(TaskAttempt(user_id=student_user.id, task_id=task_id, is_correct=False, attempt_number=2))
+        db.session.commit()
+
+    resp = client.post(f'/tasks/{task_id}/solve', data={'answer_type': 'number', 'number_answer': '7'})
+    assert resp.status_code == 200
+    assert 'UNIQUE' not in resp.get_data(as_text=True)
+    with app.app_context():
+        numbers = sorted(n for (n,) in db.session.query(TaskAttempt.attempt_number)
+                         .filter_by(user_id=student_user.id, task_id=task_id))
+        assert numbers == [1, 2, 3]
+        counter = db.session.get(TaskAttemptCounter, (student_user.id, task_id))
+        assert counter.solved and counter.last_attempt_number == 3
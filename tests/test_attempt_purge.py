@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import MathTask, TaskAttempt, TaskAttemptCounter, Topic, User
+from services.attempt_purge import delete_attempts, purge_attempts
+from services.keyset import reset_counts
+from services.submission import ensure_attempt_counter, submit_answer
+
+
+@pytest.fixture
+def cohort(app, admin_user):
+    """Два студента, две задачи двух тем; по 5 неверных попыток на пару, попытки идут по дням."""
+    reset_counts()
+    with app.app_context():
+        topics = [Topic(code='p1', name='P1'), Topic(code='p2', name='P2')]
+        db.session.add_all(topics)
+        db.session.flush()
+        tasks = [MathTask(title=f'T{i}', description='d', answer_type='number',
+                          correct_answer={'type': 'number', 'value': 1.0}, topic_id=topics[i].id,
+                          level='low', max_score=1.0, created_by=admin_user.id) for i in range(2)]
+        users = [User(username=f'pg{i}', email=f'pg{i}@test.com', role='student', password_hash='x')
+                 for i in range(2)]
+        db.session.add_all(tasks + users)
+        db.session.flush()
+        base = datetime(2025, 1, 1, 12, 0, 0)
+        for u in users:
+            for t in tasks:
+                for n in range(5):
+                    db.session.add(TaskAttempt(user_id=u.id, task_id=t.id, is_correct=False,
+                                               attempt_number=n + 1, created_at=base + timedelta(days=n)))
+        db.session.commit()
+        for u in users:
+            for t in tasks:
+                ensure_attempt_counter(u.id, t.id)
+        db.session.commit()
+        return [u.id for u in users], [t.id for t in tasks], [t.id for t in topics]
+
+
+def test_purge_by_filter_in_batches_resets_counters(app, cohort):
+    (u1, u2), (t1, t2), (topic1, _) = cohort
+    with app.app_context():
+        seen = []
+        report = purge_attempts([TaskAttempt.user_id == u1], batch=3,
+                                progress=lambda r: seen.append(r.deleted))
+        assert (report.total, report.deleted, report.batches, report.pairs) == (10, 10, 4, 2)
+        assert seen == [3, 6, 9, 10]
+        assert TaskAttempt.query.filter_by(user_id=u1).count() == 0
+        assert TaskAttempt.query.filter_by(user_id=u2).count() == 10
+        # счётчики удалены только у затронутых пар и пересоздаются при следующей отправке
+        assert {(c.user_id, c.task_id) for c in TaskAttemptCounter.query} == {(u2, t1), (u2, t2)}
+        result = submit_answer(u1, db.session.get(MathTask, t1), {'value': 0}, False)
+        assert result.accepted and result.attempt_number == 1
+
+
+def test_purge_by_topic_and_dates(app, cohort):
+    (u1, u2), (t1, t2), (topic1, _) = cohort
+    with app.app_context():
+        clauses = [TaskAttempt.task_id.in_(db.session.query(MathTask.id).filter(MathTask.topic_id == topic1)),
+                   TaskAttempt.created_at >= datetime(2025, 1, 3)]
+        report = purge_attempts(clauses)
+        assert report.deleted == 6 and report.batches == 1
+        assert TaskAttempt.query.filter_by(task_id=t1).count() == 4
+        assert TaskAttempt.query.filter_by(task_id=t2).count() == 10
+        assert purge_attempts([TaskAttempt.user_id == -1]).deleted == 0
+
+
+def test_delete_by_ids_is_chunked(app, cohort):
+    with app.app_context():
+        ids = [a.id for a in TaskAttempt.query.order_by(TaskAttempt.id).limit(7)]
+        report = delete_attempts(ids + [999999], batch=2)
+        assert report.deleted == 7 and report.batches == 4
+        assert TaskAttempt.query.count() == 13
+
+
+def test_purge_route_runs_job(client, app, login_admin, cohort):
+    (u1, _), _, (topic1, _) = cohort
+    body = client.get(f'/admin/attempts?student_id={u1}').get_data(as_text=True)
+    assert 'Удалить всё по фильтру' in body
+
+    body = client.post('/admin/attempts/purge', data={'student_id': u1, 'topic_id': topic1},
+                       follow_redirects=True).get_data(as_text=True)
+    assert 'Удалено попыток: 5' in body
+    with app.app_context():
+        assert TaskAttempt.query.count() == 15
+
+    body = client.post('/admin/attempts/purge', data={}, follow_redirects=True).get_data(as_text=True)
+    assert 'хотя бы один фильтр' in body
+    with app.app_context():
+        assert TaskAttempt.query.count() == 15
+
+
+def test_purge_requires_admin(client, login_teacher):
+    assert client.post('/admin/attempts/purge', data={'student_id': 1}).status_code == 403
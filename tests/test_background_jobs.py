@@ -0,0 +1,140 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import BackgroundJob, Topic, MathTask, TaskAttempt
+from services.jobs import jobs
+
+
+@pytest.fixture
+def attempts_data(app, admin_user, student_user):
+    with app.app_context():
+        topic = Topic(code='bg', name='Фон')
+        db.session.add(topic)
+        db.session.flush()
+        task = MathTask(title='BG', code='bg_1', description='d', answer_type='number',
+                        correct_answer={'type': 'number', 'value': 1.0}, topic_id=topic.id,
+                        level='low', max_score=1.0, created_by=admin_user.id)
+        db.session.add(task)
+        db.session.flush()
+        for n in range(12):
+            db.session.add(TaskAttempt(user_id=student_user.id, task_id=task.id, is_correct=False,
+                                       attempt_number=n + 1, created_at=datetime(2025, 3, 1) + timedelta(hours=n)))
+        db.session.commit()
+        return {'topic_id': topic.id, 'student_id': student_user.id}
+
+
+def test_background_export_redirects_to_job_and_downloads(client, login_admin, attempts_data):
+    r = client.get('/admin/attempts/export?format=csv&gzip=1&background=1')
+    assert r.status_code == 302 and '/admin/jobs/' in r.headers['Location']
+    job_id = int(r.headers['Location'].rstrip('/').rsplit('/', 1)[1])
+
+    status = client.get(f'/admin/api/jobs/{job_id}').get_json()['job']
+    assert status['status'] == 'succeeded' and status['progress'] == 12
+    assert status['result']['rows'] == 12
+
+    page = client.get(f'/admin/jobs/{job_id}').get_data(as_text=True)
+    assert 'Экспорт попыток' in page and 'Скачать attempts_export_' in page
+
+    dl = client.get(status['download_url'])
+    assert dl.headers['Content-Type'] == 'application/gzip'
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(dl.data).decode())))
+    assert len(rows) == 12 and rows[0]['task_code'] == 'bg_1'
+
+    assert 'Экспорт попыток' in client.get('/admin/jobs').get_data(as_text=True)
+
+
+def test_thread_pool_runs_job(app, client, login_admin, attempts_data):
+    app.config['JOBS_SYNC'] = False
+    r = client.post('/admin/users/export?format=ndjson', json={'user_ids': [attempts_data['student_id']],
+                                                              'background': True})
+    assert r.status_code == 202
+    job_id = r.get_json()['job']['id']
+    with app.app_context():
+        jobs.wait(job_id, timeout=10)
+    status = client.get(r.get_json()['status_url']).get_json()['job']
+    assert status['status'] == 'succeeded'
+    lines = client.get(status['download_url']).get_data(as_text=True).splitlines()
+    assert [json.loads(x)['username'] for x in lines] == ['student']
+
+
+def test_failed_import_job_reports_error(client, login_admin):
+    r = client.post('/admin/attempts/import', data={'file': (io.BytesIO(b'{not json'), 'broken.json')},
+                    content_type='multipart/form-data', follow_redirects=True)
+    body = r.get_data(as_text=True)
+    assert 'Импорт попыток' in body and 'Ошибка' in body and 'Expecting' in body
+
+
+def test_evaluation_preview_in_background(client, login_admin, attempts_data):
+    r = client.post('/admin/evaluation/preview', json={'user_ids': [attempts_data['student_id']],
+                                                       'topic_id': attempts_data['topic_id'],
+                                                       'period_start': '2025-03-01',
+                                                       'period_end': '2025-03-07',
+                                                       'background': True})
+    assert r.status_code == 202
+    job = client.get(r.get_json()['status_url']).get_json()['job']
+    assert job['status'] == 'succeeded'
+    assert job['result']['ok'] is True
+    assert job['result']['meta']['period_start'] == '2025-03-01'
+    assert job['result']['results'][0]['user_id'] == attempts_data['student_id']
+
+
+def test_job_access(app, client, admin_user, teacher_user, login_teacher):
+    with app.app_context():
+        job = BackgroundJob(kind='export_users', status='succeeded', progress=0, created_by=admin_user.id)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+    assert client.get(f'/admin/api/jobs/{job_id}').status_code == 404  # чужая задача
+    assert client.get('/admin/jobs').status_code == 200
+
+
+def test_export_attempts_requires_staff(client, login_student, attempts_data):
+    assert client.get('/admin/attempts/export?format=csv').status_code == 403
+    assert client.get('/admin/attempts/export?format=csv&background=1').status_code == 403
+    with client.application.app_context():
+        assert BackgroundJob.query.filter_by(kind='export_attempts').count() == 0
+
+
+def test_stale_job_marked_failed(app, admin_user):
+    with app.app_context():
+        job = BackgroundJob(kind='export_users', status='running', progress=5, created_by=admin_user.id,
+                            updated_at=datetime.utcnow() - timedelta(hours=1))
+        db.session.add(job)
+        db.session.commit()
+        assert jobs.get(job.id).status == 'failed'
+        assert 'прервана' in jobs.get(job.id).message
+
+
+def test_stale_check_respects_fresh_heartbeat(app, admin_user):
+    """Пульс, записанный владельцем после чтения строки, спасает задачу от пометки «прервана»."""
+    with app.app_context():
+        job = BackgroundJob(kind='export_users', status='running', progress=5, created_by=admin_user.id,
+                            updated_at=datetime.utcnow() - timedelta(hours=1))
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+        assert db.session.get(BackgroundJob, job_id).status == 'running'   # строка прочитана
+        with db.engine.begin() as conn:   # прогресс из другого воркера
+            conn.execute(BackgroundJob.__table__.update().where(BackgroundJob.id == job_id)
+                         .values(updated_at=datetime.utcnow(), progress=6))
+        assert jobs.get(job_id).status == 'running'
+
+
+def test_finish_does_not_overwrite_finished_job(app, admin_user):
+    with app.app_context():
+        job = BackgroundJob(kind='export_users', status='running', progress=5, created_by=admin_user.id,
+                            updated_at=datetime.utcnow() - timedelta(hours=1))
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+        assert jobs.get(job_id).status == 'failed'
+        assert jobs._finish(job_id, 'succeeded', result={'rows': 1}) is False
+        job = db.session.get(BackgroundJob, job_id)
+        db.session.refresh(job)
+        assert job.status == 'failed' and job.result is None
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+
+import pytest
+
+from extensions import cache as app_cache
+from services.cache import Cache, MemoryBackend, MISSING, RedisBackend, SQLiteBackend, make_backend
+
+
+def _cache(url=''):
+    """Отдельный экземпляр — как кэш другого процесса с тем же общим уровнем."""
+    c = Cache()
+    c.backend = make_backend(url)
+    return c
+
+
+def test_memory_backend_lru_and_ttl():
+    mem = MemoryBackend(maxsize=2)
+    mem.set('a', 1)
+    mem.set('b', 2)
+    assert mem.get('a') == 1          # 'a' стал свежее 'b'
+    mem.set('c', 3)
+    assert mem.get('b') is MISSING and mem.get('a') == 1 and len(mem) == 2
+    mem.set('short', 'x', ttl=0.05)
+    assert mem.get('short') == 'x'
+    time.sleep(0.06)
+    assert mem.get('short') is MISSING
+
+
+def test_shared_tier_between_processes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'cache.db'}"
+    first, second = _cache(url).namespace('demo'), _cache(url).namespace('demo')
+    value = {'topics': [1, 2, 3]}
+    first.set(('k', 1), value)
+    assert first.get(('k', 1)) is value          # локальный уровень — тот же объект
+    assert second.get(('k', 1)) == value
+    assert second.stats.shared_hits == 1
+    assert second.get(('k', 1)) is second.get(('k', 1))
+    assert second.stats.hits == 2
+
+    other = _cache(url).namespace('other')
+    assert other.get(('k', 1)) is None            # пространства не пересекаются
+    hits = first.stats.hits
+    first.clear()
+    assert _cache(url).namespace('demo').get(('k', 1)) is None
+    assert first.stats.hits == hits               # счётчики монотонные — clear их не трогает
+
+
+def test_shared_keys_are_versioned(tmp_path):
+    url = f"sqlite:///{tmp_path / 'cache.db'}"
+    old = _cache(url)
+    old.version = 'schema1'
+    old.namespace('demo').set('k', {'shape': 'old'})
+
+    new_schema = _cache(url)
+    new_schema.version = 'schema2'
+    assert new_schema.namespace('demo').get('k') is None      # после миграции старые записи не видны
+    new_code = _cache(url)
+    new_code.version = 'schema1'
+    assert new_code.namespace('demo', version=2).get('k') is None   # сменилась форма значения
+    same = _cache(url)
+    same.version = 'schema1'
+    assert same.namespace('demo').get('k') == {'shape': 'old'}
+
+    new_code.namespace('demo', version=2).clear()             # clear — все версии пространства
+    fresh = _cache(url)
+    fresh.version = 'schema1'
+    assert fresh.namespace('demo').get('k') is None
+
+
+def test_schema_version_follows_migrations(tmp_path):
+    from services.cache import schema_version
+    versions = tmp_path / 'migrations' / 'versions'
+    versions.mkdir(parents=True)
+    (versions / 'a1_initial.py').write_text('')
+    before = schema_version(str(tmp_path))
+    (versions / 'b2_next.py').write_text('')
+    assert schema_version(str(tmp_path)) != before
+    assert schema_version(str(tmp_path / 'missing')) == ''
+
+
+def test_single_flight_in_process():
+    ns = _cache().namespace('flight')
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return 42
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ns.get_or_set('key', loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [42] * 8
+    assert len(calls) == 1 and ns.stats.loads == 1
+    assert ns.stats.waits + ns.stats.hits == 7      # опоздавший поток просто попадает в кэш
+
+    with pytest.raises(ZeroDivisionError):
+        ns.get_or_set('bad', lambda: 1 / 0)
+    assert ns.get_or_set('bad', lambda: 'ok') == 'ok'   # ошибка не кэшируется
+
+
+def test_lease_across_processes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'cache.db'}"
+    a, b = _cache(url).namespace('lease'), _cache(url).namespace('lease')
+    calls, started = [], threading.Event()
+
+    def slow():
+        calls.append('a')
+        started.set()
+        time.sleep(0.2)
+        return 'from a'
+
+    worker = threading.Thread(target=lambda: a.get_or_set('k', slow))
+    worker.start()
+    assert started.wait(5)                          # «процесс» a взял аренду и считает
+    assert b.get_or_set('k', lambda: calls.append('b') or 'from b') == 'from a'
+    worker.join()
+    assert calls == ['a'] and b.stats.waits == 1 and b.stats.loads == 0
+
+
+def test_ttl_and_broken_shared_tier(tmp_path):
+    ns = _cache().namespace('ttl', ttl=0.05)
+    assert ns.get_or_set('k', lambda: 1) == 1
+    assert ns.get_or_set('k', lambda: 2) == 1
+    time.sleep(0.06)
+    assert ns.get_or_set('k', lambda: 3) == 3
+
+    broken = Cache()
+    broken.backend = SQLiteBackend(str(tmp_path))   # каталог вместо файла — SQLite не откроет
+    ns = broken.namespace('broken')
+    assert ns.get_or_set('k', lambda: 'fallback') == 'fallback'
+    assert ns.get('k') == 'fallback'                # локальный уровень работает
+    assert ns.stats.errors >= 1
+
+
+def test_redis_clear_matches_prefix_literally():
+    class Client:
+        def __init__(self):
+            self.patterns = []
+
+        def scan_iter(self, match, count):
+            self.patterns.append(match)
+            return iter(())
+
+    backend = RedisBackend.__new__(RedisBackend)   # без сервера: проверяем только шаблон SCAN
+    backend.client = Client()
+    backend.clear('app:v[1]?*\\x:')
+    assert backend.client.patterns == ['app:v\\[1\\]\\?\\*\\\\x:*']
+
+
+def test_extension_and_cli(app, tmp_path):
+    assert app.extensions['cache'] is app_cache
+    assert {'catalog', 'task_fragments', 'journal_counts'} <= set(app_cache.namespaces)
+    assert isinstance(app_cache.stats()['catalog']['hits'], int)
+    ns = app_cache.namespace('task_fragments')
+    ns.set(('probe', 1, ''), 'html')
+    result = app.test_cli_runner().invoke(args=['cache-clear', 'task_fragments'])
+    assert result.exit_code == 0 and 'task_fragments' in result.output
+    assert ns.get(('probe', 1, '')) is None
+
+    with pytest.raises(ValueError):
+        make_backend('ftp://nowhere')
+    assert make_backend('') is None and make_backend('memory://') is None
+    assert make_backend(f"sqlite:///{tmp_path / 'x.db'}").path == os.path.join(str(tmp_path), 'x.db')
+
+
+@pytest.mark.skipif(not os.getenv('CACHE_TEST_REDIS_URL'), reason='CACHE_TEST_REDIS_URL не задан')
+def test_redis_backend():
+    url = os.environ['CACHE_TEST_REDIS_URL']
+    first, second = _cache(url).namespace('redis_demo'), _cache(url).namespace('redis_demo')
+    first.clear()
+    first.set('k', [1, 2])
+    assert second.get('k') == [1, 2]
+    assert first.cache.backend.add('lease', b'1', 1) and not first.cache.backend.add('lease', b'1', 1)
+    first.clear()
+    assert _cache(url).namespace('redis_demo').get('k') is None
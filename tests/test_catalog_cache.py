@@ -0,0 +1,88 @@
+from sqlalchemy import event
+
+from extensions import db
+from models import Topic, MathTask, CacheVersion
+from services import catalog
+
+
+def _count_selects(fn):
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before)
+    return statements
+
+
+def _make_task(admin_user, topic, title):
+    task = MathTask(title=title, description='d', answer_type='number',
+                    correct_answer={'type': 'number', 'value': 1.0}, topic_id=topic.id,
+                    level='low', max_score=1.0, created_by=admin_user.id, is_active=True)
+    db.session.add(task)
+    return task
+
+
+def test_catalog_reused_until_write(app, admin_user):
+    with app.app_context():
+        catalog.reset()
+        topic = Topic(code='b', name='Б-тема')
+        db.session.add_all([topic, Topic(code='a', name='А-тема')])
+        db.session.flush()
+        _make_task(admin_user, topic, 'Задача 1')
+        db.session.commit()
+
+        first = catalog.get_catalog()
+        assert [t.name for t in first.topics] == ['А-тема', 'Б-тема']
+        assert [t.task_count for t in first.topics] == [0, 1]
+        assert [t.title for t in first.tasks] == ['Задача 1']
+
+        # Повторное обращение — только чтение версии
+        selects = _count_selects(catalog.get_catalog)
+        assert len(selects) == 1 and 'cache_versions' in selects[0]
+        assert catalog.get_catalog() is first
+
+        task = MathTask.query.filter_by(title='Задача 1').one()
+        task.title = 'Задача 1 (ред.)'
+        db.session.commit()
+        assert [t.title for t in catalog.get_tasks()] == ['Задача 1 (ред.)']
+
+        db.session.delete(Topic.query.filter_by(code='a').one())
+        db.session.commit()
+        assert [t.code for t in catalog.get_topics()] == ['b']
+
+
+def test_irrelevant_edit_and_rollback_keep_version(app, admin_user):
+    with app.app_context():
+        topic = Topic(code='c', name='C')
+        db.session.add(topic)
+        db.session.flush()
+        task = _make_task(admin_user, topic, 'T')
+        db.session.commit()
+        version = catalog.current_version()
+
+        task.description = 'другое условие'
+        db.session.commit()
+        assert catalog.current_version() == version
+
+        db.session.add(Topic(code='d', name='D'))
+        db.session.flush()
+        db.session.rollback()
+        assert catalog.current_version() == version
+        assert db.session.get(CacheVersion, catalog.NAMESPACE).version == version
+
+
+def test_admin_attempts_topic_filter_uses_catalog(app, client, login_admin, admin_user):
+    with app.app_context():
+        topic = Topic(code='e', name='Каталожная тема')
+        db.session.add(topic)
+        db.session.commit()
+
+    r = client.get('/admin/attempts')
+    assert r.status_code == 200
+    assert 'Каталожная тема' in r.get_data(as_text=True)
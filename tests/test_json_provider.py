@@ -0,0 +1,87 @@
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from markupsafe import Markup
+
+from services import json_provider
+from services.json_provider import FastJSONProvider, dumps_compact
+
+orjson_only = pytest.mark.skipif(json_provider.orjson is None, reason='orjson не установлен')
+
+
+@dataclass
+class Point:
+    x: int
+    y: float
+
+
+def _payload():
+    return {
+        'when': datetime(2025, 3, 4, 5, 6, 7, 891011),
+        'day': date(2025, 3, 4),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'score': Decimal('0.70'),
+        'point': Point(1, 2.5),
+        'html': Markup('<b>ж</b>'),
+        'name': 'Пётр',
+        'rows': [{'b': 1, 'a': None, 'c': [True, 1.5e-7]}],
+    }
+
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_provider_matches_flask_default(app, fast):
+    provider = FastJSONProvider(app, fast=fast)
+    reference = DefaultJSONProvider(app)
+    obj = _payload()
+    assert json.loads(provider.dumps(obj)) == json.loads(reference.dumps(obj))
+    pretty = provider.dumps(obj, indent=2)
+    assert pretty.startswith('{\n  "day": ') and json.loads(pretty) == json.loads(reference.dumps(obj))
+    # ключи отсортированы, даты — HTTP-формат, как у Flask
+    text = provider.dumps({'b': 1, 'a': date(2025, 1, 1)})
+    assert text.index('"a"') < text.index('"b"')
+    assert json.loads(text)['a'] == 'Wed, 01 Jan 2025 00:00:00 GMT'
+    assert provider.loads(b'{"x": [1, 2]}') == {'x': [1, 2]}
+
+
+@orjson_only
+def test_provider_falls_back_to_stdlib(app):
+    provider = FastJSONProvider(app)
+    assert provider.fast
+    assert json.loads(provider.dumps({'n': 2 ** 70})) == {'n': 2 ** 70}
+    assert provider.dumps([1, 2], indent=4) == json.dumps([1, 2], indent=4)
+    assert provider.dumps({'k': 'ё'}, ensure_ascii=True) == '{"k": "\\u0451"}'
+    assert provider.loads('[NaN]')[0] != provider.loads('[NaN]')[0]
+    with pytest.raises(ValueError):
+        provider.loads('{broken')
+
+
+def test_jsonify_uses_fast_provider(app, client):
+    assert isinstance(app.json, FastJSONProvider)
+
+    @app.route('/_json_probe')
+    def json_probe():
+        return app.json.response(_payload())
+
+    resp = client.get('/_json_probe')
+    assert resp.mimetype == 'application/json'
+    assert resp.data.endswith(b'\n')
+    assert resp.get_json() == json.loads(DefaultJSONProvider(app).dumps(_payload()))
+
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_dumps_compact_matches_stdlib(monkeypatch, fast):
+    if not fast:
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    row = {'id': 7, 'created_at': datetime(2025, 1, 2, 3, 4, 5, 60),
+           'aware': datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=3))),
+           'day': date(2025, 1, 2), 'user_answer': {'value': 'ответ'}, 'big': 2 ** 70}
+    expected = json.dumps(row, ensure_ascii=False, separators=(',', ':'),
+                          default=lambda v: v.isoformat()).encode('utf-8')
+    assert dumps_compact(row) == expected
+    with pytest.raises(TypeError):
+        dumps_compact({'bad': object()})
@@ -0,0 +1,118 @@
+import json
+import os
+import re
+
+from extensions import db
+from models import Topic
+from services import metrics
+from blueprints.admin.routes import _evaluation_preview_result
+from services.task_import import import_tasks
+
+
+def _value(text, name, **labels):
+    """Значение серии из текста /metrics (0, если серии нет)."""
+    want = ','.join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    pattern = '^' + re.escape(name) + (r'\{' + re.escape(want) + r'\}' if want else '') + r' (\S+)$'
+    m = re.search(pattern, text, re.M)
+    return float(m.group(1)) if m else 0.0
+
+
+def _scrape(client):
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
+    return resp.get_data(as_text=True)
+
+
+def test_metrics_requests_and_sql(client, student_user):
+    before = _scrape(client)
+    for _ in range(3):
+        assert client.get('/auth/login').status_code == 200
+    client.get('/no-such-page')
+    client.post('/auth/login', data={'username': 'student', 'password': 'wrong'})
+    text = _scrape(client)
+
+    key = dict(endpoint='auth.login', method='GET', status='200')
+    assert _value(text, 'http_requests_total', **key) - _value(before, 'http_requests_total', **key) == 3
+    assert _value(text, 'http_request_duration_seconds_count', endpoint='auth.login') >= 3
+    assert _value(text, 'http_request_duration_seconds_bucket', endpoint='auth.login', le='+Inf') == \
+        _value(text, 'http_request_duration_seconds_count', endpoint='auth.login')
+    assert _value(text, 'http_requests_total', endpoint='unmatched', method='GET', status='404') >= 1
+    assert _value(text, 'db_statements_total', operation='SELECT') > 0
+    assert '# TYPE db_statement_duration_seconds histogram' in text
+    assert re.search(r'^cache_hit_ratio\{cache="task_fragments"\} ', text, re.M)
+
+
+def test_metrics_import_and_evaluation(app, client, admin_user):
+    with app.app_context():
+        db.session.add(Topic(code='mt', name='MT'))
+        db.session.commit()
+        before = _scrape(client)
+        report = import_tasks([{'title': f'M{i}', 'answer_type': 'number', 'topic_code': 'mt',
+                                'correct_answer': {'type': 'number', 'value': i}} for i in range(3)],
+                              user_id=admin_user.id)
+        assert report.created == 3
+        import_tasks([{'title': 'dry', 'answer_type': 'number', 'topic_code': 'mt',
+                       'correct_answer': {'type': 'number', 'value': 1}}], user_id=admin_user.id, dry_run=True)
+        topic_id = Topic.query.filter_by(code='mt').one().id
+        # время оценивания пишет общий путь запроса и фоновой задачи, а не сам сервис
+        result = _evaluation_preview_result({'user_ids': [admin_user.id], 'topic_id': topic_id,
+                                             'period_start': '2025-01-01', 'period_end': '2025-01-07'})
+        results = result['results']
+    text = _scrape(client)
+
+    def delta(name, **labels):
+        return _value(text, name, **labels) - _value(before, name, **labels)
+
+    assert delta('import_rows_total', kind='tasks') == 3          # пробный прогон не считается
+    assert delta('import_rows_written_total', kind='tasks') == 3
+    assert delta('import_duration_seconds_count', kind='tasks') == 1
+    assert delta('evaluation_runs_total') == 1
+    assert delta('evaluation_pairs_total') == len(results)
+    assert delta('evaluation_run_duration_seconds_count') == 1
+
+
+def test_metrics_sum_across_processes(app, client, tmp_path):
+    directory = str(tmp_path / 'metrics')
+    app.config.update(METRICS_DIR=directory, METRICS_FLUSH_SECONDS=3600)
+    os.makedirs(directory)
+    # «другой воркер»: живой снимок и снимок завершившегося процесса
+    other = {'counters': [['http_requests_total', {'endpoint': 'x.view', 'method': 'GET', 'status': '200'}, 5],
+                          ['cache_requests_total', {'cache': 'demo', 'result': 'hit'}, 3],
+                          ['cache_requests_total', {'cache': 'demo', 'result': 'miss'}, 1]],
+             'histograms': [['http_request_duration_seconds', {'endpoint': 'x.view'},
+                             [1] + [0] * (len(metrics.LATENCY_BUCKETS) - 1) + [0.0005, 1]]]}
+    with open(os.path.join(directory, 'metrics-999991.json'), 'w') as fh:
+        json.dump(other, fh)
+    with open(os.path.join(directory, 'metrics-999992.json'), 'w') as fh:
+        json.dump(other, fh)
+    metrics.mark_process_dead(999992, directory)
+    assert sorted(os.listdir(directory)) == ['metrics-999991.json', 'metrics-archive.json']
+
+    text = _scrape(client)
+    assert _value(text, 'http_requests_total', endpoint='x.view', method='GET', status='200') == 10
+    assert _value(text, 'http_request_duration_seconds_bucket', endpoint='x.view', le='0.001') == 2
+    assert _value(text, 'http_request_duration_seconds_count', endpoint='x.view') == 2
+    assert _value(text, 'cache_hit_ratio', cache='demo') == 0.75
+    # свой снимок процесс пишет сам (при чтении /metrics и фоновым потоком)
+    assert f'metrics-{os.getpid()}.json' in os.listdir(directory)
+
+    metrics.clear_directory(directory)
+    assert os.listdir(directory) == []
+
+
+def test_metrics_token(app, client):
+    app.config['METRICS_TOKEN'] = 's3cret'
+    assert client.get('/metrics').status_code == 403
+    resp = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert resp.status_code == 200
+
+
+def test_metrics_closed_by_default(app, client):
+    """Без токена — только прямые запросы с loopback; снаружи и через прокси — 403."""
+    remote = {'REMOTE_ADDR': '203.0.113.7'}
+    assert client.get('/metrics', environ_base=remote).status_code == 403
+    assert client.get('/metrics', headers={'X-Forwarded-For': '203.0.113.7'}).status_code == 403
+    assert client.get('/metrics').status_code == 200          # 127.0.0.1, без прокси
+    app.config['METRICS_PUBLIC'] = True
+    assert client.get('/metrics', environ_base=remote).status_code == 200
@@ -0,0 +1,113 @@
+import re
+import time
+
+import pytest
+from flask import g
+
+from services.profiler import RateLimiter, limiter
+
+
+@pytest.fixture(autouse=True)
+def _fresh_limiter():
+    limiter.reset()
+    yield
+    limiter.reset()
+
+
+def _login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+
+def test_admin_profile_report(app, client, login_admin):
+    def slow_view():
+        time.sleep(0.06)
+        return 'ok'
+    app.add_url_rule('/_slow_for_profile', 'slow_for_profile', slow_view)
+    app.config['PROFILER_INTERVAL_MS'] = 2
+
+    resp = client.get('/_slow_for_profile?_profile=1')
+    assert resp.status_code == 200
+    report = resp.get_json()
+    assert report['endpoint'] == 'slow_for_profile'
+    assert report['status'] == 200
+    assert report['wall_ms'] >= 60
+    assert report['samples'] >= 3
+    assert 'test_profiler.py:test_admin_profile_report.<locals>.slow_view' in report['collapsed']
+    for line in report['collapsed'].splitlines():
+        assert re.match(r'^\S+ \d+$', line), line
+    assert report['top'][0]['self'] <= report['top'][0]['total']
+
+    # SQL-хронология и формат collapsed для flamegraph.pl
+    report = client.get('/admin/users?_profile=1').get_json()
+    assert report['status'] == 200
+    assert report['sql']['count'] >= 1
+    first = report['sql']['statements'][0]
+    assert first['statement'].upper().startswith('SELECT') and first['duration_ms'] >= 0
+    resp = client.get('/_slow_for_profile?_profile=1&_profile_format=collapsed')
+    assert resp.mimetype == 'text/plain'
+    assert 'slow_view' in resp.get_data(as_text=True)
+
+
+def test_profile_flag_ignored_for_non_admin(client, login_student):
+    resp = client.get('/student/tasks?_profile=1')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/html'
+
+
+def test_profile_token_for_student_page(app, admin_user, student_user):
+    admin, student = app.test_client(), app.test_client()
+    _login(admin, admin_user)
+    _login(student, student_user)
+    assert admin.get('/admin/api/profile-token').status_code == 400
+    assert admin.get('/admin/api/profile-token?user_id=999999').status_code == 400
+    token = admin.get(f'/admin/api/profile-token?user_id={student_user.id}').get_json()['token']
+
+    g.pop('_login_user', None)   # тесты держат один контекст приложения: сменился пользователь
+    assert student.get(f'/admin/api/profile-token?user_id={student_user.id}').status_code == 403
+    report = student.get(f'/student/tasks?_profile={token}').get_json()
+    assert report['endpoint'] == 'student.tasks'
+    assert report['sql']['count'] >= 1
+
+    resp = student.get('/student/tasks?_profile=forged.token')
+    assert resp.mimetype == 'text/html'
+
+
+def test_profile_token_bound_to_user_and_issuer(app, admin_user, student_user):
+    from extensions import db
+    from models import User
+
+    admin, student = app.test_client(), app.test_client()
+    _login(admin, admin_user)
+    _login(student, student_user)
+    token = admin.get(f'/admin/api/profile-token?user_id={student_user.id}').get_json()['token']
+
+    # токен выдан студенту — у другого пользователя (здесь у самого администратора) он не действует
+    resp = admin.get(f'/admin/users?_profile={token}')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/html'
+
+    # администратора разжаловали — выданные им токены больше не действуют
+    db.session.get(User, admin_user.id).role = 'teacher'
+    db.session.commit()
+    g.pop('_login_user', None)
+    resp = student.get(f'/student/tasks?_profile={token}')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/html'
+
+
+def test_profile_rate_limit(app, client, login_admin):
+    app.config['PROFILER_MAX_PER_MINUTE'] = 2
+    assert client.get('/admin/users?_profile=1').is_json
+    assert client.get('/admin/users?_profile=1').is_json
+    resp = client.get('/admin/users?_profile=1')
+    assert resp.status_code == 429
+    assert resp.get_json()['error'] == 'profile_rate_limited'
+    # без флага лимит не мешает
+    assert client.get('/admin/users').status_code == 200
+
+    window = RateLimiter()
+    assert window.allow(1, now=100.0)
+    assert not window.allow(1, now=130.0)
+    assert window.allow(1, now=160.0)
@@ -0,0 +1,75 @@
+import pytest
+
+from extensions import db
+from models import Topic, MathTask, TaskAttempt, TopicLevelConfig
+
+
+@pytest.fixture
+def topic_id(app):
+    with app.app_context():
+        t = Topic(code='api', name='API')
+        db.session.add(t)
+        db.session.flush()
+        db.session.add(TopicLevelConfig(topic_id=t.id, level='low', task_count_threshold=10,
+                                        reference_time=60, penalty_weights=[0.7, 0.4]))
+        db.session.commit()
+        return t.id
+
+
+def make_task(app, admin_user, topic_id, value, explanation='подсказка'):
+    with app.app_context():
+        task = MathTask(title=f'T{value}', description='d', answer_type='number',
+                        correct_answer={'type': 'number', 'value': float(value)},
+                        explanation=explanation, topic_id=topic_id, level='low',
+                        max_score=1.0, created_by=admin_user.id, is_active=True)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+
+@pytest.mark.usefixtures("login_student")
+class TestSubmitApi:
+    def test_wrong_then_correct(self, app, client, admin_user, topic_id):
+        t1 = make_task(app, admin_user, topic_id, 5)
+        t2 = make_task(app, admin_user, topic_id, 6)
+
+        r = client.post(f"/student/tasks/{t1}/submit", data={"answer": "1"})
+        assert r.status_code == 200
+        data = r.get_json()
+        assert data["ok"] and not data["is_correct"]
+        assert data["attempt_number"] == 1
+        assert data["remaining_attempts"] == 2
+        assert data["hint"] == 'подсказка'
+        assert data["next_task_id"] is None
+
+        r = client.post(f"/student/tasks/{t1}/submit", data={"answer": "5"})
+        data = r.get_json()
+        assert data["is_correct"] and data["solved"]
+        assert data["score"] == pytest.approx(0.7)
+        assert data["remaining_attempts"] == 0
+        assert data["next_task_id"] == t2
+        assert data["attempt"]["user_answer"] == {"type": "number", "value": 5.0}
+
+        # Already solved -> conflict, nothing written
+        r = client.post(f"/student/tasks/{t1}/submit", data={"answer": "5"})
+        assert r.status_code == 409
+        with app.app_context():
+            assert TaskAttempt.query.filter_by(task_id=t1).count() == 2
+
+    def test_blocked_after_three(self, app, client, admin_user, topic_id):
+        t = make_task(app, admin_user, topic_id, 5)
+        for _ in range(3):
+            data = client.post(f"/student/tasks/{t}/submit", data={"answer": "0"}).get_json()
+        assert data["blocked"] and data["hint"] is None
+        r = client.post(f"/student/tasks/{t}/submit", data={"answer": "5"})
+        assert r.status_code == 409
+        assert r.get_json()["blocked"]
+
+    def test_unknown_task(self, client):
+        r = client.post("/student/tasks/999/submit", data={"answer": "1"})
+        assert r.status_code == 404
+
+
+def test_non_student_forbidden(client, login_admin):
+    r = client.post("/student/tasks/1/submit", data={"answer": "1"})
+    assert r.status_code == 403
@@ -75,6 +75,16 @@ def test_tasks_list_shows_link_and_lock(client, app, login_student, admin_user,
     assert f"/student/tasks/{t2.id}" in html  # available has link
 
 
+def test_tasks_list_pagination(client, app, login_student, admin_user, topic_low):
+    # больше 20 задач уровня — появляется навигация по страницам
+    for i in range(21):
+        make_task(app, admin_user.id, topic_low, correct_answer=i)
+
+    resp = client.get(f"/student/tasks?topic_id={topic_low.id}&page=2")
+    assert resp.status_code == 200
+    assert f"topic_id={topic_low.id}" in resp.get_data(as_text=True).split('pagination', 1)[1]
+
+
 def test_view_and_submit_correct_first_try(client, app, login_student, admin_user, topic_low):
     task = make_task(app, admin_user.id, topic_low, correct_answer=11)
 
@@ -0,0 +1,70 @@
+import pytest
+
+from extensions import db
+from models import Topic, MathTask, TaskAttempt, TopicLevelConfig
+from services.submission import TaskStatus, attempt_score, load_task_status, submit_answer
+
+
+def test_attempt_score_policy():
+    assert attempt_score(1, None) == 1.0
+    assert attempt_score(2, [0.7, 0.4]) == 0.7
+    assert attempt_score(3, [0.7, 0.4]) == 0.4
+    assert attempt_score(4, [0.7, 0.4]) == 0.0
+    assert attempt_score(2, None) == 0.0
+    assert attempt_score(2, ["bad"]) == 0.0
+
+
+def test_status_after_in_memory():
+    s = TaskStatus()
+    assert s.can_submit and s.remaining == 3
+    s = s.after(False).after(False)
+    assert (s.attempts, s.incorrect, s.solved) == (2, 2, False)
+    assert s.remaining == 1
+    blocked = s.after(False)
+    assert blocked.blocked and not blocked.can_submit and blocked.remaining == 0
+    solved = s.after(True)
+    assert solved.solved and not solved.blocked and not solved.can_submit
+
+
+@pytest.fixture
+def task_id(app, admin_user):
+    with app.app_context():
+        topic = Topic(code='pipe', name='Pipeline')
+        db.session.add(topic)
+        db.session.flush()
+        db.session.add(TopicLevelConfig(topic_id=topic.id, level='low', task_count_threshold=10,
+                                        reference_time=60, penalty_weights=[0.6, 0.3]))
+        task = MathTask(title='T', description='d', answer_type='number',
+                        correct_answer={'type': 'number', 'value': 1.0}, topic_id=topic.id,
+                        level='low', max_score=1.0, created_by=admin_user.id, is_active=True)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+
+def test_submit_answer_matches_db_state(app, student_user, task_id):
+    with app.app_context():
+        task = db.session.get(MathTask, task_id)
+        first = submit_answer(student_user.id, task, {'type': 'number', 'value': 0.0}, False)
+        assert first.accepted and first.attempt_number == 1 and first.score == 0.0
+
+        second = submit_answer(student_user.id, task, {'type': 'number', 'value': 1.0}, True,
+                               status=first.status)
+        assert second.attempt_number == 2
+        assert second.score == pytest.approx(0.6)
+        # In-memory status agrees with a fresh aggregate
+        assert second.status == load_task_status(student_user.id, task_id)
+
+        stored = TaskAttempt.query.filter_by(task_id=task_id, attempt_number=2).one()
+        assert stored.partial_score == pytest.approx(0.6)
+
+        rejected = submit_answer(student_user.id, task, {'type': 'number', 'value': 1.0}, True)
+        assert not rejected.accepted
+        assert TaskAttempt.query.filter_by(task_id=task_id).count() == 2
+
+
+def test_view_task_flash_shows_score(app, client, login_student, task_id):
+    client.post(f"/student/tasks/{task_id}", data={"answer": "5"})
+    resp = client.post(f"/student/tasks/{task_id}", data={"answer": "1"}, follow_redirects=True)
+    assert resp.status_code == 200
+    assert 'Набрано баллов: 0.60' in resp.get_data(as_text=True)
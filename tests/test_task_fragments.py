@@ -0,0 +1,59 @@
+import pytest
+
+from extensions import db
+from models import Topic, MathTask
+from services.fragments import fragment_cache
+
+
+@pytest.fixture
+def task_id(app, admin_user):
+    with app.app_context():
+        topic = Topic(code='frag', name='Fragments')
+        db.session.add(topic)
+        db.session.flush()
+        task = MathTask(title='Frag', description='<p>исходное условие</p>', answer_type='number',
+                        correct_answer={'type': 'number', 'value': 1.0}, topic_id=topic.id,
+                        level='low', max_score=1.0, created_by=admin_user.id, is_active=True)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    fragment_cache.clear()
+    yield
+    fragment_cache.clear()
+
+
+def test_fragments_reused_between_requests(client, login_student, task_id):
+    r = client.get(f"/student/tasks/{task_id}")
+    assert r.status_code == 200
+    assert 'исходное условие' in r.get_data(as_text=True)
+    misses = fragment_cache.misses
+
+    r = client.get(f"/student/tasks/{task_id}")
+    assert 'исходное условие' in r.get_data(as_text=True)
+    assert fragment_cache.misses == misses
+    assert fragment_cache.hits >= 2  # условие + поля ответа
+
+
+def test_fragment_refreshed_after_task_edit(app, client, login_student, task_id):
+    client.get(f"/student/tasks/{task_id}")
+    with app.app_context():
+        task = db.session.get(MathTask, task_id)
+        task.description = '<p>новое условие</p>'
+        db.session.commit()
+
+    body = client.get(f"/student/tasks/{task_id}").get_data(as_text=True)
+    assert 'новое условие' in body
+    assert 'исходное условие' not in body
+
+
+def test_per_user_status_not_cached(client, login_student, task_id):
+    client.get(f"/student/tasks/{task_id}")
+    client.post(f"/student/tasks/{task_id}", data={"answer": "0"})
+    body = client.get(f"/student/tasks/{task_id}").get_data(as_text=True)
+    assert 'id="task-attempts-count">1<' in body
+    # поля ответа пришли из кэша, но форма по-прежнему содержит свежий CSRF-токен
+    assert 'name="csrf_token"' in body
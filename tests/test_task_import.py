@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import re
+
+from sqlalchemy import event
+
+from extensions import db
+from models import MathTask, Topic
+from services.task_import import import_tasks
+
+BANK = os.path.join(os.path.dirname(__file__), '..', 'docs_adaptive_mech', 'math_tasks_all_levels_fixed.json')
+
+
+def _task(**kw):
+    item = {'title': 'T', 'answer_type': 'number', 'correct_answer': {'type': 'number', 'value': 1},
+            'topic_code': 'alg', 'level': 'low'}
+    item.update(kw)
+    return item
+
+
+def test_all_errors_reported_and_nothing_written(app, admin_user):
+    with app.app_context():
+        db.session.add(Topic(code='alg', name='Алгебра'))
+        db.session.flush()
+        db.session.add(MathTask(title='old', code='taken', description='', answer_type='number',
+                                correct_answer={'type': 'number', 'value': 0}, topic_id=Topic.query.one().id,
+                                level='low', max_score=1.0, created_by=admin_user.id))
+        db.session.commit()
+
+        report = import_tasks([
+            _task(code='ok1'),
+            _task(correct_answer={'type': 'number', 'value': 'x'}),
+            _task(topic_code='nope'),
+            _task(code='taken'),
+            _task(code='ok1'),
+            _task(level='extreme', max_score='много'),
+            'строка',
+            _task(code='ok2'),
+        ], admin_user.id)
+
+        assert report.total == 8 and report.valid == 2 and report.created == 0
+        messages = [e.message for e in report.errors]
+        assert [e.row for e in report.errors] == [2, 3, 4, 5, 6, 6, 7]
+        assert 'числовой value' in messages[0]
+        assert 'тема не найдена' in messages[1]
+        assert "код 'taken' уже используется" in messages[2]
+        assert 'повторяется (см. задание 1)' in messages[3]
+        assert MathTask.query.count() == 1
+
+
+def test_numeric_codes_are_accepted(app, admin_user):
+    """Коды из JSON могут прийти числами (выгрузка из таблицы) — это не повод ронять задачу."""
+    with app.app_context():
+        db.session.add(Topic(code='101', name='Числовой код'))
+        db.session.commit()
+        report = import_tasks([_task(topic_code=101, code=7), _task(topic_code=101, code='7'),
+                               _task(topic_code=999, title=42)], admin_user.id)
+        assert report.valid == 1 and report.created == 0
+        assert [e.row for e in report.errors] == [2, 3]
+        assert "код '7' повторяется" in report.errors[0].message
+        assert 'тема не найдена' in report.errors[1].message
+
+        report = import_tasks([_task(topic_code=101, code=7, title=42)], admin_user.id)
+        assert report.created == 1
+        task = MathTask.query.filter_by(code='7').one()
+        assert task.title == '42' and task.topic_id == Topic.query.filter_by(code='101').one().id
+
+
+def test_validation_queries_do_not_scale_with_file(app, admin_user):
+    with app.app_context():
+        db.session.add(Topic(code='alg', name='Алгебра'))
+        db.session.commit()
+        items = [_task(code=f'c{i}', title=f'T{i}') for i in range(300)]
+
+        selects = []
+        listener = lambda conn, cur, stmt, *a: selects.append(stmt) if stmt.lstrip().upper().startswith('SELECT') else None
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            report = import_tasks(items, admin_user.id, dry_run=True)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert report.valid == 300 and report.created == 0 and not report.errors
+        assert len(selects) <= 3
+        report = import_tasks(items, admin_user.id, chunk_size=128)
+        assert report.created == 300 and report.chunks == 3
+        assert MathTask.query.count() == 300
+
+
+def test_dry_run_then_apply_bank_file(app, client, login_admin):
+    with app.app_context():
+        db.session.add(Topic(code='quadratic_equations', name='Квадратные уравнения'))
+        db.session.commit()
+    with open(BANK, 'rb') as fh:
+        data = fh.read()
+
+    r = client.post('/admin/tasks/import', data={'file': (io.BytesIO(data), 'bank.json'), 'dry_run': '1'},
+                    content_type='multipart/form-data', follow_redirects=True)
+    body = r.get_data(as_text=True)
+    assert 'Проверка пройдена: 60 из 60' in body
+    with app.app_context():
+        assert MathTask.query.count() == 0
+
+    apply_url = re.search(r'action="(/admin/jobs/\d+/apply)"', body).group(1)
+    body = client.post(apply_url, follow_redirects=True).get_data(as_text=True)
+    assert 'Импортировано заданий: 60' in body
+    with app.app_context():
+        assert MathTask.query.count() == 60
+    # повторно тот же файл не применить
+    assert 'нельзя импортировать' in client.post(apply_url, follow_redirects=True).get_data(as_text=True)
+
+
+def test_import_with_errors_shows_table(client, login_admin):
+    payload = json.dumps([_task(topic_code='missing')]).encode()
+    body = client.post('/admin/tasks/import', data={'file': (io.BytesIO(payload), 'bad.json')},
+                       content_type='multipart/form-data', follow_redirects=True).get_data(as_text=True)
+    assert 'Найдено ошибок: 1' in body and 'Задание 1: тема не найдена' in body
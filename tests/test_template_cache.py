@@ -0,0 +1,54 @@
+import os
+
+import pytest
+from jinja2 import FileSystemBytecodeCache
+
+from services.template_cache import precompile
+
+
+@pytest.fixture
+def bytecode_dir(app, tmp_path):
+    directory = str(tmp_path / 'jinja')
+    os.makedirs(directory)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.cache.clear()
+    return directory
+
+
+def test_bytecode_cache_configured(app):
+    cache = app.jinja_env.bytecode_cache
+    assert isinstance(cache, FileSystemBytecodeCache)
+    assert cache.directory == app.config['TEMPLATES_CACHE_DIR']
+
+
+def test_precompile_fills_cache_and_skips_compilation(app, bytecode_dir, monkeypatch):
+    report = precompile(app)
+    assert report.errors == {}
+    assert report.compiled >= 40
+    assert len(os.listdir(bytecode_dir)) == report.compiled
+    assert {name for _, name in report.slowest} <= set(app.jinja_env.list_templates())
+
+    # «новый воркер»: в памяти пусто, а компилятор не нужен — всё из байткода
+    app.jinja_env.cache.clear()
+
+    def no_compile(*args, **kwargs):
+        raise AssertionError('template compiled instead of loaded from bytecode')
+    monkeypatch.setattr(app.jinja_env, 'compile', no_compile)
+    assert precompile(app).compiled == report.compiled
+
+
+def test_changed_template_is_recompiled(app, bytecode_dir, tmp_path):
+    from jinja2 import DictLoader
+    loader = DictLoader({'probe.html': 'v1 {{ x }}'})
+    app.jinja_env.loader = loader
+    assert app.jinja_env.get_template('probe.html').render(x=1) == 'v1 1'
+    loader.mapping['probe.html'] = 'v2 {{ x }}'
+    app.jinja_env.cache.clear()
+    assert app.jinja_env.get_template('probe.html').render(x=1) == 'v2 1'
+
+
+def test_templates_compile_command(app, bytecode_dir):
+    result = app.test_cli_runner().invoke(args=['templates-compile', '--clear'])
+    assert result.exit_code == 0, result.output
+    assert 'Шаблонов:' in result.output and 'ОШИБКА' not in result.output
+    assert os.listdir(bytecode_dir)
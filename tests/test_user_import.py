@@ -0,0 +1,96 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import check_password_hash
+
+import services.passwords as passwords
+from extensions import db
+from models import User
+from services.passwords import hash_passwords
+from services.user_import import import_users
+
+
+@pytest.fixture
+def cheap_hash(monkeypatch):
+    # 600 000 итераций PBKDF2 в тестах слишком дороги; формат хеша тот же
+    monkeypatch.setattr(passwords, 'HASH_METHOD', 'pbkdf2:sha256:1000')
+
+
+def _user(name, **kw):
+    item = {'username': name, 'email': f'{name}@school.test', 'password': f'pw-{name}'}
+    item.update(kw)
+    return item
+
+
+def test_errors_reported_and_nothing_written(app, cheap_hash):
+    with app.app_context():
+        report = import_users([
+            _user('ok1'),
+            _user('', email='x@school.test'),
+            _user('bad_role', role='root'),
+            _user('no_mail', email=''),
+            'строка',
+        ])
+        assert report.total == 5 and report.created == 0
+        assert [e.row for e in report.errors] == [2, 3, 4, 5]
+        assert "'username' обязательно" in report.errors[0].message
+        assert "недопустимая роль 'root'" in report.errors[1].message
+        assert "'email' обязательно" in report.errors[2].message
+        assert User.query.count() == 0
+
+
+def test_numeric_fields_are_coerced(app, cheap_hash):
+    with app.app_context():
+        report = import_users([_user(20250101, email='20250101@school.test', password=123456)])
+        assert report.created == 1 and not report.errors
+        user = User.query.filter_by(username='20250101').one()
+        assert user.check_password('123456')
+
+
+def test_duplicates_skipped_with_one_lookup_query(app, admin_user, cheap_hash):
+    with app.app_context():
+        items = [_user(f's{i}', first_name='Иван', last_name=f'Иванов{i}') for i in range(150)]
+        items += [
+            _user(admin_user.username, email='fresh@school.test'),   # занят username
+            _user('fresh', email=admin_user.email),                 # занят email
+            _user('s0', email='other@school.test'),                 # повтор в файле
+            {'username': 'nopass', 'email': 'nopass@school.test', 'role': 'teacher'},
+        ]
+
+        selects = []
+        listener = lambda conn, cur, stmt, *a: selects.append(stmt) if stmt.lstrip().upper().startswith('SELECT') else None
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            report = import_users(items, workers=1, chunk_size=64)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert len(selects) == 1
+        assert report.created == 151 and report.skipped == 3 and report.chunks == 3
+        assert report.users_per_second > 0 and report.hash_seconds <= report.seconds
+        assert User.query.count() == 152
+        s7 = User.query.filter_by(username='s7').one()
+        assert s7.check_password('pw-s7') and s7.last_name == 'Иванов7' and s7.role == 'student'
+        assert User.query.filter_by(username='nopass').one().role == 'teacher'
+
+
+def test_process_pool_keeps_order():
+    plain = [f'secret-{i}' for i in range(12)]
+    hashes = hash_passwords(plain, workers=2, method='pbkdf2:sha256:1000', min_parallel=0)
+    assert len(set(hashes)) == 12
+    assert all(check_password_hash(h, p) for h, p in zip(hashes, plain))
+
+
+def test_import_route_runs_job(client, app, login_admin, cheap_hash):
+    payload = json.dumps([_user('a1'), _user('a2'), _user('a1', email='a3@school.test')]).encode()
+    body = client.post('/admin/users/import', data={'file': (io.BytesIO(payload), 'users.json')},
+                       content_type='multipart/form-data', follow_redirects=True).get_data(as_text=True)
+    assert 'Импортировано пользователей: 2. Пропущено (дубликаты): 1' in body
+    with app.app_context():
+        assert User.query.filter_by(username='a2').one().check_password('pw-a2')
+
+    body = client.post('/admin/users/import', data={'file': (io.BytesIO(b'[{"email": "z@z"}]'), 'users.json')},
+                       content_type='multipart/form-data', follow_redirects=True).get_data(as_text=True)
+    assert 'Найдено ошибок: 1' in body and 'Элемент 1: поле &#39;username&#39; обязательно' in body
@@ -1,3 +1,6 @@
 # wsgi.py
-from app import create_app
-app = create_app()
\ No newline at end of file
+# Точка входа gunicorn (wsgi:app) и flask CLI (FLASK_APP=wsgi.py).
+# Приложение строится один раз — то же самое, что отдаёт app.get_app()
+from app import get_app
+
+app = get_app()